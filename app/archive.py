@@ -0,0 +1,151 @@
+import gzip
+import mmap
+import os
+import struct
+import time
+from dataclasses import dataclass
+from importlib.util import find_spec
+from os.path import join as join_path, exists
+from typing import Callable, Iterator, Optional, Tuple
+
+from app.cache import hash_html
+from app.tracing import count
+from app.utils import get_app_id_from_app_url, get_storefront_from_url
+
+# one fixed-width record per capture: app id, fetch time, storefront, codec and the sha256 of the html
+INDEX_RECORD = struct.Struct('<Qd2sB32s5x')
+INDEX_FILE = 'index.bin'
+OBJECTS_DIR = 'objects'
+
+CODECS: dict[str, tuple[int, str, Callable[[bytes], bytes], Callable[[bytes], bytes]]] = dict(
+    gzip=(1, '.gz', lambda data: gzip.compress(data, compresslevel=6), gzip.decompress),
+)
+
+# zstandard is optional, it compresses html about as well as gzip at several times the speed
+if find_spec('zstandard') is not None:
+    import zstandard
+
+    CODECS['zstd'] = (2, '.zst', lambda data: zstandard.ZstdCompressor(level=10).compress(data),
+                      lambda data: zstandard.ZstdDecompressor().decompress(data))
+
+DEFAULT_CODEC = 'zstd' if 'zstd' in CODECS else 'gzip'
+_CODEC_NAMES = {codec_id: name for name, (codec_id, *_) in CODECS.items()}
+
+
+@dataclass
+class ArchiveEntry:
+    app_id: int
+    storefront: str
+    fetched_at: float
+    codec: str
+    digest: str
+
+
+def read_object(path: str, codec: str) -> str:
+    with open(path, 'rb') as f:
+        return CODECS[codec][3](f.read()).decode('utf-8')
+
+
+class PageArchive:
+    def __init__(self, archive_dir: str, codec: str = DEFAULT_CODEC, read_only: bool = False):
+        if codec not in CODECS:
+            raise ValueError(f'unknown archive codec {codec}, expected one of {list(CODECS)}')
+        self.archive_dir = archive_dir
+        self.codec = codec
+        self.read_only = read_only
+        self.index_path = join_path(archive_dir, INDEX_FILE)
+        if read_only:
+            # a mistyped archive path is an error, not an empty archive created on the way
+            if not exists(self.index_path):
+                raise FileNotFoundError(f'no archive index in {archive_dir}')
+            self._index = None
+        else:
+            os.makedirs(join_path(archive_dir, OBJECTS_DIR), exist_ok=True)
+            self._index = open(self.index_path, 'ab')
+        # captures by storefront and app, and by app alone, read from the index once and kept up to date by put
+        self._captures: Optional[dict[Tuple[str, int], list[ArchiveEntry]]] = None
+        self._app_captures: Optional[dict[int, list[ArchiveEntry]]] = None
+
+    def object_path(self, digest: str, codec: str = None) -> str:
+        # content addressed, a page that did not change between two crawls is stored once
+        return join_path(self.archive_dir, OBJECTS_DIR, digest[:2], digest + CODECS[codec or self.codec][1])
+
+    def put(self, app_url: str, html: str, digest: str = None, fetched_at: float = None) -> ArchiveEntry:
+        assert not self.read_only, 'the archive is read only'
+        digest = digest or hash_html(html)
+        path = self.object_path(digest)
+        if exists(path):
+            count('archive.deduplicated')
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            data = CODECS[self.codec][2](html.encode('utf-8'))
+            # written aside and renamed, so a crash never leaves a truncated object behind
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            count('archive.bytes', len(data))
+
+        entry = ArchiveEntry(app_id=int(get_app_id_from_app_url(app_url) or 0),
+                             storefront=get_storefront_from_url(app_url) or '',
+                             fetched_at=fetched_at or time.time(), codec=self.codec, digest=digest)
+        self._index.write(INDEX_RECORD.pack(entry.app_id, entry.fetched_at, entry.storefront.encode('ascii'),
+                                            CODECS[self.codec][0], bytes.fromhex(digest)))
+        self._index.flush()
+        if self._captures is not None:
+            self._add_capture(entry)
+        return entry
+
+    def entries(self) -> Iterator[ArchiveEntry]:
+        size = os.path.getsize(self.index_path)
+        # a record cut off by a crash in the middle of a write is left out
+        size -= size % INDEX_RECORD.size
+        if not size:
+            return
+        with open(self.index_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as index:
+            for offset in range(0, size, INDEX_RECORD.size):
+                app_id, fetched_at, storefront, codec_id, digest = INDEX_RECORD.unpack_from(index, offset)
+                yield ArchiveEntry(app_id=app_id, fetched_at=fetched_at,
+                                   storefront=storefront.rstrip(b'\0').decode('ascii'),
+                                   codec=_CODEC_NAMES[codec_id], digest=digest.hex())
+
+    def _add_capture(self, entry: ArchiveEntry):
+        self._captures.setdefault((entry.storefront, entry.app_id), []).append(entry)
+        self._app_captures.setdefault(entry.app_id, []).append(entry)
+
+    def _get_captures(self) -> dict[Tuple[str, int], list[ArchiveEntry]]:
+        if self._captures is None:
+            self._captures, self._app_captures = {}, {}
+            for entry in self.entries():
+                self._add_capture(entry)
+        return self._captures
+
+    def find(self, app_id: int, since: float = None, until: float = None) -> list[ArchiveEntry]:
+        self._get_captures()
+        entries = [entry for entry in self._app_captures.get(app_id, ())
+                   if (since is None or entry.fetched_at >= since) and (until is None or entry.fetched_at < until)]
+        # in the order they were archived, across storefronts
+        return sorted(entries, key=lambda entry: entry.fetched_at)
+
+    def latest(self, until: Optional[float] = None) -> list[ArchiveEntry]:
+        # the last capture of every app and storefront, in the order they were first archived
+        latest = []
+        for entries in self._get_captures().values():
+            entries = [entry for entry in entries if until is None or entry.fetched_at < until]
+            if entries:
+                # the later of two captures with the same fetch time wins
+                latest.append(max(reversed(entries), key=lambda entry: entry.fetched_at))
+        return latest
+
+    def read(self, entry: ArchiveEntry) -> str:
+        return read_object(self.object_path(entry.digest, entry.codec), entry.codec)
+
+    def close(self):
+        if self._index:
+            self._index.close()
+
+    def __enter__(self) -> 'PageArchive':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,278 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from queue import SimpleQueue
+from random import randint
+from threading import Thread
+from typing import Tuple, Any, Callable, Coroutine, Iterator
+from urllib.parse import urljoin
+
+from playwright.async_api import Page, BrowserContext, async_playwright, Error as PlaywrightError, \
+    TimeoutError as PlaywrightTimeoutError
+
+from app.discovery import DEFAULT_DISCOVERY, OBSERVER_DISCOVERY_JS, OBSERVER_OPTIONS, DiscoveryStats, \
+    check_discovery_profile
+from app.pacing import Pacer, ThrottledError, THROTTLE_STATUSES, retry_async
+from app.parsers import StructuredAppInfoParser
+from app.pool import AsyncBrowserPool
+from app.routing import install_block_profile_async
+from app.utils import get_delay_ms, get_delay_s, is_app_url, is_company_url, get_storefront_url, \
+    get_url_key
+
+
+async def _is_end_of_page(page: Page) -> Tuple[bool, Any]:
+    page_height = await page.evaluate('document.body.scrollHeight')
+    scroll_position = await page.evaluate('window.scrollY')
+    return scroll_position >= page_height, scroll_position
+
+
+async def _discover_page_like_human(page: Page):
+    last_pos = 0
+    while True:
+        await page.mouse.wheel(delta_x=0, delta_y=randint(300, 900))
+        await asyncio.sleep(get_delay_s(max_val=1))
+        is_end, pos = await _is_end_of_page(page)
+        if is_end or last_pos == pos:
+            break
+        last_pos = pos
+
+
+async def discover_page(page: Page, profile: str = DEFAULT_DISCOVERY, stats: DiscoveryStats = None) -> float:
+    check_discovery_profile(profile)
+    start = time.perf_counter()
+    if profile == 'observer':
+        await page.evaluate(OBSERVER_DISCOVERY_JS, OBSERVER_OPTIONS)
+    else:
+        await _discover_page_like_human(page)
+    elapsed_s = time.perf_counter() - start
+    if stats:
+        stats.record(page.url, elapsed_s)
+    return elapsed_s
+
+
+async def paced_goto(page: Page, url: str, pacer: Pacer = None, **kwargs):
+    if pacer is None:
+        return await page.goto(url, **kwargs)
+
+    await pacer.acquire_async()
+    start = time.perf_counter()
+    try:
+        response = await page.goto(url, **kwargs)
+    except PlaywrightTimeoutError:
+        pacer.record(time.perf_counter() - start, timeout=True)
+        raise
+    status = response.status if response else None
+    pacer.record(time.perf_counter() - start, status=status)
+    if status in THROTTLE_STATUSES:
+        raise ThrottledError(url, status)
+    return response
+
+
+async def collect_app_html(page: Page, app_url: str, discovery: str = DEFAULT_DISCOVERY,
+                           stats: DiscoveryStats = None, pacer: Pacer = None) -> str:
+    assert is_app_url(app_url)
+
+    await page.bring_to_front()
+    await paced_goto(page, app_url, pacer=pacer)
+    await page.wait_for_selector(selector="#ember3", state="visible")
+
+    await discover_page(page, profile=discovery, stats=stats)
+
+    # discovery info_list
+    info_list = page.locator(selector=".information-list.information-list--app")
+    await info_list.scroll_into_view_if_needed()
+
+    # expand languages if necessary
+    language_dd_ele = info_list.locator("div", has_text="Languages").locator("dd")
+    btn_ele = language_dd_ele.locator("button", has_text="more")
+    if await btn_ele.count() > 0:
+        await btn_ele.click(delay=get_delay_ms())
+        await btn_ele.wait_for(state="hidden")
+
+    return await page.content()
+
+
+async def craw_app_info(page: Page, app_url: str, discovery: str = DEFAULT_DISCOVERY,
+                        stats: DiscoveryStats = None, pacer: Pacer = None) -> dict:
+    html = await collect_app_html(page=page, app_url=app_url, discovery=discovery, stats=stats, pacer=pacer)
+    parser = StructuredAppInfoParser(html=html)
+    return parser.parse()
+
+
+async def craw_app_infos(ctx: BrowserContext, app_urls: list[str], workers: int = 4,
+                         on_result: Callable[[int, str, dict], Any] = None, discovery: str = DEFAULT_DISCOVERY,
+                         stats: DiscoveryStats = None, pacer: Pacer = None, retries: int = 0) -> list[dict]:
+    assert workers > 0, 'invalid number of workers'
+
+    # each worker borrows a page from the pool, so at most `workers` pages are navigating at once
+    semaphore = asyncio.BoundedSemaphore(workers)
+    pages = asyncio.Queue()
+    for _ in range(min(workers, len(app_urls))):
+        pages.put_nowait(await ctx.new_page())
+
+    async def crawl_page(app_url: str) -> dict:
+        # the pacer may lower the concurrency below `workers` while the store pushes back
+        if pacer:
+            await pacer.enter_async()
+        page = await pages.get()
+        try:
+            return await craw_app_info(page=page, app_url=app_url, discovery=discovery, stats=stats, pacer=pacer)
+        finally:
+            pages.put_nowait(page)
+            if pacer:
+                pacer.leave()
+
+    async def crawl_one(idx: int, app_url: str) -> dict:
+        async with semaphore:
+            app_data = await retry_async(lambda: crawl_page(app_url), retries=retries,
+                                         retry_on=(PlaywrightError, ThrottledError), pacer=pacer)
+        if on_result:
+            on_result(idx, app_url, app_data)
+        return app_data
+
+    try:
+        # gather keeps the results in the same order as app_urls
+        return list(await asyncio.gather(*(crawl_one(idx, app_url) for idx, app_url in enumerate(app_urls))))
+    finally:
+        while not pages.empty():
+            await pages.get_nowait().close()
+
+
+async def _crawl_app_infos_in(context: BrowserContext, app_urls: list[str], workers: int, **kwargs) -> list[dict]:
+    if kwargs.get('block_profile'):
+        await install_block_profile_async(context, profile=kwargs['block_profile'], stats=kwargs.get('route_stats'))
+    if kwargs.get('on_response'):
+        context.on('response', kwargs['on_response'])
+    return await craw_app_infos(ctx=context, app_urls=app_urls, workers=workers, on_result=kwargs.get('on_result'),
+                                discovery=kwargs.get('discovery', DEFAULT_DISCOVERY), stats=kwargs.get('stats'),
+                                pacer=kwargs.get('pacer'), retries=kwargs.get('retries') or 0)
+
+
+async def _crawl_app_infos(app_urls: list[str], workers: int, pool: AsyncBrowserPool = None, **kwargs) -> list[dict]:
+    if pool is not None:
+        # the warm browser of the pool, only the context is new
+        context = await pool.new_context()
+        try:
+            return await _crawl_app_infos_in(context, app_urls=app_urls, workers=workers, **kwargs)
+        finally:
+            await context.close()
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(
+            headless=kwargs.get('headless', False),
+            slow_mo=kwargs.get('slow_mo', None)
+        )
+        context = await browser.new_context()
+        data = await _crawl_app_infos_in(context, app_urls=app_urls, workers=workers, **kwargs)
+        await browser.close()
+    return data
+
+
+def crawl_app_infos(app_urls: list[str], workers: int = 4, **kwargs) -> list[dict]:
+    return asyncio.run(_crawl_app_infos(app_urls=app_urls, workers=workers, **kwargs))
+
+
+async def _check_and_save_links(link_ele_list: list, seen_keys: set[str]) -> list[str]:
+    app_urls = []
+    for link_ele in link_ele_list:
+        link = await link_ele.get_attribute('href')
+        if is_app_url(link) and get_url_key(link) not in seen_keys:
+            seen_keys.add(get_url_key(link))
+            app_urls.append(link)
+    return app_urls
+
+
+async def collect_app_urls(ctx: BrowserContext, company_url: str, discovery: str = DEFAULT_DISCOVERY,
+                           stats: DiscoveryStats = None) -> list[str]:
+    assert is_company_url(company_url)
+
+    page = await ctx.new_page()
+    await page.goto(company_url, wait_until="load")
+    await discover_page(page, profile=discovery, stats=stats)
+
+    app_urls = []
+    # an app listed in several sections is collected once
+    seen_keys = set()
+    for section in await page.locator(selector='section.section.section--bordered').all():
+        see_all_btn = section.locator('div.section__nav > a', has_text='See All')
+        if await see_all_btn.count() > 0:
+            # the see-all page is opened from its link, the pages of other storefronts keep loading meanwhile
+            detail_page = await ctx.new_page()
+            await detail_page.goto(urljoin(company_url, await see_all_btn.get_attribute('href')), wait_until="load")
+            await discover_page(detail_page, profile=discovery, stats=stats)
+            app_urls += await _check_and_save_links(
+                await detail_page.locator(selector='div.l-row[role="feed"] > a').all(), seen_keys)
+            await detail_page.close()
+        else:
+            app_urls += await _check_and_save_links(await section.locator('div.l-row.l-row--peek > a').all(),
+                                                    seen_keys)
+
+    await page.close()
+    return app_urls
+
+
+async def _collect_storefront_app_urls(company_url: str, storefronts: list[str], pool: AsyncBrowserPool = None,
+                                       **kwargs) -> dict[str, list[str]]:
+    async def collect(new_context: Callable[[], Coroutine], storefront: str) -> list[str]:
+        # one context per storefront, so the region chosen by one does not redirect the others
+        context = await new_context()
+        if kwargs.get('block_profile'):
+            await install_block_profile_async(context, profile=kwargs['block_profile'],
+                                              stats=kwargs.get('route_stats'))
+        try:
+            return await collect_app_urls(ctx=context, company_url=get_storefront_url(company_url, storefront),
+                                          discovery=kwargs.get('discovery', DEFAULT_DISCOVERY),
+                                          stats=kwargs.get('stats'))
+        finally:
+            await context.close()
+
+    if pool is not None:
+        app_urls = await asyncio.gather(*(collect(pool.new_context, storefront) for storefront in storefronts))
+        return dict(zip(storefronts, app_urls))
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(
+            headless=kwargs.get('headless', False),
+            slow_mo=kwargs.get('slow_mo', None)
+        )
+        app_urls = await asyncio.gather(*(collect(browser.new_context, storefront) for storefront in storefronts))
+        await browser.close()
+    return dict(zip(storefronts, app_urls))
+
+
+def collect_storefront_app_urls(company_url: str, storefronts: list[str], pool: AsyncBrowserPool = None,
+                                **kwargs) -> dict[str, list[str]]:
+    coro = _collect_storefront_app_urls(company_url=company_url, storefronts=storefronts, pool=pool, **kwargs)
+    if pool is not None:
+        return pool.run(coro)
+    # run apart from the caller's thread, which may already be driving the sync playwright loop
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+_DONE = object()
+
+
+def iter_app_infos(app_urls: list[str], workers: int = 4, **kwargs) -> Iterator[Tuple[int, dict]]:
+    # the event loop runs in its own thread, results are handed over as soon as each app is crawled
+    results = SimpleQueue()
+
+    def run():
+        on_result = lambda idx, app_url, app_data: results.put((idx, app_data))
+        try:
+            if kwargs.get('pool') is not None:
+                kwargs['pool'].run(_crawl_app_infos(app_urls=app_urls, workers=workers, on_result=on_result, **kwargs))
+            else:
+                crawl_app_infos(app_urls=app_urls, workers=workers, on_result=on_result, **kwargs)
+        except BaseException as e:
+            results.put(e)
+        else:
+            results.put(_DONE)
+
+    thread = Thread(target=run, daemon=True)
+    thread.start()
+    while (item := results.get()) is not _DONE:
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+    thread.join()
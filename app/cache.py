@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from os.path import join as join_path
+from typing import Optional, Mapping
+
+DEFAULT_MAX_AGE_S = 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 100_000
+
+
+def hash_html(html: str) -> str:
+    return hashlib.sha256(html.encode('utf-8')).hexdigest()
+
+
+@dataclass
+class CacheEntry:
+    storefront: str
+    app_id: str
+    result: dict
+    html_hash: Optional[str]
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+    def age_s(self, now: float = None) -> float:
+        return (now or time.time()) - self.fetched_at
+
+    def conditional_headers(self) -> dict:
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class PageCache:
+    def __init__(self, cache_dir: str, max_age_s: float = DEFAULT_MAX_AGE_S,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = join_path(cache_dir, 'pages.sqlite3')
+        self.max_age_s = max_age_s
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS app_pages (
+                storefront TEXT NOT NULL,
+                app_id TEXT NOT NULL,
+                result TEXT NOT NULL,
+                html_hash TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (storefront, app_id)
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS app_pages_accessed_at ON app_pages (accessed_at)')
+        # an app keeps its developer, so these entries never expire
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS app_developers (
+                storefront TEXT NOT NULL,
+                app_id TEXT NOT NULL,
+                developer_url TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (storefront, app_id)
+            )
+        ''')
+        self.conn.commit()
+
+    def __len__(self) -> int:
+        return self.conn.execute('SELECT COUNT(*) FROM app_pages').fetchone()[0]
+
+    def get(self, storefront: str, app_id: str) -> Optional[CacheEntry]:
+        row = self.conn.execute(
+            'SELECT result, html_hash, etag, last_modified, fetched_at FROM app_pages '
+            'WHERE storefront = ? AND app_id = ?', (storefront, app_id)).fetchone()
+        if row is None:
+            return None
+        self.conn.execute('UPDATE app_pages SET accessed_at = ? WHERE storefront = ? AND app_id = ?',
+                          (time.time(), storefront, app_id))
+        self.conn.commit()
+        result, html_hash, etag, last_modified, fetched_at = row
+        return CacheEntry(storefront=storefront, app_id=app_id, result=json.loads(result), html_hash=html_hash,
+                          etag=etag, last_modified=last_modified, fetched_at=fetched_at)
+
+    def is_fresh(self, entry: CacheEntry, now: float = None) -> bool:
+        return self.max_age_s is None or entry.age_s(now) < self.max_age_s
+
+    def put(self, storefront: str, app_id: str, result: dict, html_hash: str = None,
+            headers: Mapping[str, str] = None):
+        headers = {key.lower(): value for key, value in (headers or {}).items()}
+        now = time.time()
+        self.conn.execute(
+            'INSERT OR REPLACE INTO app_pages '
+            '(storefront, app_id, result, html_hash, etag, last_modified, fetched_at, accessed_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (storefront, app_id, json.dumps(result), html_hash, headers.get('etag'), headers.get('last-modified'),
+             now, now))
+        self.evict()
+
+    def touch(self, storefront: str, app_id: str):
+        # the page was revalidated, so its result is fresh again
+        now = time.time()
+        self.conn.execute('UPDATE app_pages SET fetched_at = ?, accessed_at = ? WHERE storefront = ? AND app_id = ?',
+                          (now, now, storefront, app_id))
+        self.conn.commit()
+
+    def evict(self):
+        # drop the least recently used entries above max_entries
+        self.conn.execute(
+            'DELETE FROM app_pages WHERE rowid IN '
+            '(SELECT rowid FROM app_pages ORDER BY accessed_at DESC, rowid DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,))
+        self.conn.commit()
+
+    def get_developer_url(self, storefront: str, app_id: str) -> Optional[str]:
+        row = self.conn.execute('SELECT developer_url FROM app_developers WHERE storefront = ? AND app_id = ?',
+                                (storefront, app_id)).fetchone()
+        return row[0] if row else None
+
+    def put_developer_url(self, storefront: str, app_id: str, developer_url: str):
+        self.conn.execute(
+            'INSERT OR REPLACE INTO app_developers (storefront, app_id, developer_url, fetched_at) VALUES (?, ?, ?, ?)',
+            (storefront, app_id, developer_url, time.time()))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self) -> 'PageCache':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
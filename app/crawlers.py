@@ -1,15 +1,34 @@
 import json
+import sys
 import time
-from functools import lru_cache
+import uuid
+from contextlib import ExitStack
 from random import randint
-from typing import Dict, Tuple, Any, Union
-
-from bs4 import PageElement
-from playwright.sync_api import Page, sync_playwright, Browser, BrowserContext, Locator
-
-from app.parsers import AppInfoParser
-from app.utils import get_delay_ms, get_delay_s, is_app_url, get_developer_name_from_company_url, calc_likelihood, \
-    is_company_url, get_best_matching_text, IS_MAC
+from typing import Tuple, Any, Iterator, Iterable
+
+from playwright.sync_api import Page, BrowserContext, Locator, Error as PlaywrightError, \
+    TimeoutError as PlaywrightTimeoutError
+
+from app.archive import PageArchive
+from app.async_crawlers import iter_app_infos, collect_storefront_app_urls
+from app.cache import PageCache, DEFAULT_MAX_AGE_S, hash_html
+from app.discovery import DEFAULT_DISCOVERY, OBSERVER_DISCOVERY_JS, OBSERVER_OPTIONS, DiscoveryStats, \
+    check_discovery_profile
+from app.fetch import DEFAULT_FETCH_ENGINE, DEFAULT_HTTP_WORKERS, check_fetch_engine, is_complete, iter_http_apps, \
+    open_http_client
+from app.frontier import Frontier, BloomFilter, DEFAULT_POLITENESS_S, DEFAULT_SEEN_CAPACITY
+from app.journal import CrawlJournal, JournalState, load_journal
+from app.pacing import Pacer, ThrottledError, THROTTLE_STATUSES, DEFAULT_RATE, DEFAULT_MAX_RATE, DEFAULT_RETRIES, \
+    retry
+from app.parsers import StructuredAppInfoParser
+from app.pipeline import iter_parsed_apps
+from app.pool import BrowserPool, AsyncBrowserPool, DEFAULT_RECYCLE_AFTER
+from app.routing import DEFAULT_BLOCK_PROFILE, RouteStats, get_block_profile
+from app.storefronts import merge_storefront_app_urls, check_storefronts
+from app.tracing import span, count
+from app.utils import get_delay_ms, get_delay_s, is_app_url, get_developer_name_from_company_url, \
+    is_company_url, get_best_matching_text, IS_MAC, get_app_id_from_app_url, get_storefront_from_url, get_url_key
+from app.workqueue import WorkQueue
 
 
 def _is_end_of_page(page: Page) -> Tuple[bool, Any]:
@@ -18,7 +37,7 @@ def _is_end_of_page(page: Page) -> Tuple[bool, Any]:
     return scroll_position >= page_height, scroll_position
 
 
-def discover_page(page: Page):
+def _discover_page_like_human(page: Page):
     last_pos = 0
     while True:
         page.mouse.wheel(delta_x=0, delta_y=randint(300, 900))
@@ -29,42 +48,150 @@ def discover_page(page: Page):
         last_pos = pos
 
 
-def collect_app_html(page: Page, app_url: str) -> str:
+def discover_page(page: Page, profile: str = DEFAULT_DISCOVERY, stats: DiscoveryStats = None) -> float:
+    check_discovery_profile(profile)
+    start = time.perf_counter()
+    with span(f'discover.{profile}'):
+        if profile == 'observer':
+            page.evaluate(OBSERVER_DISCOVERY_JS, OBSERVER_OPTIONS)
+        else:
+            _discover_page_like_human(page)
+    elapsed_s = time.perf_counter() - start
+    if stats:
+        stats.record(page.url, elapsed_s)
+    return elapsed_s
+
+
+def paced_goto(page: Page, url: str, pacer: Pacer = None, **kwargs):
+    if pacer is None:
+        return page.goto(url, **kwargs)
+
+    # every navigation takes a token, and its latency and status steer the pace of the next ones
+    pacer.acquire()
+    start = time.perf_counter()
+    try:
+        response = page.goto(url, **kwargs)
+    except PlaywrightTimeoutError:
+        pacer.record(time.perf_counter() - start, timeout=True)
+        raise
+    status = response.status if response else None
+    pacer.record(time.perf_counter() - start, status=status)
+    if status in THROTTLE_STATUSES:
+        raise ThrottledError(url, status)
+    return response
+
+
+def collect_app_html(page: Page, app_url: str, discovery: str = DEFAULT_DISCOVERY,
+                     stats: DiscoveryStats = None, pacer: Pacer = None) -> str:
     assert is_app_url(app_url)
 
     page.bring_to_front()
-    page.goto(app_url)
-    page.wait_for_selector(selector="#ember3", state="visible")
+    with span('app.goto'):
+        paced_goto(page, app_url, pacer=pacer)
+    with span('app.wait_header'):
+        page.wait_for_selector(selector="#ember3", state="visible")
 
-    discover_page(page)
+    discover_page(page, profile=discovery, stats=stats)
 
     # discovery info_list
     info_list = page.locator(selector=".information-list.information-list--app")
     info_list.scroll_into_view_if_needed()
 
     # expand languages if necessary
-    language_dd_ele = info_list.locator("div", has_text="Languages").locator("dd")
-    btn_ele = language_dd_ele.locator("button", has_text="more")
-    if btn_ele.count() > 0:
-        btn_ele.click(delay=get_delay_ms())
-        btn_ele.wait_for(state="hidden")
+    with span('app.expand_languages'):
+        language_dd_ele = info_list.locator("div", has_text="Languages").locator("dd")
+        btn_ele = language_dd_ele.locator("button", has_text="more")
+        if btn_ele.count() > 0:
+            btn_ele.click(delay=get_delay_ms())
+            btn_ele.wait_for(state="hidden")
 
-    return page.content()
+    with span('app.content'):
+        return page.content()
 
 
-def craw_app_info(page: Page, app_url: str) -> dict:
-    html = collect_app_html(page=page, app_url=app_url)
-    parser = AppInfoParser(html=html)
+def craw_app_info(page: Page, app_url: str, discovery: str = DEFAULT_DISCOVERY, stats: DiscoveryStats = None,
+                  pacer: Pacer = None) -> dict:
+    html = collect_app_html(page=page, app_url=app_url, discovery=discovery, stats=stats, pacer=pacer)
+    parser = StructuredAppInfoParser(html=html)
     return parser.parse()
 
 
-def collect_company_urls(ctx: BrowserContext, company_name: str) -> dict[str:str]:
+def resolve_developer_url(ctx: BrowserContext, app_url: str, cache: PageCache = None,
+                          pacer: Pacer = None) -> str | None:
+    storefront, app_id = get_storefront_from_url(app_url), get_app_id_from_app_url(app_url)
+    if cache is not None:
+        developer_url = cache.get_developer_url(storefront=storefront, app_id=app_id)
+        if developer_url:
+            count('developer.cache_hits')
+            return developer_url
+
+    # the app page is served with its structured data, so a plain request is enough to learn the developer
+    with span('search.resolve_developer'):
+        if pacer:
+            pacer.acquire()
+        start = time.perf_counter()
+        try:
+            response = ctx.request.get(app_url, fail_on_status_code=False)
+        except PlaywrightError as e:
+            # dns, tls, timeout or reset, the caller opens the app page in a tab instead
+            if pacer:
+                pacer.record(time.perf_counter() - start, timeout=True)
+            count('developer.request_errors')
+            print(f'=> Failed to request {app_url}: {e!r}', file=sys.stderr)
+            return None
+        if pacer:
+            pacer.record(time.perf_counter() - start, status=response.status)
+        try:
+            if not response.ok:
+                return None
+            developer_url = StructuredAppInfoParser(html=response.text()).parse_developer_url()
+        finally:
+            response.dispose()
+    if not developer_url or not is_company_url(developer_url):
+        return None
+
+    if cache is not None:
+        cache.put_developer_url(storefront=storefront, app_id=app_id, developer_url=developer_url)
+    return developer_url
+
+
+def _resolve_developer_url_in_tab(ctx: BrowserContext, page: Page, link_ele: Locator, pacer: Pacer = None) -> str:
+    count('search.developer_tabs')
+    link_ele.scroll_into_view_if_needed()
+
+    # go to the item page
+    with ctx.expect_page() as item_page_info:
+        link_ele.hover()
+        key = "Meta" if IS_MAC else "Control"
+        page.keyboard.down(key=key)
+        if pacer:
+            pacer.acquire()
+        link_ele.click(delay=get_delay_ms())
+        page.keyboard.up(key=key)
+        if not pacer:
+            time.sleep(get_delay_s(min_val=0.7, max_val=2, resolution=9))
+
+    item_page = item_page_info.value
+    item_page.bring_to_front()
+    company_ele = item_page.locator(selector='h2.product-header__identity.app-header__identity')\
+        .locator("a")
+    company_ele.wait_for(state="attached")
+    company_url = company_ele.get_attribute('href')
+    item_page.close()
+    return company_url
+
+
+def collect_company_urls(ctx: BrowserContext, company_name: str, discovery: str = DEFAULT_DISCOVERY,
+                         stats: DiscoveryStats = None, accept_region: bool = True,
+                         cache: PageCache = None, pacer: Pacer = None) -> dict[str:str]:
     page = ctx.new_page()
-    page.goto('https://apps.apple.com')
+    with span('search.landing'):
+        paced_goto(page, 'https://apps.apple.com', pacer=pacer)
 
-    # accept regional redirection
-    continue_btn = page.wait_for_selector(selector="#ac-ls-continue", state="visible")
-    continue_btn.click(delay=get_delay_ms())
+        # accept regional redirection, a warm context remembers the choice
+        if accept_region:
+            continue_btn = page.wait_for_selector(selector="#ac-ls-continue", state="visible")
+            continue_btn.click(delay=get_delay_ms())
 
     # page discovery behavior
     page.mouse.wheel(delta_x=0, delta_y=randint(100, 500))
@@ -74,22 +201,26 @@ def collect_company_urls(ctx: BrowserContext, company_name: str) -> dict[str:str
     search_button.scroll_into_view_if_needed()
     search_box = page.get_by_placeholder("Search apple.com")
 
-    while search_box.is_hidden():
-        search_button.hover()
-        search_button.click(delay=get_delay_ms())
-        time.sleep(get_delay_s())
+    with span('search.query'):
+        while search_box.is_hidden():
+            search_button.hover()
+            search_button.click(delay=get_delay_ms())
+            time.sleep(get_delay_s())
 
-    search_box.click(delay=get_delay_ms())
-    search_box.type(text=company_name, delay=get_delay_ms(min_val=100, max_val=300))
-    search_box.press(key="Enter", delay=300)
+        search_box.click(delay=get_delay_ms())
+        search_box.type(text=company_name, delay=get_delay_ms(min_val=100, max_val=300))
+        search_box.press(key="Enter", delay=300)
 
     # iterate through result pages, and get company urls
     company_data = {}
-    visited_links = []
+    visited_links = set()
+    resolved_app_ids = set()
     while True:
-        page.wait_for_load_state(state="networkidle")
+        count('search.result_pages')
+        with span('search.wait_results'):
+            page.wait_for_load_state(state="networkidle")
 
-        discover_page(page)
+        discover_page(page, profile=discovery, stats=stats)
 
         # iterate each line
         search_result = page.locator(selector="#exploreCurated").first
@@ -99,30 +230,25 @@ def collect_company_urls(ctx: BrowserContext, company_name: str) -> dict[str:str
             link = link_ele.get_attribute('href')
             if link in visited_links:
                 continue
-            visited_links.append(link)
-            if is_app_url(link):
-                link_ele.scroll_into_view_if_needed()
-
-                # go to the item page
-                with ctx.expect_page() as item_page_info:
-                    link_ele.hover()
-                    key = "Meta" if IS_MAC else "Control"
-                    page.keyboard.down(key=key)
-                    link_ele.click(delay=get_delay_ms())
-                    page.keyboard.up(key=key)
-                    time.sleep(get_delay_s(min_val=0.7, max_val=2, resolution=9))
+            visited_links.add(link)
+            if not is_app_url(link):
+                continue
 
-                item_page = item_page_info.value
-                item_page.bring_to_front()
-                company_ele = item_page.locator(selector='h2.product-header__identity.app-header__identity')\
-                    .locator("a")
-                company_ele.wait_for(state="attached")
-                company_url = company_ele.get_attribute('href')
-                company_data[get_developer_name_from_company_url(company_url)] = company_url
-                item_page.close()
+            # the same app shows up under several links, each app is resolved once
+            app_id = get_app_id_from_app_url(link)
+            if app_id in resolved_app_ids:
+                continue
+            resolved_app_ids.add(app_id)
+
+            company_url = resolve_developer_url(ctx=ctx, app_url=link, cache=cache, pacer=pacer)
+            if company_url is None:
+                company_url = _resolve_developer_url_in_tab(ctx=ctx, page=page, link_ele=link_ele, pacer=pacer)
+            company_data[get_developer_name_from_company_url(company_url)] = company_url
 
         next_btn = page.locator(selector="#explore nav.rc-pagination div.rc-pagination-arrow > button", has_text="Next")
         if next_btn.count() > 0:
+            if pacer:
+                pacer.acquire()
             next_btn.click(delay=get_delay_ms())
             continue
 
@@ -132,21 +258,32 @@ def collect_company_urls(ctx: BrowserContext, company_name: str) -> dict[str:str
     return company_data
 
 
-def collect_app_urls(ctx: BrowserContext, company_url: str) -> list[str]:
+def collect_app_urls(ctx: BrowserContext, company_url: str, discovery: str = DEFAULT_DISCOVERY,
+                     stats: DiscoveryStats = None, pacer: Pacer = None) -> list[str]:
     assert is_company_url(company_url)
 
+    # an app listed in several sections, e.g. both iPhone and iPad, is collected once
+    seen_keys = set()
+
     def check_and_save_link(link_ele_list_: list[Locator]) -> list[str]:
         ans = []
         for link_ele_ in link_ele_list_:
             link_ = link_ele_.get_attribute('href')
-            if is_app_url(link_):
-                ans.append(link_)
+            if not is_app_url(link_):
+                continue
+            key_ = get_url_key(link_)
+            if key_ in seen_keys:
+                count('developer.duplicate_links')
+                continue
+            seen_keys.add(key_)
+            ans.append(link_)
         return ans
 
     page = ctx.new_page()
-    page.goto(company_url, wait_until="load")
+    with span('developer.goto'):
+        paced_goto(page, company_url, pacer=pacer, wait_until="load")
 
-    discover_page(page)
+    discover_page(page, profile=discovery, stats=stats)
 
     app_urls = []
 
@@ -161,13 +298,18 @@ def collect_app_urls(ctx: BrowserContext, company_url: str) -> list[str]:
                 see_all_btn.hover()
                 key = "Meta" if IS_MAC else "Control"
                 page.keyboard.down(key=key)
+                if pacer:
+                    pacer.acquire()
                 see_all_btn.click(delay=get_delay_ms())
                 page.keyboard.up(key=key)
-                time.sleep(get_delay_s(min_val=0.7, max_val=2, resolution=9))
+                # without a pacer, a random pause stands in for it
+                if not pacer:
+                    time.sleep(get_delay_s(min_val=0.7, max_val=2, resolution=9))
 
             detail_page = detail_page_info.value
             detail_page.bring_to_front()
-            discover_page(detail_page)
+            count('developer.see_all_pages')
+            discover_page(detail_page, profile=discovery, stats=stats)
 
             link_ele_list = detail_page.locator(selector='div.l-row[role="feed"] > a').all()
             app_urls += check_and_save_link(link_ele_list)
@@ -181,41 +323,359 @@ def collect_app_urls(ctx: BrowserContext, company_url: str) -> list[str]:
     return app_urls
 
 
-def crawl_company_apps(company_name: str, **kwargs) -> dict[str:Union[str, list]]:
-    log = ...
+def lookup_cached_apps(ctx: BrowserContext, cache: PageCache, app_urls: list[str | None],
+                       pacer: Pacer = None) -> dict[int, dict]:
+    results = {}
+    for idx, app_url in enumerate(app_urls):
+        if app_url is None:
+            continue
+        storefront, app_id = get_storefront_from_url(app_url), get_app_id_from_app_url(app_url)
+        entry = cache.get(storefront=storefront, app_id=app_id)
+        if entry is None:
+            continue
+        if cache.is_fresh(entry):
+            count('cache.fresh')
+            results[idx] = entry.result
+            continue
+
+        # stale entries are revalidated with a conditional request instead of a page load
+        headers = entry.conditional_headers()
+        if not headers:
+            continue
+        with span('cache.revalidate'):
+            if pacer:
+                pacer.acquire()
+            start = time.perf_counter()
+            response = ctx.request.get(app_url, headers=headers, max_redirects=0, fail_on_status_code=False)
+            if pacer:
+                pacer.record(time.perf_counter() - start, status=response.status)
+        if response.status == 304:
+            count('cache.revalidated')
+            cache.touch(storefront=storefront, app_id=app_id)
+            results[idx] = entry.result
+        response.dispose()
+    return results
+
+
+def iter_company_apps(company_name: str = None, **kwargs) -> Iterator[dict]:
+    log = lambda *args, **kw: None
     if kwargs.get('print'):
         log = print
 
-    company_name = company_name.lower()
-    data = []
-    with sync_playwright() as p:
-        browser = p.chromium.launch(
-            headless=kwargs.get('headless', False),
-            slow_mo=kwargs.get('slow_mo', None)
-        )
-        context = browser.new_context()
-        page = context.new_page()
-
-        company_data = collect_company_urls(ctx=context, company_name=company_name)
-        if not company_data:
-            log(f'=> Not found any company with keyword {company_name}')
-            return data
-        log(f'=> Found companies\n{json.dumps(company_data, indent=4)}')
-
-        actual_company_name = get_best_matching_text(hint_text=company_name, texts=company_data.keys())
-        company_url = company_data[actual_company_name]
-        log(f'=> Best match name: {actual_company_name} | {company_url}')
-
-        app_urls = collect_app_urls(ctx=context, company_url=company_url)
-        log(f'=> App urls to be crawled\n{json.dumps(app_urls, indent=4)}')
-        for app_url in app_urls:
-            app_data = craw_app_info(page=page, app_url=app_url)
+    workers = kwargs.get('workers') or 1
+    parse_workers = kwargs.get('parse_workers') or 0
+    queue_path = kwargs.get('queue')
+    discovery = kwargs.get('discovery') or DEFAULT_DISCOVERY
+    check_discovery_profile(discovery)
+    discovery_stats = DiscoveryStats()
+    block_profile = get_block_profile(kwargs.get('block_profile') or DEFAULT_BLOCK_PROFILE).name
+    route_stats = RouteStats()
+    storefronts = kwargs.get('storefronts') or []
+    fetch_engine = kwargs.get('fetch_engine') or DEFAULT_FETCH_ENGINE
+    check_fetch_engine(fetch_engine)
+    http_workers = kwargs.get('http_workers') or DEFAULT_HTTP_WORKERS
+    # one pacer for every page and worker of the crawl, a batch shares it between companies
+    pacer = kwargs.get('pacer') or Pacer(rate=kwargs.get('rate') or DEFAULT_RATE,
+                                         max_rate=kwargs.get('max_rate') or DEFAULT_MAX_RATE, max_concurrency=workers)
+    retries = DEFAULT_RETRIES if kwargs.get('retries') is None else kwargs['retries']
+    # `seen` is shared by the companies of a batch, an app or developer already crawled is skipped
+    frontier = Frontier(seen=kwargs.get('seen'), politeness_s=kwargs.get('politeness_s') or DEFAULT_POLITENESS_S)
+    assert not (storefronts and (kwargs.get('resume') or kwargs.get('journal'))), \
+        'storefront availability is not recorded by the checkpoint journal'
+    assert not (kwargs.get('resume') and kwargs.get('journal')), 'a resumed crawl appends to the journal it resumes'
+
+    # response headers of app pages, later stored as cache validators
+    validators = {}
+
+    def record_validators(response):
+        if response.request.resource_type == 'document' and is_app_url(response.url):
+            validators[response.url] = response.headers
+
+    with ExitStack() as stack:
+        cache = None
+        if kwargs.get('cache_dir'):
+            cache = stack.enter_context(PageCache(cache_dir=kwargs['cache_dir'],
+                                                  max_age_s=kwargs.get('max_age_s', DEFAULT_MAX_AGE_S)))
+
+        # raw app pages are kept next to the records, so a better parser never needs a new crawl
+        archive = stack.enter_context(PageArchive(kwargs['archive'])) if kwargs.get('archive') else None
+
+        http_client = None
+        if fetch_engine != 'browser':
+            http_client = kwargs.get('http_client') or stack.enter_context(open_http_client(pool_size=http_workers))
+
+        state = JournalState()
+        journal = None
+        if kwargs.get('resume'):
+            # the caller may have read the journal already to check it
+            state = kwargs.get('resume_state') or load_journal(kwargs['resume'])
+            # a missing or empty journal would otherwise start a search for no company at all
+            if state.company_name is None:
+                raise ValueError(f'no crawl to resume in {kwargs["resume"]}, the journal is missing or has no start')
+            log(f'=> Resume from {kwargs["resume"]}, {len(state.done)} app(s) already crawled')
+        if kwargs.get('resume') or kwargs.get('journal'):
+            journal = stack.enter_context(CrawlJournal(kwargs.get('resume') or kwargs['journal']))
+
+        app_urls = []
+        # storefronts each app is available in, only filled for a multi-storefront crawl
+        availability = {}
+        results = {}
+        html_hashes = {}
+        next_idx = 0
+
+        def finish_app(idx: int, app_data: dict):
+            app_url = app_urls[idx]
             log(f'=> Craw URL {app_url}\n{json.dumps(app_data, indent=4)}')
+            if journal:
+                journal.record_app(app_url=app_url, app_data=app_data)
+            # an empty cache has no length, so it is told apart from no cache at all
+            if cache is not None:
+                cache.put(storefront=get_storefront_from_url(app_url), app_id=get_app_id_from_app_url(app_url),
+                          result=app_data, html_hash=html_hashes.get(idx), headers=validators.get(app_url))
+            results[idx] = app_data
+
+        def flush() -> Iterator[dict]:
+            # records are released in app url order, as soon as every earlier app is finished
+            nonlocal next_idx
+            while next_idx in results:
+                app_data = results.pop(next_idx)
+                next_idx += 1
+                # apps given up by the workers are left out
+                if app_data is not None and availability:
+                    yield dict(app_data, app_storefronts=availability[app_urls[next_idx - 1]])
+                elif app_data is not None:
+                    yield app_data
+
+        company_name = (company_name or state.company_name or '').lower()
+        if journal and state.company_name is None:
+            journal.record_start(company_name=company_name)
+
+        pool = kwargs.get('pool') or stack.enter_context(
+            BrowserPool(headless=kwargs.get('headless', False), slow_mo=kwargs.get('slow_mo', None),
+                        recycle_after=kwargs.get('recycle_after') or DEFAULT_RECYCLE_AFTER))
+        # app pages loaded after the context is recycled get a lease of their own
+        app_lease = stack.enter_context(ExitStack())
+        with pool.lease(block_profile=block_profile, route_stats=route_stats, response=record_validators) as context:
+            page = context.new_page()
+
+            company_url = state.company_url
+            if company_url is None:
+                company_data = collect_company_urls(ctx=context, company_name=company_name, discovery=discovery,
+                                                    stats=discovery_stats, accept_region=not pool.landed,
+                                                    cache=cache, pacer=pacer)
+                pool.landed = True
+                if not company_data:
+                    log(f'=> Not found any company with keyword {company_name}')
+                    return
+                log(f'=> Found companies\n{json.dumps(company_data, indent=4)}')
+
+                actual_company_name = get_best_matching_text(hint_text=company_name, texts=company_data.keys())
+                if actual_company_name is None:
+                    log(f'=> None of the companies found matches {company_name}')
+                    return
+                company_url = company_data[actual_company_name]
+                log(f'=> Best match name: {actual_company_name} | {company_url}')
+                if not frontier.mark(company_url):
+                    log(f'=> Developer {company_url} was already crawled')
+                    return
+                if journal:
+                    journal.record_company(company_name=company_name, company_url=company_url)
+
+            if storefronts:
+                # the developer page of every storefront is collected at once, in a browser of its own
+                with span('storefront.collect'):
+                    app_urls_by_storefront = collect_storefront_app_urls(
+                        company_url=company_url, storefronts=storefronts, pool=kwargs.get('async_pool'),
+                        headless=kwargs.get('headless', False),
+                        slow_mo=kwargs.get('slow_mo', None), discovery=discovery, stats=discovery_stats,
+                        block_profile=block_profile, route_stats=route_stats)
+                for storefront, storefront_app_urls in app_urls_by_storefront.items():
+                    log(f'=> Storefront {storefront} lists {len(storefront_app_urls)} app(s)')
+                merged_app_urls, listed = merge_storefront_app_urls(app_urls_by_storefront)
+                app_urls += [app_url for app_url in merged_app_urls if frontier.mark(app_url)]
+                listed = {app_url: listed[app_url] for app_url in app_urls}
+                availability.update(check_storefronts(ctx=context, availability=listed, storefronts=storefronts))
+            elif state.app_urls is None:
+                app_urls += [app_url for app_url in collect_app_urls(ctx=context, company_url=company_url,
+                                                                     discovery=discovery, stats=discovery_stats,
+                                                                     pacer=pacer)
+                             if frontier.mark(app_url)]
+                if journal:
+                    journal.record_frontier(app_urls=app_urls)
+            else:
+                app_urls += state.app_urls
+            log(f'=> App urls to be crawled\n{json.dumps(app_urls, indent=4)}')
+
+            results.update({idx: state.done[app_url] for idx, app_url in enumerate(app_urls) if app_url in state.done})
+            if cache is not None:
+                cached = lookup_cached_apps(ctx=context, cache=cache,
+                                            app_urls=[url if idx not in results else None
+                                                      for idx, url in enumerate(app_urls)], pacer=pacer)
+                results.update(cached)
+                log(f'=> Served {len(cached)} app(s) from cache')
+            todo = [idx for idx in range(len(app_urls)) if idx not in results]
+            yield from flush()
+
+            if http_client and todo:
+                # app pages are server rendered, they are fetched over pooled connections and only the ones missing
+                # a required field (or failing over http) are left to the browser in auto mode
+                fallback = []
+                for todo_idx, response, app_data, error in iter_http_apps(
+                        http_client, [app_urls[idx] for idx in todo], workers=http_workers, pacer=pacer,
+                        retries=retries):
+                    idx = todo[todo_idx]
+                    if response and (fetch_engine == 'http' or is_complete(app_data)):
+                        validators[app_urls[idx]] = response.headers
+                        html_hashes[idx] = hash_html(response.html)
+                        if archive:
+                            archive.put(app_urls[idx], response.html, digest=html_hashes[idx])
+                        finish_app(idx, app_data)
+                    elif fetch_engine == 'http':
+                        log(f'=> Gave up on {app_urls[idx]}: {error!r}')
+                        results[idx] = None
+                    else:
+                        count('fetch.browser_fallbacks')
+                        fallback.append(idx)
+                    yield from flush()
+                log(f'=> Fetched {len(todo) - len(fallback)} app page(s) over http, {http_client.summary()}, '
+                    f'{len(fallback)} left to the browser')
+                todo = sorted(fallback)
+
+            def fetch_html(idx: int) -> str:
+                nonlocal page
+                if pool.needs_recycle():
+                    # a developer with more app pages than recycle_after does not keep one context for all of them
+                    app_lease.close()
+                    pool.recycle()
+                    page = app_lease.enter_context(pool.lease(block_profile=block_profile, route_stats=route_stats,
+                                                              response=record_validators)).new_page()
+                # a failed or throttled app page is retried after an exponential backoff with jitter
+                html = retry(lambda: collect_app_html(page=page, app_url=app_urls[idx], discovery=discovery,
+                                                      stats=discovery_stats, pacer=pacer),
+                             retries=retries, retry_on=(PlaywrightError, ThrottledError), pacer=pacer)
+                html_hashes[idx] = hash_html(html)
+                if archive:
+                    archive.put(app_urls[idx], html, digest=html_hashes[idx])
+                return html
+
+            def iter_todo() -> Iterator[int]:
+                # the frontier hands app pages out in order, at most one page load per host every politeness_s
+                todo_by_url = {}
+                for idx in todo:
+                    todo_by_url.setdefault(app_urls[idx], []).append(idx)
+                for app_url, indices in todo_by_url.items():
+                    frontier.push(app_url, priority=indices[0], dedupe=False)
+                while (app_url := frontier.wait()) is not None:
+                    try:
+                        yield from todo_by_url[app_url]
+                    finally:
+                        frontier.release(app_url)
+
+            crawl_here = workers == 1 and not queue_path
+            if crawl_here and parse_workers:
+                # the browser keeps fetching while a process pool parses the pages already fetched
+                pages = ((idx, fetch_html(idx)) for idx in iter_todo())
+                for idx, app_data in iter_parsed_apps(pages, workers=parse_workers):
+                    if app_data is None:
+                        results[idx] = None
+                    else:
+                        finish_app(idx, app_data)
+                    yield from flush()
+            elif crawl_here:
+                for idx in iter_todo():
+                    finish_app(idx, StructuredAppInfoParser(html=fetch_html(idx)).parse())
+                    yield from flush()
+
+            if kwargs.get('headless') and kwargs.get('delay_close_s'):
+                page.wait_for_timeout(kwargs['delay_close_s'])
+
+        if queue_path and todo:
+            # worker processes crawl the app pages, this process only hands them out and collects the results
+            queue = stack.enter_context(WorkQueue(queue_path))
+            job = company_url
+            todo_by_url = {}
+            for idx in todo:
+                todo_by_url.setdefault(app_urls[idx], []).append(idx)
+            # pages a previous crawl of the company left in the queue are crawled again, not served from it
+            run = uuid.uuid4().hex
+            queue.enqueue(job, todo_by_url, run=run)
+            log(f'=> Queued {len(todo_by_url)} app(s) in {queue_path} for job {job}, waiting for workers')
+            for app_url, app_data, error in queue.iter_finished(job, run=run):
+                if app_data is None:
+                    log(f'=> Gave up on {app_url}: {error}')
+                for idx in todo_by_url.get(app_url, []):
+                    if app_data is None:
+                        results[idx] = None
+                    else:
+                        finish_app(idx, app_data)
+                yield from flush()
+        elif workers > 1 and todo:
+            # the async api cannot run inside the sync playwright loop, so app pages are crawled in its own thread
+            for todo_idx, app_data in iter_app_infos(
+                app_urls=[app_urls[idx] for idx in todo],
+                workers=workers,
+                pool=kwargs.get('async_pool'),
+                headless=kwargs.get('headless', False),
+                slow_mo=kwargs.get('slow_mo', None),
+                on_response=record_validators,
+                discovery=discovery,
+                stats=discovery_stats,
+                block_profile=block_profile,
+                route_stats=route_stats,
+                pacer=pacer,
+                retries=retries
+            ):
+                finish_app(todo[todo_idx], app_data)
+                yield from flush()
+
+        log(f'=> Page discovery ({discovery}): {discovery_stats.summary()}\n'
+            f'{json.dumps(discovery_stats.per_page(), indent=4)}')
+        log(f'=> Traffic ({block_profile}): {route_stats.summary()}\n{json.dumps(route_stats.pages, indent=4)}')
+        log(f'=> Pacing: {pacer.summary()}')
+
+
+def crawl_company_apps(company_name: str = None, **kwargs) -> list[dict]:
+    return list(iter_company_apps(company_name=company_name, **kwargs))
+
+
+def read_company_names(lines: Iterable[str]) -> list[str]:
+    names = (line.strip() for line in lines)
+    return [name for name in names if name and not name.startswith('#')]
+
+
+def iter_batch_apps(company_names: Iterable[str], **kwargs) -> Iterator[dict]:
+    log = lambda *args, **kw: None
+    if kwargs.get('print'):
+        log = print
 
-            data.append(app_data)
-
-        if kwargs.get('headless') and kwargs.get('delay_close_s'):
-            page.wait_for_timeout(kwargs['delay_close_s'])
-        browser.close()
-
-    return data
+    # developers and apps already crawled for an earlier company are skipped, in a fixed amount of memory
+    seen = BloomFilter(capacity=kwargs.get('seen_capacity') or DEFAULT_SEEN_CAPACITY)
+    pacer = kwargs.pop('pacer', None) or Pacer(rate=kwargs.get('rate') or DEFAULT_RATE,
+                                               max_rate=kwargs.get('max_rate') or DEFAULT_MAX_RATE,
+                                               max_concurrency=kwargs.get('workers') or 1)
+    fetch_engine = kwargs.get('fetch_engine') or DEFAULT_FETCH_ENGINE
+    check_fetch_engine(fetch_engine)
+
+    # one warm browser serves every company, its context is recycled after `recycle_after` page loads.
+    # the concurrent crawls (-w > 1, --storefronts) share a warm async browser as well
+    headless, slow_mo = kwargs.get('headless', False), kwargs.get('slow_mo', None)
+    with BrowserPool(headless=headless, slow_mo=slow_mo,
+                     recycle_after=kwargs.get('recycle_after') or DEFAULT_RECYCLE_AFTER) as pool, \
+            AsyncBrowserPool(headless=headless, slow_mo=slow_mo) as async_pool, ExitStack() as stack:
+        # the http connections are kept alive from one company to the next as well
+        http_client = None
+        if fetch_engine != 'browser':
+            http_client = stack.enter_context(open_http_client(pool_size=kwargs.get('http_workers')
+                                                               or DEFAULT_HTTP_WORKERS))
+        for company_name in company_names:
+            log(f'=> Batch crawl {company_name}')
+            try:
+                for app_data in iter_company_apps(company_name=company_name, pool=pool, async_pool=async_pool,
+                                                  seen=seen, pacer=pacer, http_client=http_client, **kwargs):
+                    yield dict(company_name=company_name, **app_data)
+            except Exception as e:
+                print(f'=> Failed to crawl {company_name}: {e!r}', file=sys.stderr)
+        log(f'=> Browser pool: {pool.summary()}')
+        if async_pool.contexts:
+            log(f'=> Async browser pool: {async_pool.summary()}')
+        log(f'=> Pacing: {pacer.summary()}')
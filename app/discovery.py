@@ -0,0 +1,75 @@
+from statistics import median
+from threading import Lock
+
+DISCOVERY_PROFILES = ('observer', 'human')
+DEFAULT_DISCOVERY = 'observer'
+
+# scrolls through the page in one round trip, resolving once the bottom sentinel is visible
+# and lazy content has stopped mutating the DOM for `quietMs`
+OBSERVER_DISCOVERY_JS = '''
+async ({quietMs, timeoutMs}) => {
+    const started = performance.now();
+    let lastChange = started;
+    let atBottom = false;
+    const sentinel = document.createElement('div');
+    document.body.appendChild(sentinel);
+
+    const mutations = new MutationObserver(() => { lastChange = performance.now(); });
+    mutations.observe(document.body, {childList: true, subtree: true});
+    const bottom = new IntersectionObserver((entries) => {
+        atBottom = entries.some((entry) => entry.isIntersecting);
+    });
+    bottom.observe(sentinel);
+
+    try {
+        while (performance.now() - started < timeoutMs) {
+            if (sentinel.nextSibling) {
+                document.body.appendChild(sentinel);
+            }
+            window.scrollBy(0, window.innerHeight);
+            // a background or throttled tab never runs animation frames, a plain timer still keeps the deadline
+            await Promise.race([
+                new Promise((resolve) => requestAnimationFrame(() => setTimeout(resolve, 50))),
+                new Promise((resolve) => setTimeout(resolve, 100)),
+            ]);
+            // nor intersection callbacks, the scroll position tells the bottom as well
+            atBottom = atBottom || window.scrollY + window.innerHeight >= document.documentElement.scrollHeight - 1;
+            if (atBottom && performance.now() - lastChange >= quietMs) {
+                break;
+            }
+        }
+    } finally {
+        mutations.disconnect();
+        bottom.disconnect();
+        sentinel.remove();
+    }
+    return performance.now() - started;
+}
+'''
+
+OBSERVER_OPTIONS = dict(quietMs=300, timeoutMs=10000)
+
+
+def check_discovery_profile(profile: str):
+    if profile not in DISCOVERY_PROFILES:
+        raise ValueError(f'unknown discovery profile {profile}, expected one of {list(DISCOVERY_PROFILES)}')
+
+
+class DiscoveryStats:
+    def __init__(self):
+        self.timings: list[tuple[str, float]] = []
+        self._lock = Lock()
+
+    def record(self, url: str, elapsed_s: float):
+        with self._lock:
+            self.timings.append((url, elapsed_s))
+
+    def per_page(self) -> dict[str, float]:
+        return {url: round(elapsed_s, 3) for url, elapsed_s in self.timings}
+
+    def summary(self) -> str:
+        if not self.timings:
+            return 'no page discovered'
+        values = [elapsed_s for _, elapsed_s in self.timings]
+        return (f'{len(values)} page(s), total {sum(values):.2f}s, '
+                f'median {median(values):.2f}s, max {max(values):.2f}s')
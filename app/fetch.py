@@ -0,0 +1,260 @@
+import gzip
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from functools import lru_cache
+from importlib.util import find_spec
+from queue import LifoQueue, Empty, Full
+from typing import Callable, Iterator, Optional, Tuple, TYPE_CHECKING
+from urllib.parse import urlsplit, urljoin
+
+from app.pacing import Pacer, ThrottledError, THROTTLE_STATUSES, DEFAULT_RETRIES, retry
+from app.tracing import span, count
+
+FETCH_ENGINES = ('browser', 'http', 'auto')
+DEFAULT_FETCH_ENGINE = 'browser'
+DEFAULT_HTTP_WORKERS = 8
+DEFAULT_HTTP_TIMEOUT_S = 30.0
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+# fields an app record cannot do without, a page missing one of them is loaded again in the browser
+REQUIRED_FIELDS = ('app_name', 'app_id', 'app_url', 'app_targets')
+
+USER_AGENT = ('Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) '
+              'Chrome/120.0.0.0 Safari/537.36')
+HEADERS = {'User-Agent': USER_AGENT, 'Accept': 'text/html,application/xhtml+xml', 'Accept-Language': 'en-US,en'}
+
+DECODERS: dict[str, Callable[[bytes], bytes]] = dict(
+    gzip=gzip.decompress,
+    deflate=zlib.decompress,
+)
+
+# brotli is optional, only asked for when it can be decoded
+if find_spec('brotli') is not None:
+    import brotli
+
+    DECODERS['br'] = brotli.decompress
+
+# http.client (with ssl and email) and httpx are loaded by the first request, not by the cli at startup
+if TYPE_CHECKING:
+    import http.client
+
+
+class FetchError(Exception):
+    def __init__(self, url: str, status: int):
+        super().__init__(f'{url} answered {status}')
+        self.url = url
+        self.status = status
+
+
+@dataclass
+class HttpResponse:
+    url: str
+    status: int
+    headers: dict[str, str]
+    html: str
+
+
+@lru_cache(maxsize=None)
+def get_http_errors() -> tuple:
+    import http.client
+
+    errors = (OSError, http.client.HTTPException)
+    # httpx is optional, it brings http/2 when h2 is installed as well
+    if find_spec('httpx') is not None:
+        import httpx
+
+        errors += (httpx.HTTPError,)
+    return errors
+
+
+def decode_body(body: bytes, headers: dict[str, str]) -> str:
+    for encoding in reversed([value.strip() for value in headers.get('content-encoding', '').split(',')]):
+        if encoding in DECODERS:
+            body = DECODERS[encoding](body)
+        elif encoding not in ('', 'identity'):
+            raise ValueError(f'unsupported content encoding {encoding}')
+    charset = headers.get('content-type', '').partition('charset=')[2].split(';')[0].strip()
+    return body.decode(charset or 'utf-8', errors='replace')
+
+
+class HttpClient:
+    # keep-alive http/1.1 connections pooled per host, a thread takes one out and puts it back once the body is read
+    def __init__(self, pool_size: int = DEFAULT_HTTP_WORKERS, timeout_s: float = DEFAULT_HTTP_TIMEOUT_S):
+        assert pool_size > 0, 'invalid connection pool size'
+        self.pool_size = pool_size
+        self.timeout_s = timeout_s
+        self.headers = dict(HEADERS, **{'Accept-Encoding': ', '.join(DECODERS)})
+        self.connections = 0
+        self.requests = 0
+        self._pools: dict[Tuple[str, str], LifoQueue] = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, scheme: str, host: str) -> LifoQueue:
+        with self._lock:
+            return self._pools.setdefault((scheme, host), LifoQueue(maxsize=self.pool_size))
+
+    def _connect(self, scheme: str, host: str) -> 'http.client.HTTPConnection':
+        import http.client
+
+        with self._lock:
+            self.connections += 1
+        count('fetch.connections')
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, timeout=self.timeout_s)
+        return http.client.HTTPConnection(host, timeout=self.timeout_s)
+
+    def _request(self, url: str) -> Tuple[int, dict[str, str], bytes]:
+        parts = urlsplit(url)
+        path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        pool = self._pool(parts.scheme, parts.netloc)
+        try:
+            conn, reused = pool.get_nowait(), True
+        except Empty:
+            conn, reused = self._connect(parts.scheme, parts.netloc), False
+        try:
+            conn.request('GET', path, headers=self.headers)
+            response = conn.getresponse()
+            body = response.read()
+        except get_http_errors():
+            conn.close()
+            if not reused:
+                raise
+            # the server closed an idle connection, the request goes again over the next one
+            return self._request(url)
+        with self._lock:
+            self.requests += 1
+        headers = {name.lower(): value for name, value in response.getheaders()}
+        if response.will_close:
+            conn.close()
+        else:
+            try:
+                pool.put_nowait(conn)
+            except Full:
+                conn.close()
+        return response.status, headers, body
+
+    def get(self, url: str) -> HttpResponse:
+        for _ in range(MAX_REDIRECTS + 1):
+            status, headers, body = self._request(url)
+            if status in REDIRECT_STATUSES and headers.get('location'):
+                url = urljoin(url, headers['location'])
+                continue
+            return HttpResponse(url=url, status=status, headers=headers, html=decode_body(body, headers))
+        raise FetchError(url, status)
+
+    def summary(self) -> str:
+        return f'{self.requests} request(s) over {self.connections} connection(s)'
+
+    def close(self):
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            while not pool.empty():
+                pool.get_nowait().close()
+
+    def __enter__(self) -> 'HttpClient':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class HttpxClient:
+    def __init__(self, pool_size: int = DEFAULT_HTTP_WORKERS, timeout_s: float = DEFAULT_HTTP_TIMEOUT_S):
+        import httpx
+
+        assert pool_size > 0, 'invalid connection pool size'
+        self.http2 = find_spec('h2') is not None
+        self.requests = 0
+        # httpx negotiates gzip, deflate and br (with brotli installed) and decodes the body itself
+        self._client = httpx.Client(http2=self.http2, timeout=timeout_s, follow_redirects=True,
+                                    max_redirects=MAX_REDIRECTS, headers=HEADERS,
+                                    limits=httpx.Limits(max_connections=pool_size,
+                                                        max_keepalive_connections=pool_size))
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> HttpResponse:
+        response = self._client.get(url)
+        with self._lock:
+            self.requests += 1
+        return HttpResponse(url=str(response.url), status=response.status_code,
+                            headers={name.lower(): value for name, value in response.headers.items()},
+                            html=response.text)
+
+    def summary(self) -> str:
+        return f'{self.requests} request(s) over {"http/2" if self.http2 else "http/1.1"}'
+
+    def close(self):
+        self._client.close()
+
+    def __enter__(self) -> 'HttpxClient':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def open_http_client(pool_size: int = DEFAULT_HTTP_WORKERS,
+                     timeout_s: float = DEFAULT_HTTP_TIMEOUT_S) -> 'HttpClient | HttpxClient':
+    if find_spec('httpx') is not None:
+        return HttpxClient(pool_size=pool_size, timeout_s=timeout_s)
+    return HttpClient(pool_size=pool_size, timeout_s=timeout_s)
+
+
+def check_fetch_engine(engine: str):
+    if engine not in FETCH_ENGINES:
+        raise ValueError(f'unknown fetch engine {engine}, expected one of {FETCH_ENGINES}')
+
+
+def is_complete(app_data: dict) -> bool:
+    return all(app_data.get(field) for field in REQUIRED_FIELDS) and app_data['app_id'] != 'id'
+
+
+def fetch_app_page(client: 'HttpClient | HttpxClient', app_url: str, pacer: Pacer = None) -> HttpResponse:
+    if pacer:
+        pacer.acquire()
+    start = time.perf_counter()
+    with span('fetch.http'):
+        try:
+            response = client.get(app_url)
+        except get_http_errors():
+            if pacer:
+                pacer.record(time.perf_counter() - start, timeout=True)
+            raise
+    if pacer:
+        pacer.record(time.perf_counter() - start, status=response.status)
+    if response.status in THROTTLE_STATUSES:
+        raise ThrottledError(app_url, response.status)
+    if response.status != 200:
+        raise FetchError(app_url, response.status)
+    count('fetch.http_pages')
+    return response
+
+
+def iter_http_apps(client: 'HttpClient | HttpxClient', app_urls: list[str], workers: int = DEFAULT_HTTP_WORKERS,
+                   pacer: Pacer = None, retries: int = DEFAULT_RETRIES
+                   ) -> Iterator[Tuple[int, Optional[HttpResponse], Optional[dict], Optional[Exception]]]:
+    from app.parsers import StructuredAppInfoParser
+
+    # at most `workers` requests in flight, results come back as they finish with the position of their url.
+    # the body is not fed through StreamingAppInfoParser: the whole page is kept anyway for the archive and the
+    # cache hash, a keep-alive connection has to read it to the end before it is reused, and the embedded json the
+    # structured parser reads is dropped by the streaming one, which would tokenize the full dom instead
+    def fetch(app_url: str) -> Tuple[HttpResponse, dict]:
+        response = retry(lambda: fetch_app_page(client, app_url, pacer=pacer), retries=retries,
+                         retry_on=get_http_errors() + (ThrottledError,), pacer=pacer)
+        return response, StructuredAppInfoParser(html=response.html).parse()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(fetch, app_url): idx for idx, app_url in enumerate(app_urls)}
+        for future in as_completed(futures):
+            try:
+                response, app_data = future.result()
+            except Exception as e:
+                # an undecodable body or a page the parser chokes on fails only its app, not the whole crawl
+                yield futures[future], None, None, e
+            else:
+                yield futures[future], response, app_data, None
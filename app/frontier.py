@@ -0,0 +1,116 @@
+import hashlib
+import heapq
+import math
+import time
+from itertools import count as sequence
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+
+from app.tracing import count
+from app.utils import get_url_key
+
+DEFAULT_SEEN_CAPACITY = 1_000_000
+DEFAULT_ERROR_RATE = 1e-6
+DEFAULT_POLITENESS_S = 0.0
+DEFAULT_HOST_SLOTS = 1
+BUSY_POLL_S = 0.05
+
+
+class BloomFilter:
+    def __init__(self, capacity: int = DEFAULT_SEEN_CAPACITY, error_rate: float = DEFAULT_ERROR_RATE):
+        assert capacity > 0 and 0 < error_rate < 1, 'invalid bloom filter size'
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # the optimal size for the capacity, memory stays the same however many keys are added
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str) -> list[int]:
+        # double hashing, k positions out of two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def add(self, key: str):
+        added = False
+        for pos in self._positions(key):
+            if not self.bits[pos >> 3] & (1 << (pos & 7)):
+                self.bits[pos >> 3] |= 1 << (pos & 7)
+                added = True
+        self.count += added
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class Frontier:
+    def __init__(self, seen: 'set[str] | BloomFilter' = None, politeness_s: float = DEFAULT_POLITENESS_S,
+                 slots: int = DEFAULT_HOST_SLOTS, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        assert slots > 0, 'invalid number of host slots'
+        # a plain set is exact and fine for one developer, a bloom filter bounds a catalog-wide crawl
+        self.seen = set() if seen is None else seen
+        self.politeness_s = politeness_s
+        self.slots = slots
+        self.clock = clock
+        self.sleep = sleep
+        self.duplicates = 0
+
+        self._queues: dict[str, list[tuple[float, int, str]]] = {}
+        self._in_flight: dict[str, int] = {}
+        self._ready_at: dict[str, float] = {}
+        self._sequence = sequence()
+
+    def mark(self, url: str) -> bool:
+        # false for a url whose page was already taken, under any slug, query string or section
+        key = get_url_key(url)
+        if key in self.seen:
+            self.duplicates += 1
+            count('frontier.duplicates')
+            return False
+        self.seen.add(key)
+        return True
+
+    def push(self, url: str, priority: float = 0, dedupe: bool = True) -> bool:
+        if dedupe and not self.mark(url):
+            return False
+        heapq.heappush(self._queues.setdefault(urlsplit(url).netloc, []), (priority, next(self._sequence), url))
+        return True
+
+    def _ready_hosts(self, now: float) -> list[str]:
+        return [host for host, queue in self._queues.items() if queue
+                and self._in_flight.get(host, 0) < self.slots and self._ready_at.get(host, 0) <= now]
+
+    def pop(self) -> Optional[str]:
+        # the most urgent url of the hosts with a free slot whose politeness delay is over
+        hosts = self._ready_hosts(self.clock())
+        if not hosts:
+            return None
+        host = min(hosts, key=lambda host_: self._queues[host_][0])
+        self._in_flight[host] = self._in_flight.get(host, 0) + 1
+        return heapq.heappop(self._queues[host])[2]
+
+    def release(self, url: str):
+        host = urlsplit(url).netloc
+        self._in_flight[host] = max(0, self._in_flight.get(host, 0) - 1)
+        self._ready_at[host] = self.clock() + self.politeness_s
+
+    def wait(self) -> Optional[str]:
+        # blocks until a url is ready, none once the frontier is empty
+        while len(self):
+            url = self.pop()
+            if url is not None:
+                return url
+            now = self.clock()
+            waits = [self._ready_at.get(host, 0) - now for host, queue in self._queues.items()
+                     if queue and self._in_flight.get(host, 0) < self.slots]
+            self.sleep(max(0.0, min(waits)) if waits else BUSY_POLL_S)
+        return None
+
+    def __len__(self) -> int:
+        return sum(map(len, self._queues.values()))
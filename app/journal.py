@@ -0,0 +1,107 @@
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class JournalState:
+    company_name: Optional[str] = None
+    company_url: Optional[str] = None
+    app_urls: Optional[list[str]] = None
+    done: dict[str, dict] = field(default_factory=dict)
+
+    @property
+    def remaining(self) -> list[str]:
+        return [app_url for app_url in self.app_urls or [] if app_url not in self.done]
+
+
+def load_journal(path: str) -> JournalState:
+    state = JournalState()
+    if not os.path.exists(path):
+        return state
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                # the last line may be cut off by a crash in the middle of a write
+                continue
+            if event['event'] == 'start':
+                state.company_name = event['company_name']
+            elif event['event'] == 'company':
+                state.company_name = event['company_name']
+                state.company_url = event['company_url']
+            elif event['event'] == 'frontier':
+                state.app_urls = event['app_urls']
+            elif event['event'] == 'app':
+                state.done[event['app_url']] = event['app_data']
+    return state
+
+
+class CrawlJournal:
+    def __init__(self, path: str, fsync_every: int = 20, fsync_interval_s: float = 5.0):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval_s = fsync_interval_s
+        self._drop_torn_tail(path)
+        self._file = open(path, 'a')
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    @staticmethod
+    def _drop_torn_tail(path: str):
+        # a line cut off by a crash would otherwise be glued to the next appended event
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb+') as f:
+            end = f.seek(0, os.SEEK_END)
+            pos = end
+            while pos > 0:
+                start = max(0, pos - 4096)
+                f.seek(start)
+                block = f.read(pos - start)
+                newline = block.rfind(b'\n')
+                if newline >= 0:
+                    pos = start + newline + 1
+                    break
+                pos = start
+            if pos < end:
+                f.truncate(pos)
+
+    def _append(self, event: dict, sync: bool = False):
+        self._file.write(json.dumps(event) + '\n')
+        self._unsynced += 1
+        # fsync in batches, so durability does not cost one disk flush per app
+        if sync or self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval_s:
+            self.sync()
+
+    def sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def record_start(self, company_name: str):
+        self._append(dict(event='start', company_name=company_name), sync=True)
+
+    def record_company(self, company_name: str, company_url: str):
+        self._append(dict(event='company', company_name=company_name, company_url=company_url), sync=True)
+
+    def record_frontier(self, app_urls: list[str]):
+        self._append(dict(event='frontier', app_urls=app_urls), sync=True)
+
+    def record_app(self, app_url: str, app_data: dict):
+        self._append(dict(event='app', app_url=app_url, app_data=app_data))
+
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+    def __enter__(self) -> 'CrawlJournal':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -1,24 +1,237 @@
 import argparse
 import json
+import sys
+import time
 
-from app.crawlers import crawl_company_apps
+from app.cache import DEFAULT_MAX_AGE_S
+from app.discovery import DISCOVERY_PROFILES, DEFAULT_DISCOVERY
+from app.fetch import FETCH_ENGINES, DEFAULT_FETCH_ENGINE, DEFAULT_HTTP_WORKERS
+from app.frontier import DEFAULT_POLITENESS_S
+from app.journal import load_journal
+from app.matcher import Matcher
+from app.pacing import Pacer, DEFAULT_RATE, DEFAULT_MAX_RATE, DEFAULT_RETRIES
+from app.pipeline import APP_PARSERS
+from app.pool import DEFAULT_RECYCLE_AFTER
+from app.routing import BLOCK_PROFILES, DEFAULT_BLOCK_PROFILE
+from app.sinks import SINKS, open_sink
+from app.tracing import enable_tracing, disable_tracing
+from app.utils import parse_storefronts
 
+COMMANDS = ('crawl', 'parse', 'match')
 
-def main(args=None):
-    parser = argparse.ArgumentParser(description='craw all apps info from the company.')
+
+def add_crawl_arguments(parser: argparse.ArgumentParser):
     parser.add_argument('-v', '--verbose', help='print out data during progress', action='store_true')
     parser.add_argument('-b', '--browser', help='show browser if possible', action='store_true', default=False)
     parser.add_argument('-s', '--slow_mo', type=float, help='slow down by an amount of milliseconds', default=None)
-    parser.add_argument('-n', '--company_name', type=str, help='specify company name', required=True)
-    parser = parser.parse_args(args)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('-n', '--company_name', type=str, help='specify company name')
+    target.add_argument('-r', '--resume', type=str, default=None,
+                        help='resume the crawl recorded in a checkpoint journal file')
+    target.add_argument('--batch', type=str, default=None,
+                        help='crawl every company name listed in a file, one per line, - for stdin')
+    parser.add_argument('-w', '--workers', type=int, help='number of app pages crawled concurrently', default=1)
+    parser.add_argument('-p', '--parse_workers', type=int, default=0,
+                        help='parse app pages in a pool of N processes while the browser keeps fetching')
+    parser.add_argument('--cache_dir', '--cache-dir', type=str, default=None,
+                        help='directory of the persistent app page cache, disabled if not given')
+    parser.add_argument('--max_age', '--max-age', type=float, default=DEFAULT_MAX_AGE_S,
+                        help='seconds a cached app page is served without revalidation')
+    parser.add_argument('--archive', type=str, default=None,
+                        help='store every crawled app page compressed in this directory, for app/reparse.py')
+    parser.add_argument('-j', '--journal', type=str, default=None,
+                        help='append crawl progress to a checkpoint journal file')
+    parser.add_argument('-d', '--discovery', choices=list(DISCOVERY_PROFILES), default=DEFAULT_DISCOVERY,
+                        help='page discovery, one injected script (observer) or human-like scrolling (human)')
+    parser.add_argument('--block_profile', '--block-profile', choices=list(BLOCK_PROFILES),
+                        default=DEFAULT_BLOCK_PROFILE,
+                        help='requests aborted by the browser, nothing (full), images/media/fonts (no-media) '
+                             'or everything the parsers do not need (minimal)')
+    parser.add_argument('--recycle_after', '--recycle-after', type=int, default=DEFAULT_RECYCLE_AFTER,
+                        help='page loads before a browser context is replaced, in the batch and in the --local_workers')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                        help='page loads per second to start from, raised while the store keeps up and halved '
+                             'on 429/503, timeouts or slow answers')
+    parser.add_argument('--max_rate', '--max-rate', type=float, default=DEFAULT_MAX_RATE,
+                        help='page loads per second the crawl never goes above')
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                        help='retries of a failed app page, after an exponential backoff with jitter')
+    parser.add_argument('--politeness', type=float, default=DEFAULT_POLITENESS_S,
+                        help='seconds between the end of one app page load and the start of the next on a host')
+    parser.add_argument('--storefronts', type=parse_storefronts, default=None,
+                        help='comma separated storefronts (us,vn,jp) the developer is crawled in, each app once '
+                             'with the storefronts it is available in')
+    parser.add_argument('--fetch_engine', '--fetch-engine', choices=FETCH_ENGINES, default=DEFAULT_FETCH_ENGINE,
+                        help='load app pages in the browser, fetch them over http, or fetch them over http and '
+                             'load the ones missing a required field in the browser (auto)')
+    parser.add_argument('--http_workers', '--http-workers', type=int, default=DEFAULT_HTTP_WORKERS,
+                        help='app pages fetched concurrently by the http fetch engine')
+    parser.add_argument('-q', '--queue', type=str, default=None,
+                        help='hand app pages out to worker processes through this shared work queue file')
+    parser.add_argument('--local_workers', '--local-workers', type=int, default=None,
+                        help='start N worker processes on this machine for the --queue')
+    parser.add_argument('-f', '--format', choices=list(SINKS), default='json',
+                        help='output format, ndjson, csv and tcsv (typed csv) are written record by record, '
+                             'parquet needs pyarrow and an output file')
+    parser.add_argument('-o', '--output', type=str, default=None, help='output file, stdout if not given')
+    parser.add_argument('--trace', type=str, default=None,
+                        help='write per-stage timing events to a file, json lines for .jsonl, chrome trace otherwise')
+
+
+def crawl(parser: argparse.Namespace, args_parser: argparse.ArgumentParser):
+    if parser.batch and parser.journal:
+        args_parser.error('a checkpoint journal records a single company crawl, it cannot be used with --batch')
+    if parser.resume and parser.journal:
+        args_parser.error('a resumed crawl keeps appending to the journal given with --resume, it cannot be used '
+                          'with --journal')
+    # read once, the crawl resumes from the same state
+    resume_state = load_journal(parser.resume) if parser.resume else None
+    if resume_state is not None and resume_state.company_name is None:
+        args_parser.error(f'no crawl to resume in {parser.resume}, the journal is missing or has no start')
+    if parser.storefronts and (parser.journal or parser.resume):
+        args_parser.error('a checkpoint journal does not record storefront availability, it cannot be used with '
+                          '--storefronts')
+    if parser.archive and (parser.workers > 1 or parser.queue):
+        args_parser.error('only app pages crawled by this process are archived, --archive needs -w 1 and no --queue')
+    if parser.workers < 1:
+        args_parser.error(f'--workers must be at least 1, got {parser.workers}')
+    if parser.local_workers is not None and parser.local_workers < 1:
+        args_parser.error(f'--local_workers must be at least 1, got {parser.local_workers}')
+    if parser.local_workers and not parser.queue:
+        args_parser.error('--local_workers needs a --queue to take work from')
 
-    data = crawl_company_apps(company_name=parser.company_name, **dict(
+    # playwright is only loaded by the command that drives a browser
+    from app.crawlers import iter_company_apps, iter_batch_apps, read_company_names
+    from app.worker import spawn_workers
+
+    tracer = enable_tracing() if parser.trace else None
+    pacer = Pacer(rate=min(parser.rate, parser.max_rate), max_rate=parser.max_rate, max_concurrency=parser.workers)
+
+    crawl_kwargs = dict(
         print=parser.verbose,
         headless=not parser.browser,
-        slow_mo=parser.slow_mo
-    ))
+        slow_mo=parser.slow_mo,
+        workers=parser.workers,
+        parse_workers=parser.parse_workers,
+        cache_dir=parser.cache_dir,
+        max_age_s=parser.max_age,
+        journal=parser.journal,
+        archive=parser.archive,
+        resume=parser.resume,
+        resume_state=resume_state,
+        discovery=parser.discovery,
+        block_profile=parser.block_profile,
+        storefronts=parser.storefronts,
+        politeness_s=parser.politeness,
+        pacer=pacer,
+        retries=parser.retries,
+        fetch_engine=parser.fetch_engine,
+        http_workers=parser.http_workers,
+        queue=parser.queue
+    )
+    worker_processes = spawn_workers(parser.queue, parser.local_workers, headless=not parser.browser,
+                                     slow_mo=parser.slow_mo, discovery=parser.discovery,
+                                     block_profile=parser.block_profile, recycle_after=parser.recycle_after,
+                                     rate=parser.rate, max_rate=parser.max_rate,
+                                     retries=parser.retries) if parser.local_workers else []
+    if parser.batch:
+        if parser.batch == '-':
+            company_names = read_company_names(sys.stdin)
+        else:
+            with open(parser.batch, 'r') as f:
+                company_names = read_company_names(f)
+        records = iter_batch_apps(company_names, recycle_after=parser.recycle_after, **crawl_kwargs)
+    else:
+        records = iter_company_apps(company_name=parser.company_name, **crawl_kwargs)
+
+    sink_kwargs = dict(header='=> Result:\n') if parser.format == 'json' and not parser.output else {}
+    try:
+        with open_sink(parser.format, path=parser.output, **sink_kwargs) as sink:
+            for app_data in records:
+                sink.write(app_data)
+    finally:
+        for process in worker_processes:
+            process.terminate()
+        print(f'=> Pacing: {pacer.summary()}', file=sys.stderr)
+        # an interrupted slow crawl is when the trace is needed most
+        if tracer:
+            disable_tracing()
+            tracer.write(parser.trace)
+            print(f'=> Stage timings, trace written to {parser.trace}\n{tracer.summary()}', file=sys.stderr)
+
+
+def parse(parser: argparse.Namespace):
+    from app.pipeline import iter_parsed_apps, parse_app_file
+
+    pages = 0
+    start = time.perf_counter()
+    with open_sink(parser.format, path=parser.output) as sink:
+        if parser.parse_workers:
+            # records are written in the order of the files, as soon as every earlier file is parsed
+            results = {}
+            # the pool processes read the files themselves
+            for idx, app_data in iter_parsed_apps(enumerate(parser.files), workers=parser.parse_workers,
+                                                  parser=parser.parser, task=parse_app_file):
+                results[idx] = app_data
+                while pages in results:
+                    # files the parser failed on are left out
+                    app_data = results.pop(pages)
+                    if app_data is not None:
+                        sink.write(app_data)
+                    pages += 1
+        else:
+            for path in parser.files:
+                sink.write(parse_app_file(path, parser=parser.parser))
+                pages += 1
+    elapsed_s = time.perf_counter() - start
+    print(f'=> Parsed {pages} page(s) in {elapsed_s:.2f}s, {pages / elapsed_s if elapsed_s else 0:.1f} pages/s',
+          file=sys.stderr)
+
+
+def match(parser: argparse.Namespace):
+    with open(parser.candidates, 'r') as f:
+        candidates = [line.strip() for line in f if line.strip()]
+    hints = parser.hints or [line.strip() for line in sys.stdin if line.strip()]
+    matcher = Matcher(candidates)
+    print(json.dumps(dict(zip(hints, matcher.match_many(hints))), indent=4))
+
+
+def main(args=None):
+    args = sys.argv[1:] if args is None else list(args)
+    # crawling was the only command, its options keep working without naming it
+    if args and args[0] not in COMMANDS and args[0] not in ('-h', '--help'):
+        args = ['crawl', *args]
+
+    parser = argparse.ArgumentParser(description='craw all apps info from the company, or parse and match offline.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    crawl_parser = commands.add_parser('crawl', help='craw all apps info from the company',
+                                       description='craw all apps info from the company.')
+    add_crawl_arguments(crawl_parser)
+
+    parse_parser = commands.add_parser('parse', help='parse app pages saved as html files, without a browser',
+                                       description='parse app pages saved as html files, without a browser.')
+    parse_parser.add_argument('files', nargs='+', help='html files of app pages')
+    parse_parser.add_argument('-p', '--parse_workers', type=int, default=0,
+                              help='parse in a pool of N processes, in this process if 0')
+    parse_parser.add_argument('--parser', choices=list(APP_PARSERS), default='structured',
+                              help='embedded json with a dom fallback (structured), the dom only (dom), or the dom '
+                                   'read in chunks until every field is found (streaming)')
+    parse_parser.add_argument('-f', '--format', choices=list(SINKS), default='ndjson', help='output format')
+    parse_parser.add_argument('-o', '--output', type=str, default=None, help='output file, stdout if not given')
+
+    match_parser = commands.add_parser('match', help='match company names against a list of developer names',
+                                       description='match company names against a list of developer names.')
+    match_parser.add_argument('hints', nargs='*', help='company names, one per line on stdin if not given')
+    match_parser.add_argument('-c', '--candidates', type=str, required=True,
+                              help='file of developer names to match against, one per line')
+    parser = parser.parse_args(args)
 
-    print(f"=> Result:\n{json.dumps(data, indent=4)}")
+    if parser.command == 'crawl':
+        crawl(parser, crawl_parser)
+    elif parser.command == 'parse':
+        parse(parser)
+    else:
+        match(parser)
 
 
 if __name__ == '__main__':
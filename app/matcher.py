@@ -0,0 +1,140 @@
+import heapq
+from typing import Iterable, Iterator, Optional
+
+from app.utils import calc_likelihood
+
+DEFAULT_NGRAM_SIZE = 3
+
+
+def get_ngrams(text: str, size: int = DEFAULT_NGRAM_SIZE) -> set[str]:
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def get_runs(positions: list[int]) -> list[int]:
+    # lengths of the runs of consecutive positions
+    runs, run, last = [], 0, None
+    for pos in sorted(positions):
+        if last is not None and pos == last + 1:
+            run += 1
+        else:
+            if run:
+                runs.append(run)
+            run = 1
+        last = pos
+    runs.append(run)
+    return runs
+
+
+def get_overlap_bound(runs: list[int], size: int, text_length: int) -> int:
+    # the largest `longest * count` of calc_likelihood for a text sharing runs of consecutive hint grams.
+    # a common substring of length L covers L - size + 1 consecutive shared grams of the hint, and distinct ones
+    # start at distinct positions
+    bound = 0
+    for length in range(size, max(runs) + size):
+        starts = sum(max(0, run - length + size) for run in runs)
+        bound = max(bound, length * min(starts, text_length - length + 1))
+    return bound
+
+
+def get_peak(total: int, low: int, high: int) -> int:
+    # the largest L * (total - L) for an integer L between low and high
+    length = min(max(total // 2, low), high)
+    return max(length * (total - length), min(length + 1, high) * (total - min(length + 1, high)))
+
+
+class NgramIndex:
+    def __init__(self, texts: Iterable[str], size: int = DEFAULT_NGRAM_SIZE):
+        assert size >= 2, 'invalid ngram size'
+        self.texts = list(texts)
+        self.size = size
+        # grams of every size from 2 to `size`, the length of a gram tells them apart
+        self.postings: dict[str, list[int]] = {}
+        self.chars = [frozenset(text) for text in self.texts]
+        self.lengths: dict[int, list[int]] = {}
+        for idx, text in enumerate(self.texts):
+            for gram_size in range(2, size + 1):
+                for gram in get_ngrams(text, gram_size):
+                    self.postings.setdefault(gram, []).append(idx)
+            self.lengths.setdefault(len(text), []).append(idx)
+
+    def find_shared(self, hint: str) -> dict[int, tuple[int, list[int]]]:
+        # every text sharing at least two consecutive characters with the hint, with the largest gram size it
+        # shares and the hint positions of those grams
+        shared = {}
+        for gram_size in range(self.size, 1, -1):
+            for pos in range(len(hint) - gram_size + 1):
+                for idx in self.postings.get(hint[pos:pos + gram_size], ()):
+                    if shared.setdefault(idx, (gram_size, []))[0] == gram_size:
+                        shared[idx][1].append(pos)
+        return shared
+
+    def iter_bounds(self, hint: str, shared: dict[int, tuple[int, list[int]]]) -> Iterator[tuple[float, int]]:
+        # upper bounds of the likelihood of the shared texts, best first and the earliest text first on a tie.
+        # the bound of the run of shared grams is only worked out for the texts that reach the top of the heap
+        heap = []
+        for idx, (gram_size, positions) in shared.items():
+            length = len(self.texts[idx])
+            if gram_size < self.size:
+                # no larger gram is shared, so every common substring is exactly `gram_size` long
+                heap.append((-gram_size * min(len(positions), length - gram_size + 1) / max(len(hint), length),
+                             idx, True))
+            else:
+                # as if the shared grams were one run, refined once the text reaches the top of the heap
+                count = len(positions)
+                overlap = min(get_peak(count + gram_size, gram_size, count + gram_size - 1),
+                              get_peak(length + 1, gram_size, count + gram_size - 1))
+                heap.append((-overlap / max(len(hint), length), idx, False))
+        heapq.heapify(heap)
+        while heap:
+            bound, idx, exact = heapq.heappop(heap)
+            if exact:
+                yield -bound, idx
+                continue
+            length = len(self.texts[idx])
+            gram_size, positions = shared[idx]
+            overlap = get_overlap_bound(get_runs(positions), gram_size, length)
+            heapq.heappush(heap, (-overlap / max(len(hint), length), idx, True))
+
+
+class Matcher:
+    # the same answer as get_best_matching_text, the index only skips texts whose bound proves they cannot win
+    def __init__(self, candidates: Iterable[str], **index_kwargs):
+        self.index = NgramIndex(candidates, **index_kwargs)
+        self._matches: dict[str, Optional[str]] = {}
+
+    def match(self, hint: str) -> str | None:
+        if hint not in self._matches:
+            self._matches[hint] = self._match(hint)
+        return self._matches[hint]
+
+    def _match(self, hint: str) -> str | None:
+        texts = self.index.texts
+        # (likelihood, -position), so ties keep going to the earliest text and a likelihood of 0 never wins
+        best, ans = (0, 1), None
+        shared = self.index.find_shared(hint)
+        for bound, idx in self.index.iter_bounds(hint, shared):
+            if (bound, -idx) <= best:
+                break
+            point = (calc_likelihood(hint, texts[idx]), -idx)
+            if point > best:
+                best, ans = point, texts[idx]
+
+        # the other texts share single characters at most, and the number of shared characters bounds them
+        chars = set(hint)
+        for length, indices in self.index.lengths.items():
+            if (min(len(chars), length) / max(len(hint), length), 0) <= best:
+                continue
+            for idx in indices:
+                if idx in shared or (len(chars & self.index.chars[idx]) / max(len(hint), length), -idx) <= best:
+                    continue
+                point = (calc_likelihood(hint, texts[idx]), -idx)
+                if point > best:
+                    best, ans = point, texts[idx]
+        return ans
+
+    def match_many(self, hints: Iterable[str]) -> list[str | None]:
+        return [self.match(hint) for hint in hints]
+
+
+def match_many(hints: Iterable[str], candidates: Iterable[str], **kwargs) -> list[str | None]:
+    return Matcher(candidates, **kwargs).match_many(hints)
@@ -0,0 +1,196 @@
+import random
+import threading
+import time
+from typing import Callable, Optional, TypeVar, Awaitable
+
+from app.tracing import count
+
+DEFAULT_RATE = 2.0
+DEFAULT_MIN_RATE = 0.1
+DEFAULT_MAX_RATE = 10.0
+DEFAULT_TARGET_LATENCY_S = 5.0
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_S = 1.0
+DEFAULT_MAX_BACKOFF_S = 60.0
+THROTTLE_STATUSES = (429, 503)
+ENTER_POLL_S = 0.05
+
+T = TypeVar('T')
+
+
+class ThrottledError(Exception):
+    def __init__(self, url: str, status: int):
+        super().__init__(f'{url} answered {status}')
+        self.url = url
+        self.status = status
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        assert rate > 0 and burst >= 1, 'invalid token bucket'
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self._tokens = burst
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        # takes the tokens right away and returns how long the caller has to wait for them,
+        # so the sync crawl sleeps and the async one awaits without holding the lock
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate)
+
+    def set_rate(self, rate: float):
+        with self._lock:
+            self._refill(self.clock())
+            self.rate = rate
+
+
+class Pacer:
+    def __init__(self, rate: float = DEFAULT_RATE, min_rate: float = DEFAULT_MIN_RATE,
+                 max_rate: float = DEFAULT_MAX_RATE, max_concurrency: int = 1,
+                 target_latency_s: float = DEFAULT_TARGET_LATENCY_S, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        assert 0 < rate <= max_rate, 'invalid pacing rates'
+        assert max_concurrency > 0, 'invalid concurrency'
+        self.min_rate = min(min_rate, rate)
+        self.max_rate = max_rate
+        self.max_concurrency = max_concurrency
+        self.target_latency_s = target_latency_s
+        self.clock = clock
+        self.sleep = sleep
+        self.bucket = TokenBucket(rate=rate, burst=max(1.0, float(max_concurrency)), clock=clock)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._decreased_at: Optional[float] = None
+
+        self.initial_rate = rate
+        self.concurrency = float(max_concurrency)
+        self.requests = 0
+        self.throttled = 0
+        self.timeouts = 0
+        self.slow = 0
+        self.retries = 0
+        self.waited_s = 0.0
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def reserve(self) -> float:
+        delay = self.bucket.reserve()
+        with self._lock:
+            self.waited_s += delay
+        return delay
+
+    def acquire(self):
+        # one token per page load or request, shared by every page of the crawl
+        delay = self.reserve()
+        if delay:
+            self.sleep(delay)
+
+    async def acquire_async(self):
+        import asyncio
+
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+    def enter(self) -> bool:
+        with self._lock:
+            if self._in_flight >= max(1, int(self.concurrency)):
+                return False
+            self._in_flight += 1
+            return True
+
+    def leave(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    async def enter_async(self):
+        import asyncio
+
+        while not self.enter():
+            await asyncio.sleep(ENTER_POLL_S)
+
+    def record(self, latency_s: float, status: int = None, timeout: bool = False):
+        # additive increase while the store answers in time, multiplicative decrease once it pushes back
+        # with 429/503, a timeout or an answer slower than the target latency
+        with self._lock:
+            self.requests += 1
+            if timeout:
+                self.timeouts += 1
+                count('pacing.timeouts')
+            elif status in THROTTLE_STATUSES:
+                self.throttled += 1
+                count('pacing.throttled')
+            elif latency_s > self.target_latency_s:
+                self.slow += 1
+                count('pacing.slow')
+            else:
+                self.bucket.set_rate(min(self.max_rate, self.rate + 1 / max(1.0, self.rate)))
+                self.concurrency = min(float(self.max_concurrency), self.concurrency + 1 / self.concurrency)
+                return
+
+            now = self.clock()
+            # a burst of failures from the same moment only halves once
+            if self._decreased_at is None or now - self._decreased_at >= self.target_latency_s:
+                self._decreased_at = now
+                self.bucket.set_rate(max(self.min_rate, self.rate / 2))
+                self.concurrency = max(1.0, self.concurrency / 2)
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+        count('pacing.retries')
+
+    def summary(self) -> str:
+        return (f'{self.requests} request(s), {self.throttled} throttled, {self.timeouts} timeout(s), '
+                f'{self.slow} slow, {self.retries} retr(y/ies), rate {self.initial_rate:.2f} -> {self.rate:.2f}/s, '
+                f'concurrency {int(self.concurrency)}/{self.max_concurrency}, waited {self.waited_s:.2f}s')
+
+
+def backoff_s(attempt: int, base_s: float = DEFAULT_BACKOFF_S, max_s: float = DEFAULT_MAX_BACKOFF_S,
+              rand: Callable[[], float] = random.random) -> float:
+    # full jitter, retries of pages that failed together do not come back together
+    return rand() * min(max_s, base_s * 2 ** attempt)
+
+
+def retry(call: Callable[[], T], retries: int = DEFAULT_RETRIES, retry_on: tuple = (Exception,),
+          pacer: Pacer = None, base_s: float = DEFAULT_BACKOFF_S, sleep: Callable[[float], None] = time.sleep) -> T:
+    for attempt in range(retries + 1):
+        try:
+            return call()
+        except retry_on:
+            if attempt == retries:
+                raise
+            if pacer:
+                pacer.record_retry()
+            else:
+                count('pacing.retries')
+            sleep(backoff_s(attempt, base_s=base_s))
+
+
+async def retry_async(call: Callable[[], Awaitable[T]], retries: int = DEFAULT_RETRIES,
+                      retry_on: tuple = (Exception,), pacer: Pacer = None, base_s: float = DEFAULT_BACKOFF_S) -> T:
+    import asyncio
+
+    for attempt in range(retries + 1):
+        try:
+            return await call()
+        except retry_on:
+            if attempt == retries:
+                raise
+            if pacer:
+                pacer.record_retry()
+            else:
+                count('pacing.retries')
+            await asyncio.sleep(backoff_s(attempt, base_s=base_s))
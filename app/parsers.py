@@ -1,20 +1,76 @@
-from typing import Dict, Any, List
-
-from bs4 import PageElement, BeautifulSoup
+import json
+import re
+from functools import cached_property, lru_cache
+from typing import Dict, Any, List, Callable, TYPE_CHECKING
 
+from app.records import AppInfo, parse_app_id, parse_targets
+from app.tracing import span
 from app.utils import clean_text
 
+# bs4 is loaded by the first soup built, the structured parser rarely needs one
+if TYPE_CHECKING:
+    from bs4 import PageElement, BeautifulSoup, SoupStrainer
+
+schema_script_re = re.compile(r'<script\b[^>]*\bname="schema:software-application"[^>]*>', flags=re.IGNORECASE)
+shoebox_apps_script_re = re.compile(r'<script\b[^>]*\bid="shoebox-media-api-cache-apps"[^>]*>', flags=re.IGNORECASE)
+
+# order in which the app page lists the supported devices
+DEVICE_FAMILY_ORDER = ('iphone', 'ipad', 'ipod', 'mac', 'tvos', 'watch', 'realityDevice')
 
-def get_text(ele: PageElement, selector: str = None) -> str:
+
+def get_text(ele: 'PageElement', selector: str = None) -> str:
     target_ele = ele
     if selector and hasattr(target_ele, 'select_one'):
         target_ele = target_ele.select_one(selector)
     return clean_text(target_ele.text) if target_ele else ''
 
 
+@lru_cache(maxsize=None)
+def get_app_info_strainer() -> 'SoupStrainer':
+    from bs4 import SoupStrainer
+
+    # the head meta tags, the product header and the information list are all AppInfoParser reads
+    return SoupStrainer(name=['meta', 'header', 'dl'])
+
+
+def _beautiful_soup(html: str, **kwargs) -> 'BeautifulSoup':
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(html, **kwargs)
+
+
+def _strained_soup(html: str) -> 'BeautifulSoup':
+    from bs4.builder import builder_registry
+
+    return _beautiful_soup(html, features='lxml' if builder_registry.lookup('lxml') else 'html.parser',
+                           parse_only=get_app_info_strainer())
+
+
+PARSER_BACKENDS: Dict[str, Callable[[str], 'BeautifulSoup']] = {
+    'html.parser': lambda html: _beautiful_soup(html, features='html.parser'),
+    'lxml': lambda html: _beautiful_soup(html, features='lxml'),
+    'strained': _strained_soup,
+}
+
+DEFAULT_BACKEND = 'html.parser'
+
+
+def build_soup(html: str, backend: str = DEFAULT_BACKEND) -> 'BeautifulSoup':
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f'unknown parser backend {backend}, expected one of {list(PARSER_BACKENDS)}')
+    with span('parse.build_soup', backend=backend):
+        return PARSER_BACKENDS[backend](html)
+
+
 class AppInfoParser:
-    def __init__(self, html: str):
-        self.soup = BeautifulSoup(html, features='html.parser')
+    def __init__(self, html: str, backend: str = DEFAULT_BACKEND):
+        self.soup = build_soup(html, backend=backend)
+
+    def _select_definition(self, term: str) -> 'PageElement | None':
+        for term_ele in self.soup.select('.information-list--app dt'):
+            if term in get_text(term_ele):
+                return term_ele.find_next_sibling('dd')
+        return None
 
     def parse_url(self) -> str:
         url_ele = self.soup.select_one(selector='meta[property="og:url"]')
@@ -28,19 +84,112 @@ class AppInfoParser:
         name_ele = self.soup.select_one(selector='h1.product-header__title.app-header__title')
         return get_text(name_ele).split('\n')[0]
 
+    def parse_developer_url(self) -> str:
+        developer_ele = self.soup.select_one(selector='h2.product-header__identity.app-header__identity a')
+        return developer_ele.get('href', '') if developer_ele else ''
+
     def parse_compatibilities(self) -> List[str]:
-        compat_ele_list = self.soup.select(selector='dt:-soup-contains("Compatibility") + dd > dl > dt')
+        compat_ele = self._select_definition('Compatibility')
+        compat_ele_list = compat_ele.select(selector=':scope > dl > dt') if compat_ele else []
         return list(map(get_text, compat_ele_list))
 
     def parse_languages(self) -> List[str]:
-        language_ele = self.soup.select_one(selector='dt:-soup-contains("Languages") + dd')
+        language_ele = self._select_definition('Languages')
         full_str = get_text(language_ele)
         return list(map(clean_text, full_str.split(sep=',')))
 
     def parse(self) -> dict:
-        return dict(
-            app_name=self.parse_name(),
-            app_id=f"id{self.parse_id()}",
-            app_url=self.parse_url(),
-            app_targets=self.parse_compatibilities()
-        )
+        with span('parse.fields'):
+            return dict(
+                app_name=self.parse_name(),
+                app_id=f"id{self.parse_id()}",
+                app_url=self.parse_url(),
+                app_targets=self.parse_compatibilities()
+            )
+
+    def parse_info(self, languages: bool = False) -> AppInfo:
+        with span('parse.fields'):
+            targets, other_targets = parse_targets(self.parse_compatibilities())
+            return AppInfo(
+                id=parse_app_id(self.parse_id()),
+                name=self.parse_name(),
+                url=self.parse_url(),
+                targets=targets,
+                other_targets=other_targets,
+                languages=tuple(self.parse_languages()) if languages else ()
+            )
+
+
+def load_script_json(html: str, script_re: re.Pattern) -> Any:
+    match_obj = script_re.search(html)
+    if not match_obj:
+        return None
+    end = html.find('</script>', match_obj.end())
+    if end < 0:
+        return None
+    try:
+        return json.loads(html[match_obj.end():end])
+    except ValueError:
+        return None
+
+
+def load_shoebox_app(html: str) -> dict:
+    cache = load_script_json(html, shoebox_apps_script_re)
+    if not isinstance(cache, dict):
+        return {}
+    for key, value in cache.items():
+        # every cached media api response is itself a json encoded string
+        try:
+            value = json.loads(value) if isinstance(value, str) else value
+        except ValueError:
+            continue
+        for resource in (value or {}).get('d', []):
+            if resource.get('type') == 'apps':
+                return resource
+    return {}
+
+
+class StructuredAppInfoParser(AppInfoParser):
+    def __init__(self, html: str, backend: str = 'strained'):
+        self.html = html
+        self.backend = backend
+        with span('parse.load_json'):
+            self.schema = load_script_json(html, schema_script_re) or {}
+            self.app = load_shoebox_app(html)
+        self.attributes = self.app.get('attributes') or {}
+
+    @cached_property
+    def soup(self) -> 'BeautifulSoup':
+        # only built when the embedded json lacks a field
+        return build_soup(self.html, backend=self.backend)
+
+    def parse_url(self) -> str:
+        return self.attributes.get('url') or super().parse_url()
+
+    def parse_id(self) -> str:
+        return self.app.get('id') or super().parse_id()
+
+    def parse_name(self) -> str:
+        name = self.schema.get('name') or self.attributes.get('name')
+        return clean_text(name) if name else super().parse_name()
+
+    def parse_developer_url(self) -> str:
+        author = self.schema.get('author') or {}
+        return author.get('url') or super().parse_developer_url()
+
+    def parse_compatibilities(self) -> List[str]:
+        requirements = self.attributes.get('requirementsByDeviceFamily')
+        if not requirements:
+            return super().parse_compatibilities()
+
+        families = sorted(requirements.keys(), key=lambda family: DEVICE_FAMILY_ORDER.index(family)
+                          if family in DEVICE_FAMILY_ORDER else len(DEVICE_FAMILY_ORDER))
+        return [clean_text(requirements[family].get('deviceFamily', family)) for family in families]
+
+    def parse_languages(self) -> List[str]:
+        platforms = self.attributes.get('platformAttributes') or {}
+        platform = platforms.get('ios') or next(iter(platforms.values()), {})
+        languages = platform.get('languageList')
+        if not languages:
+            return super().parse_languages()
+        return list(map(clean_text, languages))
@@ -0,0 +1,134 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, Future
+from queue import Queue, SimpleQueue, Empty
+from threading import Thread, BoundedSemaphore, Lock
+from typing import Any, Callable, Iterable, Iterator, Tuple
+
+from app.parsers import AppInfoParser, StructuredAppInfoParser
+from app.streaming import StreamingAppInfoParser
+
+APP_PARSERS = dict(
+    structured=StructuredAppInfoParser,
+    dom=AppInfoParser,
+    streaming=StreamingAppInfoParser,
+)
+
+# bytes read at once from a saved page by the streaming parser
+FILE_CHUNK_SIZE = 64 * 1024
+
+_STOP = object()
+
+
+def parse_app_html(html: str, parser: str = 'structured') -> dict:
+    return APP_PARSERS[parser](html=html).parse()
+
+
+def parse_app_file(path: str, parser: str = 'structured') -> dict:
+    # the streaming parser reads the file in chunks and stops once it has every field, the others need the whole page
+    if parser == 'streaming':
+        with open(path, 'rb') as f:
+            return StreamingAppInfoParser.from_chunks(iter(lambda: f.read(FILE_CHUNK_SIZE), b'')).parse()
+    with open(path, 'r', encoding='utf-8') as f:
+        return parse_app_html(f.read(), parser=parser)
+
+
+class ParsePipeline:
+    def __init__(self, workers: int = None, queue_size: int = None, parser: str = 'structured',
+                 task: Callable[[Any, str], dict] = parse_app_html):
+        assert parser in APP_PARSERS, f'unknown parser {parser}'
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size or 2 * self.workers
+        self.parser = parser
+        # what the pool runs on every submitted page, raw html by default
+        self.task = task
+
+        # raw html waits in the bounded inbox, at most `workers` pages are handed to the pool at once
+        self._inbox = Queue(maxsize=self.queue_size)
+        self._slots = BoundedSemaphore(self.workers)
+        self._results = SimpleQueue()
+        self._lock = Lock()
+        self._in_flight = 0
+        self._pending = 0
+
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._dispatcher = Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+
+    @property
+    def in_flight(self) -> int:
+        # raw html pages held by the pipeline, either queued or being parsed
+        return self._in_flight
+
+    @property
+    def pending(self) -> int:
+        # submitted pages whose results have not been collected yet
+        return self._pending
+
+    def _dispatch(self):
+        while True:
+            item = self._inbox.get()
+            if item is _STOP:
+                break
+            key, page = item
+            self._slots.acquire()
+            future = self._pool.submit(self.task, page, self.parser)
+            future.add_done_callback(lambda f, key_=key: self._on_done(key_, f))
+
+    def _on_done(self, key: Any, future: Future):
+        self._slots.release()
+        with self._lock:
+            self._in_flight -= 1
+        self._results.put((key, future))
+
+    def submit(self, key: Any, html: str):
+        # blocks while the inbox is full, which slows the fetch stage down to the parse throughput
+        with self._lock:
+            self._in_flight += 1
+            self._pending += 1
+        self._inbox.put((key, html))
+
+    def _collect(self, key: Any, future: Future) -> Tuple[Any, dict | None]:
+        self._pending -= 1
+        # a page the parser chokes on comes out as None, so one bad page does not stop the others
+        try:
+            return key, future.result()
+        except Exception as e:
+            print(f'=> Failed to parse {key}: {e!r}', file=sys.stderr)
+            return key, None
+
+    def ready(self) -> Iterator[Tuple[Any, dict | None]]:
+        while True:
+            try:
+                key, future = self._results.get_nowait()
+            except Empty:
+                return
+            yield self._collect(key, future)
+
+    def drain(self) -> Iterator[Tuple[Any, dict | None]]:
+        while self._pending > 0:
+            key, future = self._results.get()
+            yield self._collect(key, future)
+
+    def close(self):
+        self._inbox.put(_STOP)
+        self._dispatcher.join()
+        self._pool.shutdown(cancel_futures=True)
+
+    def __enter__(self) -> 'ParsePipeline':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def iter_parsed_apps(pages: Iterable[Tuple[Any, str]], workers: int = None, queue_size: int = None,
+                     parser: str = 'structured', on_submit: Callable[[ParsePipeline], Any] = None,
+                     task: Callable[[Any, str], dict] = parse_app_html) -> Iterator[Tuple[Any, dict | None]]:
+    with ParsePipeline(workers=workers, queue_size=queue_size, parser=parser, task=task) as pipeline:
+        for key, html in pages:
+            pipeline.submit(key, html)
+            if on_submit:
+                on_submit(pipeline)
+            yield from pipeline.ready()
+        yield from pipeline.drain()
@@ -0,0 +1,191 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from threading import Thread
+from typing import Iterator, Optional, Callable, Coroutine, Any, TYPE_CHECKING
+
+from app.routing import DEFAULT_BLOCK_PROFILE, RouteStats, install_block_profile
+
+if TYPE_CHECKING:
+    from playwright.sync_api import Playwright, Browser, BrowserContext, Request
+    from playwright import async_api
+
+DEFAULT_RECYCLE_AFTER = 200
+
+
+class BrowserPool:
+    def __init__(self, headless: bool = False, slow_mo: float = None, recycle_after: int = DEFAULT_RECYCLE_AFTER):
+        assert recycle_after > 0, 'invalid number of pages before recycling'
+        self.headless = headless
+        self.slow_mo = slow_mo
+        self.recycle_after = recycle_after
+
+        self._playwright: Optional['Playwright'] = None
+        self._browser: Optional['Browser'] = None
+        self._context: Optional['BrowserContext'] = None
+
+        # page loads in the current context, and whether it already went through the region redirect
+        self.navigations = 0
+        self.landed = False
+
+        self.launches = 0
+        self.contexts = 0
+        self.crawls = 0
+        self.startup_s = 0.0
+
+    def _count_navigation(self, request: 'Request'):
+        if request.resource_type == 'document' and request.is_navigation_request():
+            self.navigations += 1
+
+    def needs_recycle(self) -> bool:
+        return self.navigations >= self.recycle_after
+
+    def _launch(self):
+        from playwright.sync_api import sync_playwright
+
+        start = time.perf_counter()
+        self._playwright = sync_playwright().start()
+        self._browser = self._playwright.chromium.launch(headless=self.headless, slow_mo=self.slow_mo)
+        self.startup_s += time.perf_counter() - start
+        self.launches += 1
+
+    def context(self) -> 'BrowserContext':
+        if self._browser is None or not self._browser.is_connected():
+            self.close()
+            self._launch()
+        if self._context is not None and self.needs_recycle():
+            # a fresh context bounds the memory held by caches, service workers and detached pages
+            self.recycle()
+        if self._context is None:
+            start = time.perf_counter()
+            self._context = self._browser.new_context()
+            self._context.on('request', self._count_navigation)
+            self.startup_s += time.perf_counter() - start
+            self.contexts += 1
+        return self._context
+
+    @contextmanager
+    def lease(self, block_profile: str = DEFAULT_BLOCK_PROFILE, route_stats: RouteStats = None,
+              **listeners: Callable) -> Iterator['BrowserContext']:
+        ctx = self.context()
+        uninstall = install_block_profile(ctx, profile=block_profile, stats=route_stats)
+        for event, handler in listeners.items():
+            ctx.on(event, handler)
+        self.crawls += 1
+        try:
+            yield ctx
+        except Exception:
+            # the context may be left mid-navigation, the next crawl gets a clean one
+            self.recycle()
+            raise
+        finally:
+            if ctx is self._context:
+                for event, handler in listeners.items():
+                    ctx.remove_listener(event, handler)
+                uninstall()
+                for page in ctx.pages:
+                    page.close()
+
+    def recycle(self):
+        if self._context is not None:
+            self._context.close()
+        self._context = None
+        self.navigations = 0
+        self.landed = False
+
+    def summary(self) -> str:
+        per_crawl = self.startup_s / self.crawls if self.crawls else 0.0
+        return (f'{self.crawls} crawl(s) on {self.launches} browser launch(es) and {self.contexts} context(s), '
+                f'startup {self.startup_s:.2f}s, {per_crawl:.2f}s per crawl')
+
+    def close(self):
+        if self._browser is not None and self._browser.is_connected():
+            self.recycle()
+            self._browser.close()
+        self._context = None
+        self._browser = None
+        self.navigations = 0
+        self.landed = False
+        if self._playwright is not None:
+            self._playwright.stop()
+            self._playwright = None
+
+    def __enter__(self) -> 'BrowserPool':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class AsyncBrowserPool:
+    # the async browser of the concurrent crawls (-w > 1, --storefronts), kept alive on an event loop of its own so
+    # the companies of a batch share one launch. every crawl gets a fresh context, closed when it is done
+    def __init__(self, headless: bool = False, slow_mo: float = None):
+        self.headless = headless
+        self.slow_mo = slow_mo
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[Thread] = None
+        self._playwright: Optional['async_api.Playwright'] = None
+        self._browser: Optional['async_api.Browser'] = None
+
+        self.launches = 0
+        self.contexts = 0
+        self.startup_s = 0.0
+
+    def run(self, coro: Coroutine) -> Any:
+        # runs a coroutine on the loop of the pool, from any other thread
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = Thread(target=self._loop.run_forever, daemon=True)
+            self._thread.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def browser(self) -> 'async_api.Browser':
+        if self._browser is None or not self._browser.is_connected():
+            from playwright.async_api import async_playwright
+
+            await self._close_browser()
+            start = time.perf_counter()
+            self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=self.headless, slow_mo=self.slow_mo)
+            self.startup_s += time.perf_counter() - start
+            self.launches += 1
+        return self._browser
+
+    async def new_context(self) -> 'async_api.BrowserContext':
+        browser = await self.browser()
+        start = time.perf_counter()
+        context = await browser.new_context()
+        self.startup_s += time.perf_counter() - start
+        self.contexts += 1
+        return context
+
+    async def _close_browser(self):
+        if self._browser is not None and self._browser.is_connected():
+            await self._browser.close()
+        self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def summary(self) -> str:
+        per_context = self.startup_s / self.contexts if self.contexts else 0.0
+        return (f'{self.contexts} context(s) on {self.launches} browser launch(es), '
+                f'startup {self.startup_s:.2f}s, {per_context:.2f}s per context')
+
+    def close(self):
+        if self._loop is None:
+            return
+        self.run(self._close_browser())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+        self._thread = None
+
+    def __enter__(self) -> 'AsyncBrowserPool':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,102 @@
+import sys
+from dataclasses import dataclass
+from enum import IntFlag
+from typing import Iterable, Optional
+
+
+class Compatibility(IntFlag):
+    IPHONE = 1
+    IPAD = 2
+    IPOD = 4
+    MAC = 8
+    APPLE_TV = 16
+    APPLE_WATCH = 32
+    APPLE_VISION = 64
+
+
+# labels of the app page, in the order it lists the supported devices
+COMPATIBILITY_LABELS = {
+    Compatibility.IPHONE: 'iPhone',
+    Compatibility.IPAD: 'iPad',
+    Compatibility.IPOD: 'iPod touch',
+    Compatibility.MAC: 'Mac',
+    Compatibility.APPLE_TV: 'Apple TV',
+    Compatibility.APPLE_WATCH: 'Apple Watch',
+    Compatibility.APPLE_VISION: 'Apple Vision',
+}
+_LABEL_FLAGS = {label: flag for flag, label in COMPATIBILITY_LABELS.items()}
+
+
+def parse_targets(labels: Iterable[str]) -> tuple[Compatibility, tuple[str, ...]]:
+    # labels without a flag are returned apart, so a device added to the store is not dropped
+    targets, other_targets = Compatibility(0), []
+    for label in labels:
+        flag = _LABEL_FLAGS.get(label)
+        if flag is None:
+            other_targets.append(sys.intern(label))
+        else:
+            targets |= flag
+    return targets, tuple(other_targets)
+
+
+def format_targets(targets: Compatibility, other_targets: Iterable[str] = ()) -> list[str]:
+    return [label for flag, label in COMPATIBILITY_LABELS.items() if flag in targets] + list(other_targets)
+
+
+def parse_app_id(app_id: str) -> Optional[int]:
+    # both the page's content id and the legacy `id<digits>` form
+    digits = app_id[2:] if app_id.startswith('id') else app_id
+    if not digits:
+        return None
+    if not digits.isdigit():
+        raise ValueError(f'invalid app id {app_id!r}')
+    return int(digits)
+
+
+@dataclass(slots=True)
+class AppInfo:
+    id: Optional[int]
+    name: str
+    url: str
+    targets: Compatibility = Compatibility(0)
+    other_targets: tuple[str, ...] = ()
+    languages: tuple[str, ...] = ()
+
+    def __post_init__(self):
+        # a catalog repeats a few dozen language names, every record shares the same string objects
+        self.languages = tuple(map(sys.intern, self.languages))
+
+    @property
+    def app_id(self) -> str:
+        return f"id{'' if self.id is None else self.id}"
+
+    @property
+    def target_labels(self) -> list[str]:
+        return format_targets(self.targets, self.other_targets)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'AppInfo':
+        targets, other_targets = parse_targets(data.get('app_targets') or [])
+        return cls(id=parse_app_id(data.get('app_id') or ''), name=data.get('app_name', ''),
+                   url=data.get('app_url', ''), targets=targets, other_targets=other_targets,
+                   languages=tuple(data.get('app_languages') or ()))
+
+    def to_dict(self) -> dict:
+        # the legacy json record, languages are only part of it when they were parsed
+        data = dict(app_name=self.name, app_id=self.app_id, app_url=self.url, app_targets=self.target_labels)
+        if self.languages:
+            data['app_languages'] = list(self.languages)
+        return data
+
+
+def compact_record(record: dict) -> AppInfo | dict:
+    # only records that convert back unchanged are compacted, anything else is kept as it is
+    try:
+        info = AppInfo.from_dict(record)
+    except (ValueError, TypeError, AttributeError):
+        return record
+    return info if info.to_dict() == record else record
+
+
+def as_dict(record: AppInfo | dict) -> dict:
+    return record.to_dict() if isinstance(record, AppInfo) else record
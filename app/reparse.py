@@ -0,0 +1,66 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Tuple
+
+from app.archive import PageArchive, ArchiveEntry, read_object
+from app.pipeline import APP_PARSERS, parse_app_html
+from app.sinks import SINKS, open_sink
+
+
+def reparse_object(path: str, codec: str, parser: str = 'structured') -> Tuple[dict, int]:
+    # runs in a pool process, which reads and decompresses the page itself
+    html = read_object(path, codec)
+    return parse_app_html(html, parser=parser), len(html)
+
+
+def iter_reparsed_apps(archive: PageArchive, workers: int = None, parser: str = 'structured',
+                       every_capture: bool = False) -> Iterator[Tuple[ArchiveEntry, dict, int]]:
+    entries = list(archive.entries()) if every_capture else archive.latest()
+    if not entries:
+        return
+    workers = workers or os.cpu_count() or 1
+    paths = [archive.object_path(entry.digest, entry.codec) for entry in entries]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # results keep the archive order, pages are handed out in chunks to keep the pool busy
+        results = pool.map(reparse_object, paths, [entry.codec for entry in entries], [parser] * len(entries),
+                           chunksize=max(1, len(entries) // (workers * 4)))
+        for entry, (app_data, size) in zip(entries, results):
+            yield entry, app_data, size
+
+
+def main(args=None):
+    args_parser = argparse.ArgumentParser(description='parse the archived app pages again, without a browser.')
+    args_parser.add_argument('archive', type=str, help='archive directory written by a crawl with --archive')
+    args_parser.add_argument('-p', '--parse_workers', type=int, default=None,
+                             help='number of parser processes, one per cpu by default')
+    args_parser.add_argument('--parser', choices=list(APP_PARSERS), default='structured',
+                             help='embedded json with a dom fallback (structured), the dom only (dom), or the dom '
+                                  'until every field is found (streaming)')
+    args_parser.add_argument('--all', dest='every_capture', action='store_true',
+                             help='every capture of an app, not only the latest one')
+    args_parser.add_argument('-f', '--format', choices=list(SINKS), default='ndjson', help='output format')
+    args_parser.add_argument('-o', '--output', type=str, default=None, help='output file, stdout if not given')
+    parser = args_parser.parse_args(args)
+
+    pages, html_bytes = 0, 0
+    start = time.perf_counter()
+    try:
+        archive = PageArchive(parser.archive, read_only=True)
+    except FileNotFoundError as e:
+        args_parser.error(str(e))
+    with archive, open_sink(parser.format, path=parser.output) as sink:
+        for entry, app_data, size in iter_reparsed_apps(archive, workers=parser.parse_workers, parser=parser.parser,
+                                                        every_capture=parser.every_capture):
+            sink.write(app_data)
+            pages += 1
+            html_bytes += size
+    elapsed_s = time.perf_counter() - start
+    print(f'=> Reparsed {pages} page(s), {html_bytes / 1024 ** 2:.1f} MB of html in {elapsed_s:.2f}s, '
+          f'{pages / elapsed_s if elapsed_s else 0:.1f} pages/s', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
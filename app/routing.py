@@ -0,0 +1,165 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from threading import Lock
+from typing import Callable, TYPE_CHECKING
+from urllib.parse import urlsplit
+
+# playwright is only loaded by the commands that drive a browser, the profiles are read by the cli at startup
+if TYPE_CHECKING:
+    from playwright.sync_api import BrowserContext, Route, Request, Response
+    from playwright.async_api import BrowserContext as AsyncBrowserContext, Route as AsyncRoute
+
+MEDIA_RESOURCE_TYPES = frozenset(('image', 'media', 'font'))
+
+# musickit bundles and analytics beacons, none of them changes what the parsers extract
+HEAVY_HOSTS = (
+    'js-cdn.music.apple.com',
+    'xp.apple.com',
+    'metrics.apple.com',
+    'securemetrics.apple.com',
+    'supportmetrics.apple.com',
+    'google-analytics.com',
+    'googletagmanager.com',
+)
+
+
+def _match_host(host: str, patterns: tuple[str, ...]) -> bool:
+    return any(host == pattern or host.endswith(f'.{pattern}') for pattern in patterns)
+
+
+@dataclass(frozen=True)
+class BlockProfile:
+    name: str
+    denied_resource_types: frozenset = frozenset()
+    denied_hosts: tuple[str, ...] = ()
+    allowed_hosts: tuple[str, ...] = ()
+
+    @property
+    def blocks_anything(self) -> bool:
+        return bool(self.denied_resource_types or self.denied_hosts)
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        if resource_type == 'document':
+            return False
+        host = urlsplit(url).hostname or ''
+        if _match_host(host, self.allowed_hosts):
+            return False
+        return resource_type in self.denied_resource_types or _match_host(host, self.denied_hosts)
+
+
+BLOCK_PROFILES = {profile.name: profile for profile in (
+    BlockProfile(name='full'),
+    BlockProfile(name='no-media', denied_resource_types=MEDIA_RESOURCE_TYPES),
+    BlockProfile(
+        name='minimal',
+        denied_resource_types=MEDIA_RESOURCE_TYPES | {'texttrack', 'eventsource', 'websocket', 'manifest', 'other'},
+        denied_hosts=HEAVY_HOSTS,
+    ),
+)}
+DEFAULT_BLOCK_PROFILE = 'full'
+
+
+def get_block_profile(name: str) -> BlockProfile:
+    if name not in BLOCK_PROFILES:
+        raise ValueError(f'unknown block profile {name}, expected one of {list(BLOCK_PROFILES)}')
+    return BLOCK_PROFILES[name]
+
+
+class RouteStats:
+    def __init__(self):
+        self.pages = defaultdict(lambda: dict(requests=0, blocked=0, bytes=0))
+        self._documents = {}
+        self._lock = Lock()
+
+    def _page_key(self, request: 'Request') -> str:
+        from playwright.sync_api import Error as PlaywrightError
+
+        # traffic is attributed to the document the page was showing when the request was made
+        try:
+            page = request.frame.page
+        except PlaywrightError:
+            return request.url
+        if request.is_navigation_request() and request.frame == page.main_frame:
+            self._documents[page] = request.url
+        return self._documents.get(page, request.url)
+
+    def record_request(self, request: 'Request'):
+        with self._lock:
+            self.pages[self._page_key(request)]['requests'] += 1
+
+    def record_blocked(self, request: 'Request'):
+        with self._lock:
+            self.pages[self._page_key(request)]['blocked'] += 1
+
+    def record_response(self, response: 'Response'):
+        from playwright.sync_api import Error as PlaywrightError
+
+        # chunked and compressed responses often come without a content-length, the browser still knows the body size
+        try:
+            size = response.request.sizes()['responseBodySize']
+        except PlaywrightError:
+            size = response.headers.get('content-length')
+            if not size or not size.isdigit():
+                return
+        with self._lock:
+            self.pages[self._page_key(response.request)]['bytes'] += int(size)
+
+    def totals(self) -> dict:
+        totals = dict(requests=0, blocked=0, bytes=0)
+        for counters in self.pages.values():
+            for key, value in counters.items():
+                totals[key] += value
+        return totals
+
+    def summary(self) -> str:
+        totals = self.totals()
+        return (f"{len(self.pages)} page(s), {totals['requests']} request(s), {totals['blocked']} blocked, "
+                f"{totals['bytes'] / 1024:.0f} KB received")
+
+
+def install_block_profile(ctx: 'BrowserContext', profile: str, stats: RouteStats = None) -> Callable[[], None]:
+    block_profile = get_block_profile(profile)
+    if stats:
+        ctx.on('request', stats.record_request)
+        ctx.on('response', stats.record_response)
+
+    def handle(route: 'Route'):
+        if block_profile.should_block(route.request.resource_type, route.request.url):
+            if stats:
+                stats.record_blocked(route.request)
+            route.abort('blockedbyclient')
+        else:
+            route.fallback()
+
+    # routing disables the browser cache, so the full profile stays off the request path
+    if block_profile.blocks_anything:
+        ctx.route('**/*', handle)
+
+    def uninstall():
+        # a warm context outlives the crawl it was set up for
+        if stats:
+            ctx.remove_listener('request', stats.record_request)
+            ctx.remove_listener('response', stats.record_response)
+        if block_profile.blocks_anything:
+            ctx.unroute('**/*', handle)
+
+    return uninstall
+
+
+async def install_block_profile_async(ctx: 'AsyncBrowserContext', profile: str, stats: RouteStats = None):
+    block_profile = get_block_profile(profile)
+    if stats:
+        ctx.on('request', stats.record_request)
+        ctx.on('response', stats.record_response)
+    if not block_profile.blocks_anything:
+        return
+
+    async def handle(route: 'AsyncRoute'):
+        if block_profile.should_block(route.request.resource_type, route.request.url):
+            if stats:
+                stats.record_blocked(route.request)
+            await route.abort('blockedbyclient')
+        else:
+            await route.fallback()
+
+    await ctx.route('**/*', handle)
@@ -0,0 +1,196 @@
+import csv
+import json
+import sys
+from importlib.util import find_spec
+from typing import TextIO, Optional, Iterator
+
+from app.records import AppInfo, Compatibility, compact_record, as_dict
+
+LIST_SEPARATOR = ';'
+
+# typed columns of the columnar formats, any other record key is written as a string or a list column
+# device labels without a compatibility flag are kept as a list next to the flags
+APP_COLUMNS = dict(app_id='int', app_name='str', app_url='str', app_targets='flags', app_other_targets='list')
+PARQUET_ROW_GROUP = 65536
+
+
+class Sink:
+    def __init__(self, stream: TextIO = None, path: str = None):
+        self._owns_stream = stream is None and path is not None
+        self.stream = stream or (open(path, 'w', newline='') if path else sys.stdout)
+        self.count = 0
+
+    def write(self, record: dict | AppInfo):
+        raise NotImplementedError
+
+    def close(self):
+        self.stream.flush()
+        if self._owns_stream:
+            self.stream.close()
+
+    def __enter__(self) -> 'Sink':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class JsonSink(Sink):
+    # the legacy output: one indented array written once the crawl is over
+    def __init__(self, stream: TextIO = None, path: str = None, header: str = ''):
+        super().__init__(stream=stream, path=path)
+        self.header = header
+        self.records = []
+
+    def write(self, record: dict | AppInfo):
+        # held as compact records until the array is written
+        self.records.append(compact_record(record) if isinstance(record, dict) else record)
+        self.count += 1
+
+    def close(self):
+        self.stream.write(f'{self.header}{json.dumps(list(map(as_dict, self.records)), indent=4)}\n')
+        super().close()
+
+
+class NdjsonSink(Sink):
+    def write(self, record: dict | AppInfo):
+        self.stream.write(json.dumps(as_dict(record), ensure_ascii=False) + '\n')
+        self.stream.flush()
+        self.count += 1
+
+
+class CsvSink(Sink):
+    def __init__(self, stream: TextIO = None, path: str = None):
+        super().__init__(stream=stream, path=path)
+        self._writer: Optional[csv.DictWriter] = None
+
+    def write(self, record: dict | AppInfo):
+        row = {key: LIST_SEPARATOR.join(value) if isinstance(value, list) else value
+               for key, value in as_dict(record).items()}
+        if self._writer is None:
+            self._writer = csv.DictWriter(self.stream, fieldnames=list(row))
+            self._writer.writeheader()
+        self._writer.writerow(row)
+        self.stream.flush()
+        self.count += 1
+
+
+def get_app_columns(record: dict | AppInfo) -> dict[str, str]:
+    # the first record decides the type, app_storefronts is a list of storefront codes
+    extra = {key: 'list' if isinstance(value, (list, tuple)) else 'str'
+             for key, value in as_dict(record).items() if key not in APP_COLUMNS}
+    return dict(APP_COLUMNS, **extra)
+
+
+def to_columns(record: dict | AppInfo, columns: dict[str, str]) -> list:
+    # ids as integers and the compatibility as its bit flags, the rest as given
+    info = record if isinstance(record, AppInfo) else AppInfo.from_dict(record)
+    data = {} if isinstance(record, AppInfo) else record
+    values = dict(app_id=info.id, app_name=info.name, app_url=info.url, app_targets=int(info.targets),
+                  app_other_targets=list(info.other_targets))
+    return [values[key] if key in values else data.get(key) for key in columns]
+
+
+class TypedCsvSink(Sink):
+    # the header row names each column with its type, `name:type`
+    def __init__(self, stream: TextIO = None, path: str = None):
+        super().__init__(stream=stream, path=path)
+        self.columns: Optional[dict[str, str]] = None
+        self._writer = csv.writer(self.stream)
+
+    def write(self, record: dict | AppInfo):
+        if self.columns is None:
+            self.columns = get_app_columns(record)
+            self._writer.writerow([f'{key}:{kind}' for key, kind in self.columns.items()])
+        self._writer.writerow([LIST_SEPARATOR.join(value or ()) if kind == 'list' else value
+                               for kind, value in zip(self.columns.values(), to_columns(record, self.columns))])
+        self.count += 1
+
+
+def iter_typed_csv(stream: TextIO) -> Iterator[dict]:
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = [tuple(column.rsplit(':', 1)) for column in header]
+    for row in reader:
+        record = {}
+        for (key, kind), value in zip(columns, row):
+            if kind == 'int':
+                record[key] = int(value) if value else None
+            elif kind == 'flags':
+                record[key] = Compatibility(int(value or 0))
+            elif kind == 'list':
+                record[key] = value.split(LIST_SEPARATOR) if value else []
+            else:
+                record[key] = value
+        yield record
+
+
+class ParquetSink(Sink):
+    # rows are buffered per column and written a row group at a time
+    def __init__(self, stream=None, path: str = None, row_group: int = PARQUET_ROW_GROUP):
+        if path is None:
+            raise ValueError('the parquet format needs an output file')
+        import pyarrow
+        import pyarrow.parquet
+
+        self._pa, self._pq = pyarrow, pyarrow.parquet
+        self.path = path
+        self.row_group = row_group
+        self.columns: Optional[dict[str, str]] = None
+        self.count = 0
+        self._buffer: list[list] = []
+        self._writer = None
+
+    def _schema(self):
+        kinds = dict(int=self._pa.int64(), str=self._pa.string(), flags=self._pa.uint8(),
+                     list=self._pa.list_(self._pa.string()))
+        return self._pa.schema([(key, kinds[kind]) for key, kind in self.columns.items()])
+
+    def _flush_rows(self):
+        if not self._buffer:
+            return
+        schema = self._schema()
+        table = self._pa.Table.from_arrays(
+            [self._pa.array(values, type=field.type) for values, field in zip(self._buffer, schema)], schema=schema)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self.path, schema)
+        self._writer.write_table(table)
+        self._buffer = [[] for _ in self.columns]
+
+    def write(self, record: dict | AppInfo):
+        if self.columns is None:
+            self.columns = get_app_columns(record)
+            self._buffer = [[] for _ in self.columns]
+        for values, value in zip(self._buffer, to_columns(record, self.columns)):
+            values.append(value)
+        self.count += 1
+        if len(self._buffer[0]) >= self.row_group:
+            self._flush_rows()
+
+    def close(self):
+        self._flush_rows()
+        if self._writer is None:
+            # an empty crawl still leaves a file with the schema
+            self.columns = self.columns or dict(APP_COLUMNS)
+            self._writer = self._pq.ParquetWriter(self.path, self._schema())
+        self._writer.close()
+
+
+SINKS = dict(
+    json=JsonSink,
+    ndjson=NdjsonSink,
+    csv=CsvSink,
+    tcsv=TypedCsvSink,
+)
+
+# pyarrow is optional, the format is only offered where it is installed
+if find_spec('pyarrow') is not None:
+    SINKS['parquet'] = ParquetSink
+
+
+def open_sink(fmt: str, path: str = None, **kwargs) -> Sink:
+    if fmt not in SINKS:
+        raise ValueError(f'unknown output format {fmt}, expected one of {list(SINKS)}')
+    return SINKS[fmt](path=path, **kwargs)
@@ -0,0 +1,49 @@
+from typing import Iterable
+
+from playwright.sync_api import BrowserContext
+
+from app.tracing import span, count
+from app.utils import get_app_id_from_app_url, get_storefront_url
+
+
+def merge_storefront_app_urls(app_urls_by_storefront: dict[str, list[str]]) \
+        -> tuple[list[str], dict[str, list[str]]]:
+    # an app listed by several storefronts is crawled once, from the first storefront that lists it
+    app_urls, availability, url_by_id = [], {}, {}
+    for storefront, storefront_app_urls in app_urls_by_storefront.items():
+        for app_url in storefront_app_urls:
+            app_id = get_app_id_from_app_url(app_url)
+            if app_id not in url_by_id:
+                url_by_id[app_id] = app_url
+                app_urls.append(app_url)
+                availability[app_url] = []
+            storefronts = availability[url_by_id[app_id]]
+            if storefront not in storefronts:
+                storefronts.append(storefront)
+    return app_urls, availability
+
+
+def check_availability(ctx: BrowserContext, app_url: str, storefront: str) -> bool:
+    # a head request is enough, a storefront without the app answers with an error or a redirect
+    response = ctx.request.head(get_storefront_url(app_url, storefront), max_redirects=0, fail_on_status_code=False)
+    try:
+        return response.status == 200
+    finally:
+        response.dispose()
+
+
+def check_storefronts(ctx: BrowserContext, availability: dict[str, list[str]], storefronts: Iterable[str]) \
+        -> dict[str, list[str]]:
+    # storefronts whose developer page did not list an app get one request each, results keep the given order
+    storefronts = list(storefronts)
+    checked = {}
+    for app_url, listed in availability.items():
+        available = set(listed)
+        with span('storefront.check'):
+            for storefront in storefronts:
+                if storefront not in available:
+                    count('storefront.availability_checks')
+                    if check_availability(ctx, app_url=app_url, storefront=storefront):
+                        available.add(storefront)
+        checked[app_url] = [storefront for storefront in storefronts if storefront in available]
+    return checked
@@ -0,0 +1,189 @@
+import codecs
+import re
+from html.parser import HTMLParser
+from typing import List, Iterable, Tuple, Optional
+
+from app.parsers import AppInfoParser
+from app.utils import clean_text
+
+script_start_re = re.compile(r'<script\b[^>]*>', flags=re.IGNORECASE)
+script_end_re = re.compile(r'</script\s*>', flags=re.IGNORECASE)
+
+# enough to hold a closing script tag split across two chunks
+SCRIPT_END_TAIL = 16
+
+
+class _Done(Exception):
+    pass
+
+
+# for pages read from a file or a socket in chunks and parsed once, without keeping them, as `parse --parser streaming`
+# does. the http fetch engine keeps
+# every page for the archive and the cache, so it parses the embedded json of the whole body instead
+class StreamingAppInfoParser(HTMLParser):
+    def __init__(self, html: str | bytes = None):
+        super().__init__(convert_charrefs=True)
+        self.url: Optional[str] = None
+        self.id: Optional[str] = None
+        self.name: Optional[str] = None
+        self.compatibilities: Optional[List[str]] = None
+        self.languages: Optional[List[str]] = None
+        self.done = False
+
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._pending = ''
+        self._in_script = False
+
+        # text capturing, `_capture` is the tag whose end stops it
+        self._capture: Optional[str] = None
+        self._captured: List[str] = []
+
+        # position inside the information list
+        self._info_depth = 0
+        self._term = ''
+        self._section: Optional[str] = None
+
+        # a whole page is one chunk, like the other parsers take it
+        if html is not None:
+            self.feed(html)
+            self.close()
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[str | bytes]) -> 'StreamingAppInfoParser':
+        parser = cls()
+        for chunk in chunks:
+            if parser.feed(chunk):
+                break
+        parser.close()
+        return parser
+
+    def feed(self, data: str | bytes) -> bool:
+        if self.done:
+            return True
+        if isinstance(data, bytes):
+            data = self._decoder.decode(data)
+        try:
+            super().feed(self._drop_scripts(data))
+        except _Done:
+            self.done = True
+            self.reset()
+            self._pending = ''
+        return self.done
+
+    def close(self):
+        if not self.done:
+            super().close()
+
+    def _drop_scripts(self, data: str) -> str:
+        # script bodies are never needed, so they are dropped before the tokenizer buffers them
+        data = self._pending + data
+        self._pending = ''
+        out = []
+        pos = 0
+        while pos < len(data):
+            if self._in_script:
+                match_obj = script_end_re.search(data, pos)
+                if not match_obj:
+                    self._pending = data[max(pos, len(data) - SCRIPT_END_TAIL):]
+                    break
+                self._in_script = False
+                pos = match_obj.start()
+                continue
+
+            match_obj = script_start_re.search(data, pos)
+            if match_obj:
+                out.append(data[pos:match_obj.end()])
+                self._in_script = True
+                pos = match_obj.end()
+                continue
+
+            # keep a possibly incomplete start tag for the next chunk
+            tag_pos = data.rfind('<', pos)
+            if tag_pos >= 0 and '>' not in data[tag_pos:]:
+                out.append(data[pos:tag_pos])
+                self._pending = data[tag_pos:]
+            else:
+                out.append(data[pos:])
+            break
+        return ''.join(out)
+
+    def _start_capture(self, tag: str):
+        self._capture = tag
+        self._captured = []
+
+    def _end_capture(self) -> str:
+        self._capture = None
+        text = clean_text(''.join(self._captured))
+        self._captured = []
+        return text
+
+    def _check_done(self):
+        if None not in (self.url, self.id, self.name, self.compatibilities, self.languages):
+            raise _Done()
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, str | None]]):
+        attrs = dict(attrs)
+        classes = (attrs.get('class') or '').split()
+
+        if tag == 'meta':
+            if attrs.get('property') == 'og:url' and self.url is None:
+                self.url = attrs.get('content') or ''
+            elif attrs.get('name') == 'apple:content_id' and self.id is None:
+                self.id = attrs.get('content') or ''
+        elif tag == 'h1' and 'product-header__title' in classes and self.name is None:
+            self._start_capture('h1')
+        elif tag == 'dl' and (self._info_depth or 'information-list--app' in classes):
+            self._info_depth += 1
+        elif tag == 'dt' and self._info_depth == 1:
+            self._start_capture('dt')
+        elif tag == 'dt' and self._info_depth == 2 and self._section == 'compatibility':
+            self._start_capture('dt')
+        elif tag == 'dd' and self._info_depth == 1:
+            if 'Compatibility' in self._term:
+                self._section = 'compatibility'
+                self.compatibilities = []
+            elif 'Languages' in self._term:
+                self._section = 'languages'
+                self._start_capture('dd')
+
+    def handle_endtag(self, tag: str):
+        if tag == 'dl' and self._info_depth:
+            self._info_depth -= 1
+        elif tag == self._capture == 'h1':
+            self.name = self._end_capture().split('\n')[0]
+        elif tag == self._capture == 'dt':
+            text = self._end_capture()
+            if self._info_depth == 1:
+                self._term = text
+            elif self._section == 'compatibility':
+                self.compatibilities.append(text)
+        elif tag == 'dd' and self._info_depth == 1 and self._section:
+            if self._section == 'languages':
+                self.languages = list(map(clean_text, self._end_capture().split(sep=',')))
+            self._section = None
+            self._term = ''
+        else:
+            return
+        self._check_done()
+
+    def handle_data(self, data: str):
+        if self._capture:
+            self._captured.append(data)
+
+    def parse_url(self) -> str:
+        return self.url or ''
+
+    def parse_id(self) -> str:
+        return self.id or ''
+
+    def parse_name(self) -> str:
+        return self.name or ''
+
+    def parse_compatibilities(self) -> List[str]:
+        return list(self.compatibilities or [])
+
+    def parse_languages(self) -> List[str]:
+        return list(self.languages) if self.languages is not None else ['']
+
+    parse = AppInfoParser.parse
+    parse_info = AppInfoParser.parse_info
@@ -0,0 +1,108 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from statistics import quantiles
+from typing import Iterator, Optional, ContextManager
+
+JSON_LINES_EXTENSIONS = ('.jsonl', '.ndjson')
+
+
+def percentile(values: list[float], pct: int) -> float:
+    if len(values) < 2:
+        return values[0]
+    return quantiles(values, n=100, method='inclusive')[pct - 1]
+
+
+class Tracer:
+    def __init__(self):
+        self.events: list[dict] = []
+        self.counters: dict[str, float] = {}
+        self._durations: dict[str, list[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self.pid = os.getpid()
+
+    def _ts_us(self, at: float) -> float:
+        return round((at - self._origin) * 1e6, 1)
+
+    @contextmanager
+    def span(self, name: str, **args) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            # complete events of the chrome trace format, one per span
+            event = dict(name=name, ph='X', ts=self._ts_us(start), dur=round((end - start) * 1e6, 1),
+                         pid=self.pid, tid=threading.get_ident(), args=args)
+            with self._lock:
+                self.events.append(event)
+                self._durations[name].append(end - start)
+
+    def count(self, name: str, value: float = 1):
+        at = time.perf_counter()
+        with self._lock:
+            total = self.counters[name] = self.counters.get(name, 0) + value
+            self.events.append(dict(name=name, ph='C', ts=self._ts_us(at), pid=self.pid, args={name: total}))
+
+    def stats(self) -> dict[str, dict]:
+        with self._lock:
+            durations = {name: sorted(values) for name, values in self._durations.items()}
+        return {name: dict(count=len(values), total_s=sum(values), p50_s=percentile(values, 50),
+                           p95_s=percentile(values, 95))
+                for name, values in sorted(durations.items())}
+
+    def summary(self) -> str:
+        lines = [f"{'stage':<28}{'count':>8}{'total (s)':>12}{'p50 (ms)':>11}{'p95 (ms)':>11}"]
+        for name, stats in self.stats().items():
+            lines.append(f"{name:<28}{stats['count']:>8}{stats['total_s']:>12.3f}"
+                         f"{stats['p50_s'] * 1000:>11.1f}{stats['p95_s'] * 1000:>11.1f}")
+        for name, total in sorted(self.counters.items()):
+            lines.append(f"{name:<28}{total:>8g}")
+        return '\n'.join(lines)
+
+    def write(self, path: str):
+        with self._lock:
+            events = list(self.events)
+        with open(path, 'w') as f:
+            if path.endswith(JSON_LINES_EXTENSIONS):
+                for event in events:
+                    f.write(json.dumps(event) + '\n')
+            else:
+                # loadable by chrome://tracing and perfetto
+                json.dump(dict(traceEvents=events, displayTimeUnit='ms'), f)
+
+
+_tracer: Optional[Tracer] = None
+_NULL_SPAN = nullcontext()
+
+
+def span(name: str, **args) -> ContextManager:
+    # a disabled tracer costs one global lookup per stage
+    if _tracer is None:
+        return _NULL_SPAN
+    return _tracer.span(name, **args)
+
+
+def count(name: str, value: float = 1):
+    if _tracer is not None:
+        _tracer.count(name, value)
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+def enable_tracing() -> Tracer:
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def disable_tracing() -> Optional[Tracer]:
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
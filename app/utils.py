@@ -1,4 +1,5 @@
 import re
+from functools import lru_cache
 import unicodedata
 from random import randint
 import platform
@@ -11,9 +12,14 @@ company_url_re = re.compile(
     flags=re.IGNORECASE)
 
 app_url_re = re.compile(
-    r'^https://apps.apple.com/(\w{2}/)?app/[\w\-%]+/id\d+(\?([\w\-]+=[\w\-]+&?)*)?$',
+    r'^https://apps.apple.com/(\w{2}/)?app/[\w\-%]+/id(\d+)(\?([\w\-]+=[\w\-]+&?)*)?$',
     flags=re.IGNORECASE)
 
+storefront_prefix_re = re.compile(r'^https://apps.apple.com/(\w{2}/)?', flags=re.IGNORECASE)
+storefront_re = re.compile(r'^[a-z]{2}$')
+
+url_key_re = re.compile(r'^https://apps.apple.com/(\w{2}/)?(app|developer)/[^/?#]+/id(\d+)', flags=re.IGNORECASE)
+
 
 def normalize_text(text: str): return unicodedata.normalize('NFKD', text)
 
@@ -49,30 +55,76 @@ def get_developer_name_from_company_url(url: str) -> str | None:
         return match_obj.group(2)
 
 
-def get_first_longest_common_substring(str1: str, str2: str) -> str:
-    m = len(str1)
-    n = len(str2)
-    counter = [[0]*(n+1) for x in range(m+1)]
+def get_app_id_from_app_url(url: str) -> str | None:
+    match_obj = app_url_re.fullmatch(url)
+    if match_obj:
+        return match_obj.group(2)
+
+
+def get_storefront_from_url(url: str) -> str | None:
+    match_obj = app_url_re.fullmatch(url) or company_url_re.fullmatch(url)
+    if match_obj:
+        return (match_obj.group(1) or '').rstrip('/').lower()
+
+
+def get_url_key(url: str) -> str:
+    # app and developer pages are told apart by storefront and numeric id, their slug and query string do not matter
+    match_obj = url_key_re.match(url)
+    if match_obj:
+        storefront = (match_obj.group(1) or '').rstrip('/').lower()
+        return f'{match_obj.group(2).lower()}/{storefront}/{match_obj.group(3)}'
+    return url.split('#', 1)[0].split('?', 1)[0]
+
+
+def get_storefront_url(url: str, storefront: str) -> str:
+    # the same developer or app page as seen from another storefront
+    return storefront_prefix_re.sub(f'https://apps.apple.com/{storefront}/', url, count=1)
+
+
+def parse_storefronts(value: str) -> list[str]:
+    storefronts = []
+    for storefront in value.split(','):
+        storefront = storefront.strip().lower()
+        if not storefront_re.fullmatch(storefront):
+            raise ValueError(f'invalid storefront {storefront!r}, expected a two-letter country code')
+        if storefront not in storefronts:
+            storefronts.append(storefront)
+    return storefronts
+
+
+def get_longest_common_substrings(str1: str, str2: str) -> tuple[int, set[str]]:
+    # only the previous row of the dp table is kept, and only at the positions where characters match
+    positions = {}
+    for j, char in enumerate(str2):
+        positions.setdefault(char, []).append(j)
+
     longest = 0
     lcs_set = set()
-    for i in range(m):
-        for j in range(n):
-            if str1[i] == str2[j]:
-                c = counter[i][j] + 1
-                counter[i+1][j+1] = c
-                if c > longest:
-                    lcs_set = set()
-                    longest = c
-                    lcs_set.add(str1[i - c + 1:i + 1])
-                elif c == longest:
-                    lcs_set.add(str1[i - c + 1:i + 1])
+    prev_row = {}
+    for i, char in enumerate(str1):
+        row = {}
+        for j in positions.get(char, ()):
+            c = prev_row.get(j - 1, 0) + 1
+            row[j] = c
+            if c > longest:
+                lcs_set = set()
+                longest = c
+                lcs_set.add(str1[i - c + 1:i + 1])
+            elif c == longest:
+                lcs_set.add(str1[i - c + 1:i + 1])
+        prev_row = row
+
+    return longest, lcs_set
 
-    return ''.join(lcs_set)
+
+def get_first_longest_common_substring(str1: str, str2: str) -> str:
+    return ''.join(get_longest_common_substrings(str1, str2)[1])
 
 
+@lru_cache(maxsize=1 << 16)
 def calc_likelihood(str1: str, str2: str) -> float:
-    common = get_first_longest_common_substring(str1, str2)
-    return len(common)/max(len(str1), len(str2))
+    longest, lcs_set = get_longest_common_substrings(str1, str2)
+    return longest * len(lcs_set) / max(len(str1), len(str2))
 
 
 def get_best_matching_text(hint_text: str, texts: list[str]) -> str | None:
@@ -0,0 +1,131 @@
+import argparse
+import multiprocessing
+import os
+import socket
+import time
+from typing import Callable, Optional
+
+from app.crawlers import craw_app_info
+from app.discovery import DISCOVERY_PROFILES, DEFAULT_DISCOVERY
+from playwright.sync_api import Error as PlaywrightError
+
+from app.pacing import Pacer, ThrottledError, retry, DEFAULT_RATE, DEFAULT_MAX_RATE, DEFAULT_RETRIES
+from app.pool import BrowserPool, DEFAULT_RECYCLE_AFTER
+from app.routing import BLOCK_PROFILES, DEFAULT_BLOCK_PROFILE
+from app.workqueue import WorkQueue, DEFAULT_LEASE_S, DEFAULT_POLL_S
+
+
+def default_owner() -> str:
+    return f'{socket.gethostname()}-{os.getpid()}'
+
+
+def run_worker(queue: WorkQueue, crawl: Callable[[str], dict], owner: str = None, poll_s: float = DEFAULT_POLL_S,
+               idle_exit_s: Optional[float] = None, **kwargs) -> int:
+    log = lambda *args, **kw: None
+    if kwargs.get('print'):
+        log = print
+
+    owner = owner or default_owner()
+    processed = 0
+    idle_since = time.monotonic()
+    while True:
+        items = queue.lease(owner=owner)
+        if not items:
+            if idle_exit_s is not None and time.monotonic() - idle_since >= idle_exit_s:
+                break
+            time.sleep(poll_s)
+            continue
+
+        for item in items:
+            try:
+                app_data = crawl(item.app_url)
+            except Exception as e:
+                queue.nack(item.id, owner=owner, error=repr(e))
+                log(f'=> [{owner}] Failed {item.app_url} (attempt {item.attempts}): {e!r}')
+                continue
+            if queue.ack(item.id, owner=owner, result=app_data):
+                processed += 1
+                log(f'=> [{owner}] Crawled {item.app_url}')
+        idle_since = time.monotonic()
+    return processed
+
+
+def run_browser_worker(queue_path: str, **kwargs) -> int:
+    discovery = kwargs.get('discovery') or DEFAULT_DISCOVERY
+    block_profile = kwargs.get('block_profile') or DEFAULT_BLOCK_PROFILE
+    # apps still failing after the retries go back to the queue, the pacer slows this worker down when the store
+    # pushes back
+    max_rate = kwargs.get('max_rate') or DEFAULT_MAX_RATE
+    pacer = Pacer(rate=min(kwargs.get('rate') or DEFAULT_RATE, max_rate), max_rate=max_rate)
+    retries = DEFAULT_RETRIES if kwargs.get('retries') is None else kwargs['retries']
+
+    with WorkQueue(queue_path, lease_s=kwargs.get('lease_s') or DEFAULT_LEASE_S) as queue, \
+            BrowserPool(headless=kwargs.get('headless', False), slow_mo=kwargs.get('slow_mo', None),
+                        recycle_after=kwargs.get('recycle_after') or DEFAULT_RECYCLE_AFTER) as pool:
+        def crawl(app_url: str) -> dict:
+            # each app gets a lease, so the context is recycled between apps when it has served enough pages
+            with pool.lease(block_profile=block_profile) as ctx:
+                page = ctx.new_page()
+                return retry(lambda: craw_app_info(page=page, app_url=app_url, discovery=discovery, pacer=pacer),
+                             retries=retries, retry_on=(PlaywrightError, ThrottledError), pacer=pacer)
+
+        return run_worker(queue, crawl, owner=kwargs.get('owner'), poll_s=kwargs.get('poll_s') or DEFAULT_POLL_S,
+                          idle_exit_s=kwargs.get('idle_exit_s'), print=kwargs.get('print'))
+
+
+def spawn_workers(queue_path: str, workers: int, **kwargs) -> list[multiprocessing.Process]:
+    # spawned rather than forked, a forked child would inherit the parent's playwright threads
+    mp_context = multiprocessing.get_context('spawn')
+    processes = []
+    for _ in range(workers):
+        process = mp_context.Process(target=run_browser_worker, args=(queue_path,), kwargs=kwargs, daemon=True)
+        process.start()
+        processes.append(process)
+    return processes
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='crawl app pages leased from a shared work queue.')
+    parser.add_argument('-q', '--queue', type=str, required=True, help='work queue file written by the coordinator')
+    parser.add_argument('-v', '--verbose', help='print out data during progress', action='store_true')
+    parser.add_argument('-b', '--browser', help='show browser if possible', action='store_true', default=False)
+    parser.add_argument('-s', '--slow_mo', type=float, help='slow down by an amount of milliseconds', default=None)
+    parser.add_argument('--owner', type=str, default=None,
+                        help='worker name recorded on its leases, host-pid by default')
+    parser.add_argument('--lease', type=float, default=DEFAULT_LEASE_S,
+                        help='seconds an app is reserved for this worker before others may retry it')
+    parser.add_argument('--idle_exit', '--idle-exit', type=float, default=None,
+                        help='exit after the queue has been empty for this many seconds, run forever if not given')
+    parser.add_argument('-d', '--discovery', choices=list(DISCOVERY_PROFILES), default=DEFAULT_DISCOVERY,
+                        help='page discovery, one injected script (observer) or human-like scrolling (human)')
+    parser.add_argument('--block_profile', '--block-profile', choices=list(BLOCK_PROFILES),
+                        default=DEFAULT_BLOCK_PROFILE, help='requests aborted by the browser')
+    parser.add_argument('--recycle_after', '--recycle-after', type=int, default=DEFAULT_RECYCLE_AFTER,
+                        help='page loads before the browser context is replaced')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help='page loads per second to start from')
+    parser.add_argument('--max_rate', '--max-rate', type=float, default=DEFAULT_MAX_RATE,
+                        help='page loads per second the worker never goes above')
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                        help='retries of a failed app page before it goes back to the queue')
+    parser = parser.parse_args(args)
+
+    processed = run_browser_worker(
+        parser.queue,
+        print=parser.verbose,
+        headless=not parser.browser,
+        slow_mo=parser.slow_mo,
+        owner=parser.owner,
+        lease_s=parser.lease,
+        idle_exit_s=parser.idle_exit,
+        discovery=parser.discovery,
+        block_profile=parser.block_profile,
+        recycle_after=parser.recycle_after,
+        rate=parser.rate,
+        max_rate=parser.max_rate,
+        retries=parser.retries
+    )
+    print(f'=> Crawled {processed} app(s)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+import json
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+
+DEFAULT_LEASE_S = 120.0
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_POLL_S = 1.0
+# items are numbered as they finish, so the coordinator only reads what finished since its last poll
+NEXT_FINISHED_SEQ = '(SELECT COALESCE(MAX(finished_seq), 0) + 1 FROM work_items)'
+
+
+@dataclass
+class WorkItem:
+    id: int
+    job: str
+    app_url: str
+    attempts: int
+
+
+class WorkQueue:
+    def __init__(self, path: str, lease_s: float = DEFAULT_LEASE_S, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.lease_s = lease_s
+        self.max_attempts = max_attempts
+        # transactions are opened explicitly, so a lease is taken by exactly one worker process.
+        # the rollback journal, unlike wal, also works for workers on other nodes sharing the file
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS work_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job TEXT NOT NULL,
+                app_url TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                owner TEXT,
+                lease_expires_at REAL,
+                result TEXT,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                run TEXT,
+                finished_seq INTEGER,
+                UNIQUE (job, app_url)
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS work_items_status ON work_items (status, lease_expires_at)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS work_items_finished ON work_items (finished_seq)')
+        # a worker is alive while it keeps polling or holds a lease, it declares for how long on every lease
+        self.conn.execute('CREATE TABLE IF NOT EXISTS workers (owner TEXT PRIMARY KEY, alive_until REAL NOT NULL)')
+
+    def enqueue(self, job: str, app_urls: Iterable[str], run: str = None) -> int:
+        # items of the same run keep their state, so a restarted coordinator reuses finished work.
+        # items a previous run finished are crawled again, the ones still pending or leased are taken over
+        now = time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            added = 0
+            for app_url in app_urls:
+                row = self.conn.execute('SELECT id, status, run FROM work_items WHERE job = ? AND app_url = ?',
+                                        (job, app_url)).fetchone()
+                if row is None:
+                    self.conn.execute('INSERT INTO work_items (job, app_url, run, updated_at) VALUES (?, ?, ?, ?)',
+                                      (job, app_url, run, now))
+                    added += 1
+                elif row[2] != run and row[1] in ('done', 'failed'):
+                    self.conn.execute(
+                        "UPDATE work_items SET status = 'pending', attempts = 0, owner = NULL, "
+                        "lease_expires_at = NULL, result = NULL, error = NULL, finished_seq = NULL, run = ?, "
+                        "updated_at = ? WHERE id = ?",
+                        (run, now, row[0]))
+                    added += 1
+                elif row[2] != run:
+                    self.conn.execute('UPDATE work_items SET run = ?, updated_at = ? WHERE id = ?', (run, now, row[0]))
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        self.conn.execute('COMMIT')
+        return added
+
+    def _expire_leases(self, now: float):
+        # a worker that died holding its lease gives the item up once the lease expires, called in a transaction
+        self.conn.execute(
+            f"UPDATE work_items SET status = 'failed', owner = NULL, error = COALESCE(error, 'lease expired'), "
+            f"finished_seq = {NEXT_FINISHED_SEQ}, updated_at = ? "
+            f"WHERE status = 'leased' AND lease_expires_at < ? AND attempts >= ?",
+            (now, now, self.max_attempts))
+        self.conn.execute(
+            "UPDATE work_items SET status = 'pending', owner = NULL, lease_expires_at = NULL, updated_at = ? "
+            "WHERE status = 'leased' AND lease_expires_at < ?", (now, now))
+
+    def lease(self, owner: str, limit: int = 1, now: float = None) -> list[WorkItem]:
+        now = now or time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._expire_leases(now)
+            self.conn.execute('INSERT OR REPLACE INTO workers (owner, alive_until) VALUES (?, ?)',
+                              (owner, now + self.lease_s))
+            rows = self.conn.execute(
+                "SELECT id, job, app_url, attempts FROM work_items WHERE status = 'pending' ORDER BY id LIMIT ?",
+                (limit,)).fetchall()
+            self.conn.executemany(
+                "UPDATE work_items SET status = 'leased', owner = ?, lease_expires_at = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE id = ?", [(owner, now + self.lease_s, now, row[0]) for row in rows])
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        self.conn.execute('COMMIT')
+        return [WorkItem(id=item_id, job=job, app_url=app_url, attempts=attempts + 1)
+                for item_id, job, app_url, attempts in rows]
+
+    def ack(self, item_id: int, owner: str, result: dict) -> bool:
+        # false when the lease was lost to another worker, whose result is kept instead
+        return self.conn.execute(
+            f"UPDATE work_items SET status = 'done', result = ?, error = NULL, owner = NULL, lease_expires_at = NULL, "
+            f"finished_seq = {NEXT_FINISHED_SEQ}, updated_at = ? WHERE id = ? AND owner = ? AND status = 'leased'",
+            (json.dumps(result), time.time(), item_id, owner)).rowcount == 1
+
+    def nack(self, item_id: int, owner: str, error: str) -> bool:
+        return self.conn.execute(
+            f"UPDATE work_items SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, error = ?, "
+            f"finished_seq = CASE WHEN attempts >= ? THEN {NEXT_FINISHED_SEQ} END, owner = NULL, "
+            f"lease_expires_at = NULL, updated_at = ? WHERE id = ? AND owner = ? AND status = 'leased'",
+            (self.max_attempts, error, self.max_attempts, time.time(), item_id, owner)).rowcount == 1
+
+    def counts(self, job: str = None) -> dict[str, int]:
+        if job is None:
+            rows = self.conn.execute('SELECT status, COUNT(*) FROM work_items GROUP BY status')
+        else:
+            rows = self.conn.execute('SELECT status, COUNT(*) FROM work_items WHERE job = ? GROUP BY status', (job,))
+        return dict(rows.fetchall())
+
+    def live_workers(self, now: float = None) -> int:
+        now = now or time.time()
+        return self.conn.execute('SELECT COUNT(*) FROM workers WHERE alive_until >= ?', (now,)).fetchone()[0]
+
+    def iter_finished(self, job: str, run: str = None, poll_s: float = DEFAULT_POLL_S) \
+            -> Iterator[tuple[str, Optional[dict], Optional[str]]]:
+        # yields (app_url, result, error) once per item of the run, as workers finish them
+        cursor = 0
+        idle_since = time.monotonic()
+        while True:
+            now = time.time()
+            # leases of dead workers expire here as well, a queue nobody leases from anymore still drains
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._expire_leases(now)
+                if self.live_workers(now):
+                    idle_since = time.monotonic()
+                elif time.monotonic() - idle_since >= self.lease_s:
+                    # no worker for a whole lease, what is left of the run is given up
+                    self.conn.execute(
+                        f"UPDATE work_items SET status = 'failed', owner = NULL, lease_expires_at = NULL, "
+                        f"error = COALESCE(error, 'no live worker'), finished_seq = {NEXT_FINISHED_SEQ}, "
+                        f"updated_at = ? WHERE job = ? AND run IS ? AND status IN ('pending', 'leased')",
+                        (now, job, run))
+            except BaseException:
+                self.conn.execute('ROLLBACK')
+                raise
+            self.conn.execute('COMMIT')
+
+            remaining = self.conn.execute(
+                "SELECT COUNT(*) FROM work_items WHERE job = ? AND run IS ? AND status IN ('pending', 'leased')",
+                (job, run)).fetchone()[0]
+            rows = self.conn.execute(
+                "SELECT finished_seq, app_url, result, error FROM work_items "
+                "WHERE finished_seq > ? AND job = ? AND run IS ? ORDER BY finished_seq, id",
+                (cursor, job, run)).fetchall()
+            for finished_seq, app_url, result, error in rows:
+                cursor = max(cursor, finished_seq)
+                yield app_url, json.loads(result) if result else None, error
+            if not remaining:
+                return
+            time.sleep(poll_s)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self) -> 'WorkQueue':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,201 @@
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+from os.path import dirname, abspath, join as join_path
+from threading import Thread, Event
+from typing import Callable
+
+from playwright.sync_api import sync_playwright
+
+from app.crawlers import collect_company_urls, collect_app_urls, craw_app_info
+from app.fetch import FETCH_ENGINES, DEFAULT_HTTP_WORKERS, HttpClient, iter_http_apps
+from app.routing import BLOCK_PROFILES, DEFAULT_BLOCK_PROFILE, install_block_profile
+from app.tracing import percentile
+from tests.integration.mock.replay import ReplayServer, ReplayContext, ReplayHttpClient, route_to_replay
+
+# results are kept out of the working directory and of the tree, the directory is ignored by git
+RESULTS_DIR = join_path(dirname(abspath(__file__)), 'results')
+DEFAULT_THRESHOLD = 0.25
+
+
+def _descendants(pid: int) -> list[int]:
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                # the command name may contain spaces, the parent pid is the second field after it
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    found, stack = [], [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+def rss_kb() -> dict[str, int]:
+    # resident sizes right now, of this process alone and with the browser and playwright driver processes under it
+    sizes = dict(python=0, tree=0)
+    for pid in [os.getpid(), *_descendants(os.getpid())]:
+        try:
+            with open(f'/proc/{pid}/status', 'r') as f:
+                kb = next((int(line.split()[1]) for line in f if line.startswith('VmRSS:')), 0)
+        except OSError:
+            continue
+        sizes['tree'] += kb
+        if pid == os.getpid():
+            sizes['python'] = kb
+    return sizes
+
+
+class RssSampler:
+    # VmHWM and ru_maxrss only ever grow over the whole run, so the peak of a stage is sampled while it runs
+    def __init__(self, interval_s: float = 0.05):
+        self.interval_s = interval_s
+        self.peak_kb = dict(python=0, tree=0)
+        self._stop = Event()
+        self._thread = Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while True:
+            for key, kb in rss_kb().items():
+                self.peak_kb[key] = max(self.peak_kb[key], kb)
+            if self._stop.wait(self.interval_s):
+                break
+
+    def __enter__(self) -> 'RssSampler':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stop.set()
+        self._thread.join()
+
+
+def peak_rss_kb(sampler: RssSampler) -> dict[str, int]:
+    if os.path.isdir('/proc'):
+        return sampler.peak_kb
+    # without /proc only the high water mark of the whole run is known
+    return dict(python_cumulative=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def run_stage(server: ReplayServer, calls: list[Callable]) -> dict:
+    latencies = []
+    pages = server.pages
+    start = time.perf_counter()
+    with RssSampler() as sampler:
+        for call in calls:
+            call_start = time.perf_counter()
+            call()
+            latencies.append(time.perf_counter() - call_start)
+    elapsed_s = time.perf_counter() - start
+    pages = server.pages - pages
+    return dict(
+        calls=len(calls),
+        pages=pages,
+        elapsed_s=round(elapsed_s, 3),
+        pages_per_s=round(pages / elapsed_s, 3),
+        p50_ms=round(percentile(latencies, 50) * 1000, 1),
+        p95_ms=round(percentile(latencies, 95) * 1000, 1),
+        max_ms=round(max(latencies) * 1000, 1),
+        peak_rss_kb=peak_rss_kb(sampler),
+    )
+
+
+def find_regressions(result: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list[str]:
+    regressions = []
+    for stage, base in baseline.get('stages', {}).items():
+        current = result['stages'].get(stage)
+        if current is None:
+            continue
+        if current['p50_ms'] > base['p50_ms'] * (1 + threshold):
+            regressions.append(f"{stage}: p50 {current['p50_ms']}ms, baseline {base['p50_ms']}ms")
+        if current['pages_per_s'] < base['pages_per_s'] * (1 - threshold):
+            regressions.append(f"{stage}: {current['pages_per_s']} pages/s, baseline {base['pages_per_s']} pages/s")
+    return regressions
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(description='benchmark the crawler stages against the offline replay server.')
+    parser.add_argument('-r', '--rounds', type=int, help='searches and developer crawls per stage', default=3)
+    parser.add_argument('-a', '--apps', type=int, help='app pages crawled by craw_app_info', default=24)
+    parser.add_argument('--block_profile', '--block-profile', choices=list(BLOCK_PROFILES),
+                        default=DEFAULT_BLOCK_PROFILE, help='requests aborted by the browser')
+    parser.add_argument('--fetch_engine', '--fetch-engine', choices=FETCH_ENGINES, default='browser',
+                        help='app pages loaded in the browser, fetched over http (no browser is launched), '
+                             'or both (auto) to compare them')
+    parser.add_argument('--http_workers', '--http-workers', type=int, default=DEFAULT_HTTP_WORKERS,
+                        help='app pages fetched concurrently over http')
+    parser.add_argument('-o', '--output', type=str, help='json file the results are written to',
+                        default=join_path(RESULTS_DIR, 'bench_crawlers.json'))
+    parser.add_argument('--baseline', type=str, default=None, help='json results of an earlier run to compare with')
+    parser.add_argument('-t', '--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='tolerated slowdown against the baseline, as a fraction')
+    parser = parser.parse_args(args)
+
+    with ReplayServer() as server:
+        catalog = server.catalog
+        app_urls = (catalog.app_urls() * (parser.apps // len(catalog.app_urls()) + 1))[:parser.apps]
+        stages = {}
+        if parser.fetch_engine != 'http':
+            with sync_playwright() as p:
+                browser = p.chromium.launch(headless=True)
+                context = browser.new_context()
+                route_to_replay(context, server)
+                install_block_profile(context, profile=parser.block_profile)
+                ctx = ReplayContext(context, server)
+                page = ctx.new_page()
+
+                search = lambda: collect_company_urls(ctx=ctx, company_name='netflix')
+                developer = lambda: collect_app_urls(ctx=ctx, company_url=catalog.developer_url)
+                calls = dict(
+                    collect_company_urls=[search] * parser.rounds,
+                    collect_app_urls=[developer] * parser.rounds,
+                    craw_app_info=[lambda url=url: craw_app_info(page=page, app_url=url) for url in app_urls],
+                )
+                stages.update({name: run_stage(server, stage_calls) for name, stage_calls in calls.items()})
+                browser.close()
+        if parser.fetch_engine != 'browser':
+            # one call fetches every app page through the bounded pool, so pages/s is the figure to compare
+            with HttpClient(pool_size=parser.http_workers) as http_client:
+                client = ReplayHttpClient(http_client, server)
+                stages['http_app_info'] = run_stage(server, [
+                    lambda: list(iter_http_apps(client, app_urls, workers=parser.http_workers, retries=0))])
+        result = dict(
+            config=dict(rounds=parser.rounds, apps=parser.apps, block_profile=parser.block_profile,
+                        fetch_engine=parser.fetch_engine, http_workers=parser.http_workers, cpus=os.cpu_count()),
+            stages=stages,
+        )
+
+    print(f"=> Replay benchmark, block profile {parser.block_profile}")
+    print(f"{'stage':<24}{'calls':>7}{'pages':>7}{'pages/s':>10}{'p50 (ms)':>11}{'p95 (ms)':>11}{'rss (MB)':>10}")
+    for name, stage in result['stages'].items():
+        peak_kb = stage['peak_rss_kb'].get('tree', stage['peak_rss_kb'].get('python_cumulative', 0))
+        print(f"{name:<24}{stage['calls']:>7}{stage['pages']:>7}{stage['pages_per_s']:>10.2f}"
+              f"{stage['p50_ms']:>11.0f}{stage['p95_ms']:>11.0f}{peak_kb / 1024:>10.0f}")
+
+    os.makedirs(dirname(abspath(parser.output)), exist_ok=True)
+    with open(parser.output, 'w') as f:
+        json.dump(result, f, indent=4)
+    print(f'=> Results written to {parser.output}')
+
+    if parser.baseline:
+        with open(parser.baseline, 'r') as f:
+            regressions = find_regressions(result, json.load(f), threshold=parser.threshold)
+        if regressions:
+            print(f'=> Regressions over {parser.threshold:.0%}\n' + '\n'.join(regressions))
+            return 1
+        print(f'=> No regression over {parser.threshold:.0%} against {parser.baseline}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
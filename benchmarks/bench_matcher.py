@@ -0,0 +1,67 @@
+import argparse
+import random
+import time
+
+from app.matcher import Matcher
+from app.utils import get_best_matching_text
+
+SYLLABLES = ('ka', 'lo', 'mi', 'ne', 'ra', 'so', 'tu', 'vi', 'ze', 'ban', 'cor', 'dex', 'fin', 'gal', 'hub', 'ion',
+             'jet', 'lux', 'max', 'nov', 'pix', 'qua', 'rex', 'syn', 'tek', 'uni', 'vox', 'wav', 'xen', 'yor')
+SUFFIXES = ('', '-inc', '-ltd', '-llc', '-games', '-studio', '-corporation', '-apps', '-co-ltd')
+
+
+def make_slug(rnd: random.Random) -> str:
+    words = [''.join(rnd.choices(SYLLABLES, k=rnd.randint(2, 4))) for _ in range(rnd.randint(1, 3))]
+    return '-'.join(words) + rnd.choice(SUFFIXES)
+
+
+def make_hint(rnd: random.Random, slug: str) -> str:
+    # what a user types: the leading words, sometimes with a typo
+    hint = slug.split('-')[0] if rnd.random() < 0.5 else slug.rsplit('-', 1)[0]
+    if len(hint) > 4 and rnd.random() < 0.3:
+        pos = rnd.randrange(len(hint))
+        hint = hint[:pos] + hint[pos + 1:]
+    return hint
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='benchmark batch company name matching on synthetic slugs.')
+    parser.add_argument('-n', '--names', type=int, help='number of hints and of candidates', default=10_000)
+    parser.add_argument('-s', '--sample', type=int, help='hints also matched by the exhaustive scan', default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser = parser.parse_args(args)
+
+    rnd = random.Random(parser.seed)
+    candidates = list(dict.fromkeys(make_slug(rnd) for _ in range(parser.names)))
+    targets = [rnd.choice(candidates) for _ in range(parser.names)]
+    hints = [make_hint(rnd, target) for target in targets]
+    print(f"=> {len(hints)} hints x {len(candidates)} candidates")
+
+    start = time.perf_counter()
+    matcher = Matcher(candidates)
+    index_s = time.perf_counter() - start
+    start = time.perf_counter()
+    matches = matcher.match_many(hints)
+    match_s = time.perf_counter() - start
+    print(f"{'indexed':<12}index {index_s:.2f}s, match {match_s:.2f}s, {len(hints) / match_s:.0f} hints/s")
+
+    sample = hints[:parser.sample]
+    start = time.perf_counter()
+    expected = [get_best_matching_text(hint, candidates) for hint in sample]
+    scan_s = (time.perf_counter() - start) / len(sample)
+    print(f"{'exhaustive':<12}{scan_s * 1000:.1f}ms per hint, ~{scan_s * len(hints):.0f}s for every hint")
+
+    # the index only skips names that cannot win, the answers are the same as the exhaustive scan. the likelihood
+    # rewards several distinct short overlaps, so over a large directory the best is often not the planted slug
+    def found(answers: list) -> float:
+        return sum(answer == target for answer, target in zip(answers, targets)) / len(answers)
+
+    agreement = sum(match == exp for match, exp in zip(matches, expected)) / len(sample)
+    print(f"{'agreement':<12}{agreement:.0%} of {len(sample)} sampled hints")
+    assert agreement == 1, 'the indexed matcher disagrees with the exhaustive scan'
+    print(f"{'planted':<12}indexed {found(matches):.0%} of all hints, "
+          f"{found(matches[:len(sample)]):.0%} vs exhaustive {found(expected):.0%} of the sampled hints")
+
+
+if __name__ == '__main__':
+    main()
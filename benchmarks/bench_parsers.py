@@ -0,0 +1,46 @@
+import argparse
+import time
+from functools import partial
+from os.path import join as join_path
+from statistics import median
+
+from app.parsers import AppInfoParser, StructuredAppInfoParser, PARSER_BACKENDS
+from tests.data.snapshots import PARENT_DIR as SNAPSHOT_DIR
+
+SNAPSHOTS = ('app_id363590051.html', 'app_id1193542964.html')
+PARSERS = {
+    **{backend: partial(AppInfoParser, backend=backend) for backend in PARSER_BACKENDS},
+    'structured': StructuredAppInfoParser,
+}
+BASELINE = 'html.parser'
+
+
+def time_parse(parser_cls, html: str, rounds: int) -> float:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        parser = parser_cls(html=html)
+        parser.parse()
+        parser.parse_languages()
+        timings.append(time.perf_counter() - start)
+    return median(timings)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='benchmark per-page parse time on the snapshot fixtures.')
+    parser.add_argument('-r', '--rounds', type=int, help='number of rounds per page', default=10)
+    parser = parser.parse_args(args)
+
+    print(f"=> Median parse time (ms) over {parser.rounds} rounds")
+    print(f"{'snapshot':<24}{'size (KB)':>10}" + ''.join(f'{name:>14}' for name in PARSERS))
+    for snapshot_file in SNAPSHOTS:
+        with open(join_path(SNAPSHOT_DIR, snapshot_file), 'r') as f:
+            html = f.read()
+        timings = {name: time_parse(parser_cls, html, parser.rounds) for name, parser_cls in PARSERS.items()}
+        print(f"{snapshot_file:<24}{len(html) / 1024:>10.0f}"
+              + ''.join(f'{t * 1000:>14.2f}' for t in timings.values()))
+        print(f"{'speedup':<34}" + ''.join(f'{timings[BASELINE] / t:>13.1f}x' for t in timings.values()))
+
+
+if __name__ == '__main__':
+    main()
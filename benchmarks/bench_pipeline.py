@@ -0,0 +1,38 @@
+import argparse
+import os
+import time
+from os.path import join as join_path
+
+from app.pipeline import iter_parsed_apps, APP_PARSERS
+from tests.data.snapshots import PARENT_DIR as SNAPSHOT_DIR
+
+SNAPSHOTS = ('app_id363590051.html', 'app_id1193542964.html')
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='benchmark parse pipeline throughput on the snapshot fixtures.')
+    parser.add_argument('-n', '--pages', type=int, help='number of pages fed to the pipeline', default=64)
+    parser.add_argument('--parser', choices=list(APP_PARSERS), help='app page parser', default='dom')
+    parser = parser.parse_args(args)
+
+    htmls = []
+    for snapshot_file in SNAPSHOTS:
+        with open(join_path(SNAPSHOT_DIR, snapshot_file), 'r') as f:
+            htmls.append(f.read())
+    pages = [(idx, htmls[idx % len(htmls)]) for idx in range(parser.pages)]
+
+    cores = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, 4, cores} & set(range(1, cores + 1)))
+    print(f"=> {parser.pages} pages, parser={parser.parser}, {cores} cores")
+    print(f"{'workers':>8}{'pages/s':>12}{'scaling':>10}")
+    base = None
+    for workers in worker_counts:
+        start = time.perf_counter()
+        count = sum(1 for _ in iter_parsed_apps(pages, workers=workers, parser=parser.parser))
+        throughput = count / (time.perf_counter() - start)
+        base = base or throughput
+        print(f"{workers:>8}{throughput:>12.1f}{throughput / base:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
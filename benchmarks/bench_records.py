@@ -0,0 +1,53 @@
+import argparse
+import gc
+import tracemalloc
+from os.path import join as join_path
+from typing import Callable
+
+from app.parsers import StructuredAppInfoParser
+from app.records import AppInfo
+from tests.data.snapshots import PARENT_DIR as SNAPSHOT_DIR
+
+SNAPSHOTS = ('app_id363590051.html', 'app_id1193542964.html')
+
+
+def measure_kb(build: Callable[[], list]) -> float:
+    gc.collect()
+    tracemalloc.start()
+    records = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return current / 1024
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='compare the memory of legacy dict records and AppInfo records.')
+    parser.add_argument('-n', '--records', type=int, help='number of records held in memory', default=100_000)
+    parser = parser.parse_args(args)
+
+    parsers = []
+    for snapshot_file in SNAPSHOTS:
+        with open(join_path(SNAPSHOT_DIR, snapshot_file), 'r') as f:
+            parsers.append(StructuredAppInfoParser(html=f.read()))
+    samples = [(p.parse(), p.parse_languages()) for p in parsers]
+
+    def copy_dict(idx: int) -> dict:
+        # fresh strings per record, as every parsed page produces its own
+        data, languages = samples[idx % len(samples)]
+        return dict(app_name=''.join(data['app_name']), app_id=f"id{int(data['app_id'][2:]) + idx}",
+                    app_url=''.join(data['app_url']), app_targets=[''.join(t) for t in data['app_targets']],
+                    app_languages=[''.join(language) for language in languages])
+
+    dict_kb = measure_kb(lambda: [copy_dict(idx) for idx in range(parser.records)])
+    info_kb = measure_kb(lambda: [AppInfo.from_dict(copy_dict(idx)) for idx in range(parser.records)])
+
+    print(f"=> Memory of {parser.records} records")
+    print(f"{'record':<12}{'total (MB)':>12}{'per record (B)':>16}")
+    for name, kb in (('dict', dict_kb), ('AppInfo', info_kb)):
+        print(f"{name:<12}{kb / 1024:>12.1f}{kb * 1024 / parser.records:>16.0f}")
+    print(f"=> AppInfo uses {info_kb / dict_kb:.0%} of the dict records")
+
+
+if __name__ == '__main__':
+    main()
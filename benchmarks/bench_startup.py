@@ -0,0 +1,113 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from os.path import dirname, abspath, join as join_path
+
+from tests.data.snapshots import PARENT_DIR as SNAPSHOT_DIR
+
+ROOT_DIR = dirname(dirname(abspath(__file__)))
+MAIN = join_path(ROOT_DIR, 'app', 'main.py')
+# written next to the other benchmark results rather than to the working directory
+RESULTS_DIR = join_path(ROOT_DIR, 'benchmarks', 'results')
+SNAPSHOTS = [join_path(SNAPSHOT_DIR, name) for name in ('app_id363590051.html', 'app_id1193542964.html')]
+DEFAULT_THRESHOLD = 0.25
+
+# command line, and the modules it must start without
+COMMANDS = {
+    'help': (['-h'], ('playwright', 'bs4')),
+    'crawl -h': (['crawl', '-h'], ('playwright', 'bs4')),
+    'match -h': (['match', '-h'], ('playwright', 'bs4')),
+    'parse': (['parse', '-o', os.devnull, *SNAPSHOTS], ('playwright',)),
+}
+
+
+def run_importtime(argv: list[str]) -> tuple[float, dict[str, int]]:
+    env = dict(os.environ, PYTHONPATH=ROOT_DIR)
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', MAIN, *argv], cwd=ROOT_DIR, env=env,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    wall_s = time.perf_counter() - start
+    # "import time: self [us] | cumulative | imported package", the module name is indented by its depth
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        if self_us.strip().isdigit():
+            modules[name.strip()] = int(self_us)
+    return wall_s, modules
+
+
+def measure(argv: list[str], lazy_modules: tuple[str, ...], rounds: int) -> dict:
+    walls, imports, modules = [], [], {}
+    for _ in range(rounds):
+        wall_s, modules = run_importtime(argv)
+        walls.append(wall_s)
+        imports.append(sum(modules.values()) / 1000)
+    slowest = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:5]
+    return dict(
+        # the fastest run is the least disturbed by the rest of the machine
+        wall_ms=round(min(walls) * 1000, 1),
+        import_ms=round(min(imports), 1),
+        modules=len(modules),
+        loaded=[name for name in lazy_modules if name in modules],
+        slowest={name: round(self_us / 1000, 1) for name, self_us in slowest},
+    )
+
+
+def find_regressions(result: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list[str]:
+    regressions = [f"{command}: loads {', '.join(stage['loaded'])} at startup"
+                   for command, stage in result['commands'].items() if stage['loaded']]
+    for command, base in baseline.get('commands', {}).items():
+        current = result['commands'].get(command)
+        if current is not None and current['import_ms'] > base['import_ms'] * (1 + threshold):
+            regressions.append(f"{command}: imports take {current['import_ms']}ms, baseline {base['import_ms']}ms")
+    return regressions
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(description='benchmark the startup and import time of the cli commands.')
+    parser.add_argument('-r', '--rounds', type=int, help='runs of every command, the fastest is kept', default=10)
+    parser.add_argument('-o', '--output', type=str, help='json file the results are written to',
+                        default=join_path(RESULTS_DIR, 'bench_startup.json'))
+    parser.add_argument('--baseline', type=str, default=None, help='json results of an earlier run to compare with')
+    parser.add_argument('-t', '--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='tolerated slowdown against the baseline, as a fraction')
+    parser = parser.parse_args(args)
+
+    result = dict(
+        config=dict(rounds=parser.rounds, python=sys.version.split()[0]),
+        commands={command: measure(argv, lazy_modules, parser.rounds)
+                  for command, (argv, lazy_modules) in COMMANDS.items()},
+    )
+
+    print('=> Startup benchmark, python -X importtime')
+    print(f"{'command':<12}{'wall (ms)':>11}{'imports (ms)':>14}{'modules':>9}  slowest imports")
+    for command, stage in result['commands'].items():
+        slowest = ', '.join(f'{name} {ms:.0f}ms' for name, ms in list(stage['slowest'].items())[:3])
+        print(f"{command:<12}{stage['wall_ms']:>11.0f}{stage['import_ms']:>14.0f}{stage['modules']:>9}  {slowest}")
+
+    os.makedirs(dirname(abspath(parser.output)), exist_ok=True)
+    with open(parser.output, 'w') as f:
+        json.dump(result, f, indent=4)
+    print(f'=> Results written to {parser.output}')
+
+    baseline = {}
+    if parser.baseline:
+        with open(parser.baseline, 'r') as f:
+            baseline = json.load(f)
+    regressions = find_regressions(result, baseline, threshold=parser.threshold)
+    if regressions:
+        print('=> Regressions\n' + '\n'.join(regressions))
+        return 1
+    print('=> No module loaded too early')
+    if parser.baseline:
+        print(f'=> No regression over {parser.threshold:.0%} against {parser.baseline}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,59 @@
+import argparse
+import time
+import tracemalloc
+from os.path import join as join_path
+
+from app.parsers import AppInfoParser, StructuredAppInfoParser
+from app.streaming import StreamingAppInfoParser
+from tests.data.snapshots import PARENT_DIR as SNAPSHOT_DIR
+
+SNAPSHOTS = ('app_id363590051.html', 'app_id1193542964.html')
+
+
+def read_html(path: str) -> dict:
+    with open(path, 'r') as f:
+        return AppInfoParser(html=f.read()).parse()
+
+
+def read_structured(path: str) -> dict:
+    with open(path, 'r') as f:
+        return StructuredAppInfoParser(html=f.read()).parse()
+
+
+def read_streaming(path: str, chunk_size: int) -> dict:
+    def read_chunks():
+        with open(path, 'rb') as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+    return StreamingAppInfoParser.from_chunks(read_chunks()).parse()
+
+
+def measure(func, *args) -> tuple[float, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='benchmark peak memory per page on the snapshot fixtures.')
+    parser.add_argument('-c', '--chunk_size', type=int, help='streaming chunk size in bytes', default=4096)
+    parser = parser.parse_args(args)
+
+    print(f"{'snapshot':<24}{'parser':<12}{'time (ms)':>12}{'peak (KB)':>12}")
+    for snapshot_file in SNAPSHOTS:
+        path = join_path(SNAPSHOT_DIR, snapshot_file)
+        for name, func, func_args in (
+            ('dom', read_html, (path,)),
+            ('structured', read_structured, (path,)),
+            ('streaming', read_streaming, (path, parser.chunk_size)),
+        ):
+            elapsed, peak = measure(func, *func_args)
+            print(f"{snapshot_file:<24}{name:<12}{elapsed * 1000:>12.1f}{peak / 1024:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
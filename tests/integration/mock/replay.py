@@ -0,0 +1,273 @@
+import html
+import re
+from dataclasses import dataclass, field
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from os.path import exists, join as join_path
+from threading import Thread, Lock
+from urllib.parse import urlsplit, parse_qs, quote
+
+from playwright.sync_api import BrowserContext, Route
+from playwright.async_api import BrowserContext as AsyncBrowserContext, Route as AsyncRoute
+
+from tests.data.snapshots import PARENT_DIR as SNAPSHOT_DIR
+
+APPLE_ORIGIN = 'https://apps.apple.com'
+SNAPSHOT_APP_IDS = ('363590051', '1193542964')
+
+app_path_re = re.compile(r'^/(\w{2}/)?app/[\w\-%]+/id(\d+)')
+developer_path_re = re.compile(r'^/(\w{2})/developer/([\w\-%]+)/id(\d+)$')
+
+# the landing page only keeps what collect_company_urls interacts with: the region banner and the search box
+LANDING_HTML = '''<!DOCTYPE html>
+<html><head><title>App Store</title></head>
+<body>
+<div id="ac-ls"><button id="ac-ls-continue" onclick="this.parentNode.remove()">Continue</button></div>
+<nav><a id="globalnav-menubutton-link-search" href="#"
+        onclick="event.preventDefault(); document.getElementById('search').style.display = 'block'">Search</a></nav>
+<form id="search" style="display: none" onsubmit="event.preventDefault();
+      location.href = '/us/search?term=' + encodeURIComponent(this.q.value) + '&page=1'">
+    <input name="q" placeholder="Search apple.com">
+</form>
+<main style="height: 2000px"></main>
+</body></html>
+'''
+
+
+def _page(title: str, body: str) -> str:
+    return f'<!DOCTYPE html>\n<html><head><title>{html.escape(title)}</title></head><body>{body}</body></html>\n'
+
+
+def _links(urls: list[str], class_name: str = '') -> str:
+    return ''.join(f'<a class="{class_name}" href="{url}">{url.rsplit("/", 2)[1]}</a>' for url in urls)
+
+
+@dataclass
+class ReplayCatalog:
+    # a synthetic developer whose search results, sections and see-all pages link to recorded app pages
+    result_pages: int = 2
+    results_per_page: int = 10
+    sections: int = 2
+    apps_per_section: int = 12
+    developer_slug: str = 'netflix-inc'
+    developer_id: str = '363590054'
+    # apps of the first section the last section lists again, with a query string of its own
+    cross_listed: int = 0
+    # (storefront, n) of apps a storefront does not offer, its developer page leaves them out
+    unavailable: set[tuple[str, int]] = field(default_factory=set)
+
+    @staticmethod
+    def app_url(n: int, storefront: str = 'us') -> str:
+        return f'{APPLE_ORIGIN}/{storefront}/app/replay-app-{n}/id{100000 + n}'
+
+    def is_available(self, storefront: str, app_id: int) -> bool:
+        return (storefront, app_id - 100000) not in self.unavailable
+
+    @property
+    def developer_url(self) -> str:
+        return self.storefront_developer_url('us')
+
+    def storefront_developer_url(self, storefront: str) -> str:
+        return f'{APPLE_ORIGIN}/{storefront}/developer/{self.developer_slug}/id{self.developer_id}'
+
+    def search_page(self, term: str, page: int) -> str:
+        start = (page - 1) * self.results_per_page
+        items = ''.join(f'<li>{_links([self.app_url(n)], "rf-serp-productname-link")}</li>'
+                        for n in range(start, start + self.results_per_page))
+        next_btn = ''
+        if page < self.result_pages:
+            next_url = f'/us/search?term={quote(term)}&page={page + 1}'
+            next_btn = (f'<nav class="rc-pagination"><div class="rc-pagination-arrow">'
+                        f'<button onclick="location.href = \'{next_url}\'">Next</button></div></nav>')
+        return _page(f'{term} - Apple', f'<div id="explore"><div id="exploreCurated"><ul>{items}</ul></div>'
+                                        f'{next_btn}</div>')
+
+    def _section_urls(self, section: int, storefront: str) -> list[str]:
+        start = section * self.apps_per_section
+        return [self.app_url(n, storefront) for n in range(start, start + self.apps_per_section)
+                if (storefront, n) not in self.unavailable]
+
+    def developer_page(self, storefront: str = 'us') -> str:
+        sections = []
+        for section in range(self.sections):
+            urls = self._section_urls(section, storefront)
+            # the first section is cut off and only complete behind its see-all link
+            see_all = ''
+            if section == 0:
+                see_all_url = f'{self.storefront_developer_url(storefront)}?see-all=section-{section}'
+                see_all = f'<div class="section__nav"><a href="{see_all_url}">See All</a></div>'
+                urls = urls[:4]
+            if section == self.sections - 1 and self.cross_listed:
+                urls += [f'{url}?section={section}' for url in self._section_urls(0, storefront)[:self.cross_listed]]
+            sections.append(f'<section class="section section--bordered">{see_all}'
+                            f'<div class="l-row l-row--peek">{_links(urls)}</div></section>')
+        return _page(self.developer_slug, ''.join(sections))
+
+    def see_all_page(self, section: int, storefront: str = 'us') -> str:
+        urls = self._section_urls(section, storefront)
+        return _page(self.developer_slug, f'<div class="l-row" role="feed">{_links(urls)}</div>')
+
+    def app_urls(self) -> list[str]:
+        return [self.app_url(n) for n in range(self.sections * self.apps_per_section)]
+
+
+class ReplayRequestHandler(SimpleHTTPRequestHandler):
+    # every answer has a content length, so connections are kept alive like the store's
+    protocol_version = 'HTTP/1.1'
+    catalog: ReplayCatalog = None
+    server_stats: 'ReplayServer' = None
+
+    def _send_html(self, body: str):
+        content = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _send_unavailable(self) -> bool:
+        match_obj = app_path_re.match(urlsplit(self.path).path)
+        if not match_obj:
+            return False
+        storefront = (match_obj.group(1) or 'us/').rstrip('/')
+        if self.catalog.is_available(storefront, int(match_obj.group(2))):
+            return False
+        self.send_error(404)
+        return True
+
+    def do_HEAD(self):
+        if self._send_unavailable():
+            return
+        return super().do_HEAD()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        developer_match = developer_path_re.match(url.path)
+        if self._send_unavailable():
+            return
+        if url.path == '/':
+            self.server_stats.record('landing')
+            return self._send_html(LANDING_HTML)
+        if url.path == '/us/search':
+            self.server_stats.record('search')
+            term = query.get('term', [''])[0]
+            return self._send_html(self.catalog.search_page(term, int(query.get('page', ['1'])[0])))
+        if developer_match and 'see-all' in query:
+            self.server_stats.record('see_all')
+            return self._send_html(self.catalog.see_all_page(int(query['see-all'][0].rsplit('-', 1)[1]),
+                                                             storefront=developer_match.group(1)))
+        if developer_match:
+            self.server_stats.record('developer')
+            return self._send_html(self.catalog.developer_page(storefront=developer_match.group(1)))
+        if app_path_re.match(url.path):
+            self.server_stats.record('app')
+        return super().do_GET()
+
+    def translate_path(self, path: str) -> str:
+        # serve recorded app pages, any other app id is answered with one of the recordings
+        match_obj = app_path_re.match(path)
+        if match_obj:
+            app_id = match_obj.group(2)
+            if not exists(join_path(SNAPSHOT_DIR, f'app_id{app_id}.html')):
+                app_id = SNAPSHOT_APP_IDS[int(app_id) % len(SNAPSHOT_APP_IDS)]
+            path = f'/app_id{app_id}.html'
+        return super().translate_path(path)
+
+    def log_message(self, *args):
+        pass
+
+
+class ReplayServer:
+    def __init__(self, catalog: ReplayCatalog = None):
+        self.catalog = catalog or ReplayCatalog()
+        self.hits: dict[str, int] = {}
+        self._lock = Lock()
+        handler = type('BoundReplayRequestHandler', (ReplayRequestHandler,),
+                       dict(catalog=self.catalog, server_stats=self))
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), partial(handler, directory=SNAPSHOT_DIR))
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        self.url = f'http://127.0.0.1:{self._server.server_address[1]}'
+
+    def record(self, kind: str):
+        with self._lock:
+            self.hits[kind] = self.hits.get(kind, 0) + 1
+
+    @property
+    def pages(self) -> int:
+        return sum(self.hits.values())
+
+    def replay_url(self, url: str) -> str:
+        return self.url + url[len(APPLE_ORIGIN):] if url.startswith(APPLE_ORIGIN) else url
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'ReplayServer':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def route_to_replay(ctx: BrowserContext, server: ReplayServer):
+    # apps.apple.com is answered by the replay server, every other host is cut off
+    def replay(route: Route):
+        url = route.request.url
+        if url.startswith(APPLE_ORIGIN):
+            route.fulfill(response=route.fetch(url=server.replay_url(url)))
+        else:
+            route.abort()
+
+    ctx.route('**/*', replay)
+
+
+async def route_to_replay_async(ctx: AsyncBrowserContext, server: ReplayServer):
+    async def replay(route: AsyncRoute):
+        url = route.request.url
+        if url.startswith(APPLE_ORIGIN):
+            await route.fulfill(response=await route.fetch(url=server.replay_url(url)))
+        else:
+            await route.abort()
+
+    await ctx.route('**/*', replay)
+
+
+class ReplayRequest:
+    def __init__(self, request, server: ReplayServer):
+        self._request = request
+        self._server = server
+
+    def get(self, url: str, **kwargs):
+        return self._request.get(self._server.replay_url(url), **kwargs)
+
+    def head(self, url: str, **kwargs):
+        return self._request.head(self._server.replay_url(url), **kwargs)
+
+    def __getattr__(self, name: str):
+        return getattr(self._request, name)
+
+
+class ReplayContext:
+    # requests of the api client are not intercepted by routes, so they are redirected here
+    def __init__(self, ctx: BrowserContext, server: ReplayServer):
+        self._ctx = ctx
+        self.request = ReplayRequest(ctx.request, server)
+
+    def __getattr__(self, name: str):
+        return getattr(self._ctx, name)
+
+
+class ReplayHttpClient:
+    # app pages fetched without a browser are sent to the replay server as well
+    def __init__(self, client, server: ReplayServer):
+        self._client = client
+        self._server = server
+
+    def get(self, url: str):
+        return self._client.get(self._server.replay_url(url))
+
+    def __getattr__(self, name: str):
+        return getattr(self._client, name)
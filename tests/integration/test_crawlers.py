@@ -0,0 +1,247 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from playwright.async_api import async_playwright, Error as PlaywrightError
+from playwright.sync_api import sync_playwright, Error as SyncPlaywrightError
+
+from app.async_crawlers import craw_app_infos, collect_app_urls as collect_app_urls_async
+from app.crawlers import resolve_developer_url, collect_company_urls, collect_app_urls, craw_app_info
+from app.discovery import DEFAULT_DISCOVERY, DISCOVERY_PROFILES, OBSERVER_DISCOVERY_JS, OBSERVER_OPTIONS
+from app.fetch import HttpClient, FetchError, is_complete, iter_http_apps
+from app.pool import BrowserPool, AsyncBrowserPool
+from app.routing import DEFAULT_BLOCK_PROFILE, BLOCK_PROFILES, RouteStats, install_block_profile_async
+from app.storefronts import check_availability
+from tests.integration.mock.replay import ReplayServer, ReplayCatalog, ReplayContext, ReplayRequest, \
+    ReplayHttpClient, route_to_replay, route_to_replay_async
+
+
+@pytest.fixture(scope="module")
+def replay_server():
+    with ReplayServer() as server:
+        yield server
+
+
+@pytest.fixture
+def replay_context(replay_server: ReplayServer):
+    with sync_playwright() as p:
+        try:
+            browser = p.chromium.launch(headless=True)
+        except SyncPlaywrightError as e:
+            pytest.skip(f'chromium is not available: {e.message.splitlines()[0]}')
+        context = browser.new_context()
+        route_to_replay(context, replay_server)
+        yield ReplayContext(context, replay_server)
+        browser.close()
+
+
+async def _craw_snapshot_apps(server: ReplayServer, app_urls: list[str], workers: int,
+                              discovery: str = DEFAULT_DISCOVERY, block_profile: str = DEFAULT_BLOCK_PROFILE,
+                              route_stats: RouteStats = None) -> list[dict]:
+    async with async_playwright() as p:
+        try:
+            browser = await p.chromium.launch(headless=True)
+        except PlaywrightError as e:
+            pytest.skip(f'chromium is not available: {e.message.splitlines()[0]}')
+        context = await browser.new_context()
+        await route_to_replay_async(context, server)
+        # registered last, so blocked requests never reach the replay route
+        await install_block_profile_async(context, profile=block_profile, stats=route_stats)
+        data = await craw_app_infos(ctx=context, app_urls=app_urls, workers=workers, discovery=discovery)
+        await browser.close()
+    return data
+
+
+@pytest.mark.parametrize('workers', (1, 2, 3))
+def test_craw_app_infos_keeps_order(replay_server, workers: int):
+    app_urls = [
+        'https://apps.apple.com/us/app/netflix/id363590051',
+        'https://apps.apple.com/vn/app/sony-b%E1%BA%A3o-h%C3%A0nh-%C4%91i%E1%BB%87n-t%E1%BB%AD/id1193542964',
+        'https://apps.apple.com/us/app/netflix/id363590051',
+    ]
+    data = asyncio.run(_craw_snapshot_apps(server=replay_server, app_urls=app_urls, workers=workers))
+
+    assert [app_data['app_id'] for app_data in data] == ['id363590051', 'id1193542964', 'id363590051']
+    assert data[0]['app_targets'] == ["iPhone", "iPad", "iPod touch", "Apple TV"]
+    assert data[1]['app_targets'] == ["iPhone", "iPad", "iPod touch", "Mac"]
+
+
+@pytest.mark.parametrize('discovery', DISCOVERY_PROFILES)
+def test_craw_app_infos_discovery(replay_server, discovery: str):
+    app_urls = ['https://apps.apple.com/us/app/netflix/id363590051']
+    data = asyncio.run(_craw_snapshot_apps(server=replay_server, app_urls=app_urls, workers=1, discovery=discovery))
+
+    assert data[0]['app_name'] == 'Netflix'
+
+
+@pytest.mark.parametrize('block_profile', BLOCK_PROFILES)
+def test_craw_app_infos_block_profile(replay_server, block_profile: str):
+    app_urls = ['https://apps.apple.com/us/app/netflix/id363590051']
+    route_stats = RouteStats()
+    data = asyncio.run(_craw_snapshot_apps(server=replay_server, app_urls=app_urls, workers=1,
+                                           block_profile=block_profile, route_stats=route_stats))
+
+    assert data[0]['app_targets'] == ["iPhone", "iPad", "iPod touch", "Apple TV"]
+    assert route_stats.totals()['requests'] > 0
+
+
+def test_observer_discovery_without_animation_frames(replay_context, replay_server):
+    # a background tab never runs animation frames, discovery still ends by its deadline
+    page = replay_context.new_page()
+    page.add_init_script('window.requestAnimationFrame = () => 0;')
+    page.goto(f'{replay_server.url}/app_id363590051.html')
+
+    elapsed_ms = page.evaluate(OBSERVER_DISCOVERY_JS, dict(OBSERVER_OPTIONS, timeoutMs=2000))
+    assert elapsed_ms < 5000
+
+
+def test_browser_pool_recycles_context(replay_server):
+    with BrowserPool(headless=True, recycle_after=2) as pool:
+        try:
+            pool.context()
+        except SyncPlaywrightError as e:
+            pytest.skip(f'chromium is not available: {e.message.splitlines()[0]}')
+
+        contexts = []
+        for _ in range(3):
+            with pool.lease() as ctx:
+                contexts.append(ctx)
+                ctx.new_page().goto(f'{replay_server.url}/app_id363590051.html')
+            assert ctx.pages == []
+
+        assert pool.launches == 1
+        assert pool.contexts == 2
+        assert contexts[0] is contexts[1]
+        assert contexts[1] is not contexts[2]
+
+
+def test_async_browser_pool_is_shared_by_crawls(replay_server):
+    app_urls = ['https://apps.apple.com/us/app/netflix/id363590051']
+    with AsyncBrowserPool(headless=True) as pool:
+        async def crawl() -> list[dict]:
+            context = await pool.new_context()
+            await route_to_replay_async(context, replay_server)
+            try:
+                return await craw_app_infos(ctx=context, app_urls=app_urls, workers=1)
+            finally:
+                await context.close()
+
+        try:
+            pool.run(pool.browser())
+        except PlaywrightError as e:
+            pytest.skip(f'chromium is not available: {e.message.splitlines()[0]}')
+        for _ in range(2):
+            assert pool.run(crawl())[0]['app_name'] == 'Netflix'
+
+        assert pool.launches == 1
+        assert pool.contexts == 2
+
+
+def test_resolve_developer_url_without_tab(replay_server):
+    # only the api request context is used, no browser has to be launched
+    with sync_playwright() as p:
+        request = p.request.new_context()
+        ctx = SimpleNamespace(request=request)
+        assert resolve_developer_url(ctx, f'{replay_server.url}/us/app/netflix/id363590051') == \
+               'https://apps.apple.com/us/developer/netflix-inc/id363590054'
+        assert resolve_developer_url(ctx, f'{replay_server.url}/missing.html') is None
+        request.dispose()
+
+
+def test_collect_company_urls(replay_context):
+    company_data = collect_company_urls(ctx=replay_context, company_name='netflix')
+
+    assert company_data == {'netflix-inc': 'https://apps.apple.com/us/developer/netflix-inc/id363590054'}
+
+
+def test_collect_app_urls_and_craw_app_info(replay_context, replay_server):
+    catalog = replay_server.catalog
+    app_urls = collect_app_urls(ctx=replay_context, company_url=catalog.developer_url)
+
+    assert app_urls == catalog.app_urls()
+
+    page = replay_context.new_page()
+    assert craw_app_info(page=page, app_url=app_urls[0])['app_id'] in ('id363590051', 'id1193542964')
+
+
+def test_collect_app_urls_without_duplicates():
+    catalog = ReplayCatalog(cross_listed=3)
+    with ReplayServer(catalog) as server, sync_playwright() as p:
+        try:
+            browser = p.chromium.launch(headless=True)
+        except SyncPlaywrightError as e:
+            pytest.skip(f'chromium is not available: {e.message.splitlines()[0]}')
+        context = browser.new_context()
+        route_to_replay(context, server)
+        app_urls = collect_app_urls(ctx=ReplayContext(context, server), company_url=catalog.developer_url)
+        browser.close()
+
+    assert app_urls == catalog.app_urls()
+
+
+def test_replay_server_counts_pages(replay_server):
+    catalog = replay_server.catalog
+    hits = dict(replay_server.hits)
+    with sync_playwright() as p:
+        request = p.request.new_context()
+        for url in (f'{catalog.developer_url}?see-all=section-0', catalog.app_url(7)):
+            response = request.get(replay_server.replay_url(url))
+            assert response.ok
+            response.dispose()
+        request.dispose()
+
+    assert replay_server.hits['see_all'] == hits.get('see_all', 0) + 1
+    assert replay_server.hits['app'] == hits.get('app', 0) + 1
+
+
+def test_check_availability():
+    with ReplayServer(ReplayCatalog(unavailable={('vn', 3)})) as server, sync_playwright() as p:
+        request = p.request.new_context()
+        ctx = SimpleNamespace(request=ReplayRequest(request, server))
+        app_url = server.catalog.app_url(3)
+        assert check_availability(ctx, app_url=app_url, storefront='us')
+        assert not check_availability(ctx, app_url=app_url, storefront='vn')
+        request.dispose()
+
+
+def test_iter_http_apps():
+    # app pages are fetched over pooled connections, no browser has to be launched
+    with ReplayServer(ReplayCatalog(unavailable={('us', 5)})) as server, HttpClient(pool_size=2) as http_client:
+        client = ReplayHttpClient(http_client, server)
+        app_urls = server.catalog.app_urls()[:8]
+        fetched = {idx: (response, app_data, error)
+                   for idx, response, app_data, error in iter_http_apps(client, app_urls, workers=2, retries=0)}
+
+        assert sorted(fetched) == list(range(8))
+        response, app_data, error = fetched[5]
+        assert response is None and isinstance(error, FetchError) and error.status == 404
+        for idx in (0, 1, 2, 3, 4, 6, 7):
+            response, app_data, error = fetched[idx]
+            assert error is None and response.status == 200
+            assert is_complete(app_data)
+            assert app_data['app_id'] in ('id363590051', 'id1193542964')
+        assert client.requests == 8
+        assert client.connections <= 4
+        assert server.hits['app'] == 7
+
+
+async def _collect_storefront_app_urls(server: ReplayServer, storefront: str) -> list[str]:
+    async with async_playwright() as p:
+        try:
+            browser = await p.chromium.launch(headless=True)
+        except PlaywrightError as e:
+            pytest.skip(f'chromium is not available: {e.message.splitlines()[0]}')
+        context = await browser.new_context()
+        await route_to_replay_async(context, server)
+        app_urls = await collect_app_urls_async(ctx=context,
+                                                company_url=server.catalog.storefront_developer_url(storefront))
+        await browser.close()
+    return app_urls
+
+
+def test_collect_app_urls_per_storefront():
+    with ReplayServer(ReplayCatalog(unavailable={('vn', 1), ('vn', 20)})) as server:
+        app_urls = asyncio.run(_collect_storefront_app_urls(server, 'vn'))
+
+    expected = [server.catalog.app_url(n, 'vn') for n in range(24) if n not in (1, 20)]
+    assert app_urls == expected
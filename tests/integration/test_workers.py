@@ -0,0 +1,41 @@
+import multiprocessing
+from urllib.request import urlopen
+
+from app.parsers import StructuredAppInfoParser
+from app.worker import run_worker
+from app.workqueue import WorkQueue
+from tests.integration.mock.replay import ReplayServer, APPLE_ORIGIN
+
+
+def _replay_worker(queue_path: str, server_url: str, owner: str):
+    # a browserless worker, the app pages come straight from the replay server
+    def crawl(app_url: str) -> dict:
+        with urlopen(app_url.replace(APPLE_ORIGIN, server_url, 1)) as response:
+            return StructuredAppInfoParser(html=response.read().decode('utf-8')).parse()
+
+    with WorkQueue(queue_path) as queue:
+        run_worker(queue, crawl, owner=owner, poll_s=0.05, idle_exit_s=2)
+
+
+def test_workers_share_the_queue(tmp_path):
+    queue_path = str(tmp_path / 'queue.sqlite3')
+    with ReplayServer() as server, WorkQueue(queue_path) as queue:
+        app_urls = server.catalog.app_urls()
+        job = server.catalog.developer_url
+        assert queue.enqueue(job, app_urls) == len(app_urls)
+
+        mp_context = multiprocessing.get_context('spawn')
+        processes = [mp_context.Process(target=_replay_worker, args=(queue_path, server.url, f'worker-{n}'))
+                     for n in range(3)]
+        for process in processes:
+            process.start()
+        finished = list(queue.iter_finished(job, poll_s=0.1))
+        for process in processes:
+            process.join(timeout=30)
+
+        assert sorted(app_url for app_url, _, _ in finished) == sorted(app_urls)
+        assert all(error is None for _, _, error in finished)
+        assert {app_data['app_id'] for _, app_data, _ in finished} == {'id363590051', 'id1193542964'}
+        assert queue.counts(job) == {'done': len(app_urls)}
+        assert server.hits['app'] == len(app_urls)
+        assert all(process.exitcode == 0 for process in processes)
@@ -2,15 +2,21 @@ from os.path import join as join_path
 
 import pytest
 
-from app.parsers import AppInfoParser
+from app.parsers import AppInfoParser, StructuredAppInfoParser, PARSER_BACKENDS, DEFAULT_BACKEND
 from tests.data.snapshots import PARENT_DIR as SNAPSHOT_DIR
 
 
+@pytest.fixture(scope="module", params=(AppInfoParser, StructuredAppInfoParser))
+def parser_cls(request):
+    return request.param
+
+
 @pytest.fixture(scope="module", params=((
     ("app_id363590051.html", dict(
         url="https://apps.apple.com/us/app/netflix/id363590051",
         id="363590051",
         name="Netflix",
+        developer_url="https://apps.apple.com/us/developer/netflix-inc/id363590054",
         languages=["English", "Arabic", "Croatian", "Czech", "Danish", "Dutch", "Filipino",
                          "Finnish", "French", "German", "Greek", "Hebrew", "Hindi", "Hungarian",
                          "Indonesian", "Italian", "Japanese", "Korean", "Malay", "Norwegian Bokmål",
@@ -22,16 +28,17 @@ from tests.data.snapshots import PARENT_DIR as SNAPSHOT_DIR
         url="https://apps.apple.com/vn/app/sony-b%E1%BA%A3o-h%C3%A0nh-%C4%91i%E1%BB%87n-t%E1%BB%AD/id1193542964",
         id="1193542964",
         name="Sony Ba\u0309o ha\u0300nh \u0111ie\u0323\u0302n tu\u031b\u0309",
+        developer_url="https://apps.apple.com/vn/developer/sony-vietnam/id1193542963",
         languages=["English"],
         compatibilities=["iPhone", "iPad", "iPod touch", "Mac"],
     )),
 )))
-def dataset(request):
+def dataset(request, parser_cls):
     snapshot_file, expected_data = request.param
     with open(join_path(SNAPSHOT_DIR, snapshot_file), 'r') as f:
         html = f.read()
 
-    return AppInfoParser(html=html), expected_data
+    return parser_cls(html=html), expected_data
 
 
 def test_parse_url(dataset):
@@ -49,6 +56,11 @@ def test_parse_name(dataset):
     assert parser.parse_name() == expected['name']
 
 
+def test_parse_developer_url(dataset):
+    parser, expected = dataset
+    assert parser.parse_developer_url() == expected['developer_url']
+
+
 def test_parse_languages(dataset):
     parser, expected = dataset
     assert parser.parse_languages() == expected['languages']
@@ -67,3 +79,49 @@ def test_parse(dataset):
     assert result['app_id'] == f"id{expected['id']}"
     assert result['app_url'] == expected['url']
     assert result['app_targets'] == expected['compatibilities']
+
+
+def test_structured_parser_skips_dom():
+    with open(join_path(SNAPSHOT_DIR, "app_id363590051.html"), 'r') as f:
+        parser = StructuredAppInfoParser(html=f.read())
+
+    parser.parse()
+    parser.parse_languages()
+    parser.parse_developer_url()
+
+    assert 'soup' not in parser.__dict__
+
+
+def test_structured_parser_falls_back_to_dom():
+    with open(join_path(SNAPSHOT_DIR, "app_id1193542964.html"), 'r') as f:
+        html = f.read()
+    html = html.replace('id="shoebox-media-api-cache-apps"', 'id="shoebox-removed"')
+    parser = StructuredAppInfoParser(html=html)
+
+    assert parser.parse() == AppInfoParser(html=html).parse()
+    assert 'soup' in parser.__dict__
+
+
+@pytest.mark.parametrize('snapshot_file', ("app_id363590051.html", "app_id1193542964.html"))
+@pytest.mark.parametrize('backend', tuple(PARSER_BACKENDS))
+def test_backend_parity(snapshot_file: str, backend: str):
+    with open(join_path(SNAPSHOT_DIR, snapshot_file), 'r') as f:
+        html = f.read()
+    expected = AppInfoParser(html=html, backend=DEFAULT_BACKEND)
+    parser = AppInfoParser(html=html, backend=backend)
+
+    assert parser.parse() == expected.parse()
+    assert parser.parse_languages() == expected.parse_languages()
+    assert parser.parse_developer_url() == expected.parse_developer_url()
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        AppInfoParser(html='', backend='unknown')
+
+
+def test_parse_info(dataset):
+    parser, expected = dataset
+    info = parser.parse_info(languages=True)
+    assert info.to_dict() == dict(app_name=expected['name'], app_id=f"id{expected['id']}", app_url=expected['url'],
+                                  app_targets=expected['compatibilities'], app_languages=expected['languages'])
@@ -0,0 +1,129 @@
+import json
+import os
+from os.path import join as join_path
+
+import pytest
+
+from app.archive import PageArchive, CODECS, INDEX_RECORD
+from app.parsers import StructuredAppInfoParser
+from app.reparse import iter_reparsed_apps, main as reparse_main
+from tests.data.snapshots import PARENT_DIR as SNAPSHOT_DIR
+
+NETFLIX_URL = 'https://apps.apple.com/us/app/netflix/id363590051'
+SONY_URL = 'https://apps.apple.com/vn/app/sony/id1193542964'
+
+
+@pytest.fixture(scope="module")
+def snapshots():
+    ans = []
+    for snapshot_file in ("app_id363590051.html", "app_id1193542964.html"):
+        with open(join_path(SNAPSHOT_DIR, snapshot_file), 'r') as f:
+            ans.append(f.read())
+    return ans
+
+
+@pytest.fixture(params=list(CODECS))
+def archive(tmp_path, request):
+    with PageArchive(str(tmp_path), codec=request.param) as archive_:
+        yield archive_
+
+
+def test_put_and_read(archive: PageArchive, snapshots: list[str]):
+    netflix = archive.put(NETFLIX_URL, snapshots[0], fetched_at=100.0)
+    sony = archive.put(SONY_URL, snapshots[1], fetched_at=200.0)
+
+    assert (netflix.app_id, netflix.storefront) == (363590051, 'us')
+    assert archive.read(sony) == snapshots[1]
+    assert os.path.getsize(archive.object_path(netflix.digest)) < len(snapshots[0]) / 4
+    assert list(archive.entries()) == [netflix, sony]
+
+
+def test_unchanged_page_is_stored_once(archive: PageArchive, snapshots: list[str]):
+    first = archive.put(NETFLIX_URL, snapshots[0], fetched_at=100.0)
+    second = archive.put(NETFLIX_URL, snapshots[0], fetched_at=200.0)
+
+    assert first.digest == second.digest
+    assert len(os.listdir(os.path.dirname(archive.object_path(first.digest)))) == 1
+    assert archive.find(363590051) == [first, second]
+    assert archive.find(363590051, since=150.0) == [second]
+    assert archive.latest() == [second]
+    assert archive.latest(until=150.0) == [first]
+
+
+def test_truncated_index(tmp_path, snapshots: list[str]):
+    with PageArchive(str(tmp_path)) as archive:
+        entry = archive.put(NETFLIX_URL, snapshots[0])
+    with open(join_path(str(tmp_path), 'index.bin'), 'ab') as f:
+        f.write(b'\x01' * (INDEX_RECORD.size // 2))
+
+    with PageArchive(str(tmp_path)) as archive:
+        assert list(archive.entries()) == [entry]
+
+
+def test_reparse(tmp_path, snapshots: list[str]):
+    with PageArchive(str(tmp_path)) as archive:
+        archive.put(NETFLIX_URL, snapshots[0], fetched_at=100.0)
+        archive.put(SONY_URL, snapshots[1], fetched_at=100.0)
+        archive.put(NETFLIX_URL, snapshots[0], fetched_at=200.0)
+
+        results = list(iter_reparsed_apps(archive, workers=2))
+        assert [app_data for _, app_data, _ in results] == [StructuredAppInfoParser(html=html).parse()
+                                                            for html in snapshots]
+        assert len(list(iter_reparsed_apps(archive, workers=2, every_capture=True))) == 3
+
+    output = str(tmp_path / 'apps.ndjson')
+    reparse_main([str(tmp_path), '-p', '2', '-o', output])
+    with open(output) as f:
+        assert [json.loads(line)['app_id'] for line in f] == ['id363590051', 'id1193542964']
+
+
+def test_storefront_padding(tmp_path, snapshots: list[str]):
+    # a storefront shorter than its two bytes, or none at all, reads back as it was written
+    with PageArchive(str(tmp_path)) as archive:
+        archive.put('https://apps.apple.com/app/netflix/id363590051', snapshots[0], fetched_at=100.0)
+        archive.put(NETFLIX_URL, snapshots[0], fetched_at=200.0)
+
+    with PageArchive(str(tmp_path)) as archive:
+        assert [entry.storefront for entry in archive.entries()] == ['', 'us']
+        assert [entry.storefront for entry in archive.latest()] == ['', 'us']
+
+
+def test_find_reads_the_index_once(tmp_path, snapshots: list[str], monkeypatch):
+    with PageArchive(str(tmp_path)) as archive:
+        archive.put(NETFLIX_URL, snapshots[0], fetched_at=100.0)
+        entries = archive.entries
+        reads = []
+        monkeypatch.setattr(archive, 'entries', lambda: reads.append(1) or entries())
+
+        assert len(archive.find(363590051)) == 1
+        sony = archive.put(SONY_URL, snapshots[1], fetched_at=200.0)
+        assert archive.find(1193542964) == [sony]
+        assert len(archive.latest()) == 2
+        assert len(reads) == 1
+
+
+def test_find_across_storefronts(tmp_path, snapshots: list[str]):
+    with PageArchive(str(tmp_path)) as archive:
+        us = archive.put(NETFLIX_URL, snapshots[0], fetched_at=200.0)
+        vn = archive.put(NETFLIX_URL.replace('/us/', '/vn/'), snapshots[0], fetched_at=100.0)
+        archive.put(SONY_URL, snapshots[1], fetched_at=150.0)
+        assert archive.find(363590051) == [vn, us]
+
+    with PageArchive(str(tmp_path), read_only=True) as archive:
+        assert archive.find(363590051) == [vn, us]
+        assert archive.find(363590051, since=150.0) == [us]
+        assert archive.find(42) == []
+
+
+def test_read_only_archive_must_exist(tmp_path):
+    missing = str(tmp_path / 'missing')
+    with pytest.raises(FileNotFoundError):
+        PageArchive(missing, read_only=True)
+    assert not os.path.exists(missing)
+
+
+def test_reparse_missing_archive(tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        reparse_main([str(tmp_path / 'missing')])
+    assert 'no archive index' in capsys.readouterr().err
+    assert not os.path.exists(tmp_path / 'missing')
@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+from app.cache import PageCache, hash_html
+
+APP_DATA = dict(app_name='Netflix', app_id='id363590051', app_url='https://apps.apple.com/us/app/netflix/id363590051',
+                app_targets=['iPhone', 'iPad', 'iPod touch', 'Apple TV'])
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with PageCache(cache_dir=str(tmp_path), max_age_s=60, max_entries=3) as cache_:
+        yield cache_
+
+
+def test_put_and_get(cache: PageCache):
+    cache.put(storefront='us', app_id='363590051', result=APP_DATA, html_hash=hash_html('<html/>'),
+              headers={'ETag': '"abc"', 'Last-Modified': 'Mon, 10 Apr 2023 00:00:00 GMT'})
+    entry = cache.get(storefront='us', app_id='363590051')
+
+    assert entry.result == APP_DATA
+    assert entry.html_hash == hash_html('<html/>')
+    assert cache.is_fresh(entry)
+    assert entry.conditional_headers() == {'If-None-Match': '"abc"',
+                                           'If-Modified-Since': 'Mon, 10 Apr 2023 00:00:00 GMT'}
+    assert cache.get(storefront='vn', app_id='363590051') is None
+
+
+def test_persistence(tmp_path):
+    with PageCache(cache_dir=str(tmp_path)) as cache:
+        cache.put(storefront='us', app_id='1', result=APP_DATA)
+    with PageCache(cache_dir=str(tmp_path)) as cache:
+        assert cache.get(storefront='us', app_id='1').result == APP_DATA
+
+
+def test_freshness_and_touch(cache: PageCache):
+    cache.put(storefront='us', app_id='1', result=APP_DATA)
+    entry = cache.get(storefront='us', app_id='1')
+
+    assert not cache.is_fresh(entry, now=time.time() + 120)
+    assert entry.conditional_headers() == {}
+
+    cache.conn.execute('UPDATE app_pages SET fetched_at = fetched_at - 120')
+    assert not cache.is_fresh(cache.get(storefront='us', app_id='1'))
+    cache.touch(storefront='us', app_id='1')
+    assert cache.is_fresh(cache.get(storefront='us', app_id='1'))
+
+
+def test_lru_eviction(cache: PageCache):
+    for app_id in ('1', '2', '3'):
+        cache.put(storefront='us', app_id=app_id, result=APP_DATA)
+    # reading 1 makes 2 the least recently used entry
+    cache.get(storefront='us', app_id='1')
+    cache.put(storefront='us', app_id='4', result=APP_DATA)
+
+    assert len(cache) == 3
+    assert cache.get(storefront='us', app_id='2') is None
+    assert cache.get(storefront='us', app_id='1') is not None
+
+
+def test_developer_urls(tmp_path):
+    developer_url = 'https://apps.apple.com/us/developer/netflix-inc/id363590054'
+    with PageCache(cache_dir=str(tmp_path), max_age_s=0, max_entries=1) as cache:
+        assert cache.get_developer_url(storefront='us', app_id='363590051') is None
+        cache.put_developer_url(storefront='us', app_id='363590051', developer_url=developer_url)
+        cache.put(storefront='us', app_id='1', result=APP_DATA)
+        cache.put(storefront='us', app_id='2', result=APP_DATA)
+    with PageCache(cache_dir=str(tmp_path)) as cache:
+        assert cache.get_developer_url(storefront='us', app_id='363590051') == developer_url
+        assert cache.get_developer_url(storefront='vn', app_id='363590051') is None
@@ -0,0 +1,148 @@
+import io
+from contextlib import contextmanager
+from os.path import join as join_path
+from types import SimpleNamespace
+
+import pytest
+from playwright.sync_api import Error as PlaywrightError
+
+import app.crawlers
+from app.cache import PageCache
+from app.crawlers import read_company_names, iter_company_apps, resolve_developer_url
+from app.journal import JournalState
+from tests.data.snapshots import PARENT_DIR as SNAPSHOT_DIR
+
+DEVELOPER_URL = 'https://apps.apple.com/us/developer/netflix-inc/id363590054'
+APP_URLS = ['https://apps.apple.com/us/app/netflix/id363590051',
+            'https://apps.apple.com/vn/app/sony/id1193542964']
+
+
+class _Request:
+    # answers every app url with the recorded netflix page
+    def __init__(self):
+        self.urls = []
+
+    def get(self, url: str, **kwargs):
+        self.urls.append(url)
+        with open(join_path(SNAPSHOT_DIR, 'app_id363590051.html'), 'r') as f:
+            html = f.read()
+        return SimpleNamespace(ok=True, status=200, text=lambda: html, dispose=lambda: None)
+
+
+class _Pool:
+    # leases a context that is never driven, every page of the crawl comes from the patched collectors
+    landed = False
+
+    def __init__(self, recycle_after: int = 200):
+        self.recycle_after = recycle_after
+        self.navigations = 0
+        self.leases = 0
+        self.recycles = 0
+
+    def needs_recycle(self) -> bool:
+        return self.navigations >= self.recycle_after
+
+    def recycle(self):
+        self.navigations = 0
+        self.recycles += 1
+
+    @contextmanager
+    def lease(self, **kwargs):
+        self.leases += 1
+        yield SimpleNamespace(new_page=lambda: SimpleNamespace(pool=self, lease=self.leases))
+
+
+@pytest.fixture
+def fetched(monkeypatch) -> list[str]:
+    snapshots = dict(zip(APP_URLS, ('app_id363590051.html', 'app_id1193542964.html')))
+    fetched_urls = []
+
+    def collect_app_html(page, app_url: str, **kwargs) -> str:
+        fetched_urls.append(app_url)
+        page.pool.navigations += 1
+        with open(join_path(SNAPSHOT_DIR, snapshots[app_url]), 'r') as f:
+            return f.read()
+
+    monkeypatch.setattr(app.crawlers, 'collect_company_urls', lambda **kwargs: {'netflix-inc': DEVELOPER_URL})
+    monkeypatch.setattr(app.crawlers, 'collect_app_urls', lambda **kwargs: list(APP_URLS))
+    monkeypatch.setattr(app.crawlers, 'collect_app_html', collect_app_html)
+    return fetched_urls
+
+
+def test_read_company_names():
+    lines = io.StringIO('netflix\n\n  # media\nsony \n# games\nvng\n')
+    assert read_company_names(lines) == ['netflix', 'sony', 'vng']
+
+
+def test_iter_company_apps_serves_cached_apps(tmp_path, fetched: list[str]):
+    first = list(iter_company_apps('netflix', pool=_Pool(), cache_dir=str(tmp_path)))
+    assert fetched == APP_URLS
+
+    fetched.clear()
+    second = list(iter_company_apps('netflix', pool=_Pool(), cache_dir=str(tmp_path)))
+    assert fetched == []
+    assert second == first
+    assert [app_data['app_id'] for app_data in second] == ['id363590051', 'id1193542964']
+
+
+def test_iter_company_apps_recycles_between_app_pages(fetched: list[str], monkeypatch):
+    leases = []
+    collect_app_html = app.crawlers.collect_app_html
+
+    def record_lease(page, app_url: str, **kwargs) -> str:
+        leases.append(page.lease)
+        return collect_app_html(page, app_url, **kwargs)
+
+    monkeypatch.setattr(app.crawlers, 'collect_app_html', record_lease)
+    pool = _Pool(recycle_after=1)
+    assert len(list(iter_company_apps('netflix', pool=pool))) == 2
+
+    # the first app page is loaded in the company lease, the second in a fresh context
+    assert leases == [1, 2]
+    assert pool.recycles == 1
+
+
+def test_resolve_developer_url_from_cache(tmp_path):
+    with PageCache(str(tmp_path)) as cache:
+        ctx = SimpleNamespace(request=_Request())
+        assert resolve_developer_url(ctx, APP_URLS[0], cache=cache) == DEVELOPER_URL
+        assert ctx.request.urls == [APP_URLS[0]]
+
+    # a later run learns the developer from the cache, without a request or a tab
+    with PageCache(str(tmp_path)) as cache:
+        ctx = SimpleNamespace(request=_Request())
+        assert resolve_developer_url(ctx, APP_URLS[0], cache=cache) == DEVELOPER_URL
+        assert ctx.request.urls == []
+
+
+def test_resume_without_journal(tmp_path, fetched: list[str]):
+    with pytest.raises(ValueError):
+        list(iter_company_apps(pool=_Pool(), resume=str(tmp_path / 'missing.jsonl')))
+    (tmp_path / 'empty.jsonl').write_text('')
+    with pytest.raises(ValueError):
+        list(iter_company_apps(pool=_Pool(), resume=str(tmp_path / 'empty.jsonl')))
+    assert fetched == []
+
+
+def test_resume_from_loaded_state(tmp_path, fetched: list[str], monkeypatch):
+    # the journal read by the caller is not read again
+    monkeypatch.setattr(app.crawlers, 'load_journal', lambda path: pytest.fail('journal read twice'))
+    with pytest.raises(ValueError):
+        list(iter_company_apps(pool=_Pool(), resume=str(tmp_path / 'crawl.jsonl'), resume_state=JournalState()))
+    assert fetched == []
+
+
+def test_no_matching_company(fetched: list[str]):
+    assert list(iter_company_apps('', pool=_Pool())) == []
+    assert fetched == []
+
+
+def test_resolve_developer_url_request_error(tmp_path, capsys):
+    def get(url: str, **kwargs):
+        raise PlaywrightError('net::ERR_CONNECTION_RESET')
+
+    # the error is logged and the caller falls back to the tab
+    ctx = SimpleNamespace(request=SimpleNamespace(get=get))
+    with PageCache(str(tmp_path)) as cache:
+        assert resolve_developer_url(ctx, APP_URLS[0], cache=cache) is None
+    assert 'ERR_CONNECTION_RESET' in capsys.readouterr().err
@@ -0,0 +1,25 @@
+import pytest
+
+from app.discovery import DiscoveryStats, check_discovery_profile, DISCOVERY_PROFILES
+
+
+@pytest.mark.parametrize('profile', DISCOVERY_PROFILES)
+def test_check_discovery_profile(profile: str):
+    check_discovery_profile(profile)
+
+
+def test_check_unknown_discovery_profile():
+    with pytest.raises(ValueError):
+        check_discovery_profile('robot')
+
+
+def test_discovery_stats():
+    stats = DiscoveryStats()
+    assert stats.summary() == 'no page discovered'
+
+    stats.record('https://apps.apple.com/us/app/netflix/id363590051', 0.5)
+    stats.record('https://apps.apple.com/us/developer/netflix-inc/id363590054', 1.5)
+    stats.record('https://apps.apple.com/us/app/fast-speed-test/id1133348139', 0.25)
+
+    assert stats.summary() == '3 page(s), total 2.25s, median 0.50s, max 1.50s'
+    assert stats.per_page()['https://apps.apple.com/us/app/netflix/id363590051'] == 0.5
@@ -0,0 +1,91 @@
+import gzip
+import zlib
+from os.path import join as join_path
+
+import pytest
+
+from app.fetch import HttpResponse, FetchError, decode_body, is_complete, fetch_app_page, check_fetch_engine, \
+    iter_http_apps
+from app.pacing import Pacer, ThrottledError
+from tests.data.snapshots import PARENT_DIR as SNAPSHOT_DIR
+
+APP_URL = 'https://apps.apple.com/us/app/netflix/id363590051'
+
+
+class _Client:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.urls = []
+
+    def get(self, url: str) -> HttpResponse:
+        self.urls.append(url)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def test_decode_body():
+    html = '<p>Sony Bảo hành</p>'
+    assert decode_body(html.encode('utf-8'), {}) == html
+    assert decode_body(gzip.compress(html.encode('utf-8')), {'content-encoding': 'gzip'}) == html
+    assert decode_body(zlib.compress(html.encode('utf-8')), {'content-encoding': 'deflate'}) == html
+    assert decode_body(html.encode('utf-16'), {'content-type': 'text/html; charset=utf-16'}) == html
+    with pytest.raises(ValueError):
+        decode_body(b'', {'content-encoding': 'compress'})
+
+
+def test_is_complete():
+    app_data = dict(app_name='Netflix', app_id='id363590051', app_url=APP_URL, app_targets=['iPhone'])
+    assert is_complete(app_data)
+    assert not is_complete(dict(app_data, app_targets=[]))
+    assert not is_complete(dict(app_data, app_name=''))
+    assert not is_complete(dict(app_data, app_id='id'))
+
+
+def test_check_fetch_engine():
+    check_fetch_engine('auto')
+    with pytest.raises(ValueError):
+        check_fetch_engine('curl')
+
+
+def test_fetch_app_page_records_pacing():
+    pacer = Pacer(rate=10, max_rate=10, sleep=lambda s: None)
+    client = _Client(HttpResponse(url=APP_URL, status=429, headers={}, html=''),
+                     HttpResponse(url=APP_URL, status=404, headers={}, html=''),
+                     HttpResponse(url=APP_URL, status=200, headers={}, html='<html></html>'))
+
+    with pytest.raises(ThrottledError):
+        fetch_app_page(client, APP_URL, pacer=pacer)
+    with pytest.raises(FetchError):
+        fetch_app_page(client, APP_URL, pacer=pacer)
+    assert fetch_app_page(client, APP_URL, pacer=pacer).html == '<html></html>'
+    assert pacer.requests == 3
+    assert pacer.throttled == 1
+    assert pacer.rate < 10
+
+
+def test_iter_http_apps_retries():
+    with open(join_path(SNAPSHOT_DIR, 'app_id363590051.html'), 'r') as f:
+        html = f.read()
+    client = _Client(ConnectionResetError(), HttpResponse(url=APP_URL, status=200, headers={}, html=html))
+    fetched = list(iter_http_apps(client, [APP_URL], workers=1, retries=1))
+
+    assert len(fetched) == 1
+    idx, response, app_data, error = fetched[0]
+    assert idx == 0 and error is None
+    assert app_data['app_name'] == 'Netflix'
+    assert client.urls == [APP_URL, APP_URL]
+
+
+def test_iter_http_apps_yields_parse_errors(monkeypatch):
+    def parse(self):
+        raise ValueError('broken embedded json')
+
+    monkeypatch.setattr('app.parsers.StructuredAppInfoParser.parse', parse)
+    client = _Client(ValueError('unsupported content encoding compress'),
+                     HttpResponse(url=APP_URL, status=200, headers={}, html='<html></html>'))
+    fetched = sorted(iter_http_apps(client, [APP_URL, APP_URL], workers=1, retries=0), key=lambda item: item[0])
+
+    assert [(idx, response, app_data) for idx, response, app_data, _ in fetched] == [(0, None, None), (1, None, None)]
+    assert all(isinstance(error, ValueError) for *_, error in fetched)
@@ -0,0 +1,72 @@
+import pytest
+
+from app.frontier import BloomFilter, Frontier
+
+
+def test_bloom_filter():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for n in range(1000):
+        bloom.add(f'app/us/{n}')
+
+    assert all(f'app/us/{n}' in bloom for n in range(1000))
+    false_positives = sum(f'app/vn/{n}' in bloom for n in range(10000))
+    assert false_positives < 300
+    assert len(bloom) <= 1000
+    assert len(bloom.bits) == (bloom.size + 7) // 8
+
+
+def test_bloom_filter_size_is_fixed():
+    bloom = BloomFilter(capacity=100, error_rate=0.01)
+    size = len(bloom.bits)
+    for n in range(10000):
+        bloom.add(str(n))
+    assert len(bloom.bits) == size
+
+
+@pytest.mark.parametrize('seen', (None, BloomFilter(capacity=100)))
+def test_frontier_dedupes_by_key(seen):
+    frontier = Frontier(seen=seen)
+
+    assert frontier.push('https://apps.apple.com/us/app/netflix/id363590051')
+    # other slug, query string and case are the same page
+    assert not frontier.push('https://apps.apple.com/us/app/netflix-app/id363590051?mt=8')
+    assert not frontier.push('https://apps.apple.com/US/app/netflix/id363590051')
+    # another storefront is another page
+    assert frontier.push('https://apps.apple.com/vn/app/netflix/id363590051')
+    assert frontier.duplicates == 2
+    assert len(frontier) == 2
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_frontier_priority_and_politeness():
+    clock = _Clock()
+    frontier = Frontier(politeness_s=2, clock=clock, sleep=clock.sleep)
+    frontier.push('https://apps.apple.com/us/app/b/id2', priority=2)
+    frontier.push('https://apps.apple.com/us/app/a/id1', priority=1)
+    frontier.push('https://example.com/c', priority=3)
+
+    first = frontier.pop()
+    assert first == 'https://apps.apple.com/us/app/a/id1'
+    # the host has a single slot, only another host can be served meanwhile
+    assert frontier.pop() == 'https://example.com/c'
+    assert frontier.pop() is None
+
+    frontier.release(first)
+    assert frontier.pop() is None
+    assert frontier.wait() == 'https://apps.apple.com/us/app/b/id2'
+    assert clock.sleeps == [2]
+
+    frontier.release('https://apps.apple.com/us/app/b/id2')
+    assert frontier.wait() is None
@@ -0,0 +1,66 @@
+import json
+
+from app.journal import CrawlJournal, load_journal
+
+APP_URLS = [
+    'https://apps.apple.com/us/app/netflix/id363590051',
+    'https://apps.apple.com/us/app/fast-speed-test/id1133348139',
+    'https://apps.apple.com/us/app/stranger-things-1984/id1574739824',
+]
+
+
+def test_load_missing_journal(tmp_path):
+    state = load_journal(str(tmp_path / 'missing.jsonl'))
+
+    assert state.company_url is None
+    assert state.app_urls is None
+    assert state.remaining == []
+
+
+def test_journal_round_trip(tmp_path):
+    path = str(tmp_path / 'crawl.jsonl')
+    with CrawlJournal(path, fsync_every=2) as journal:
+        journal.record_start(company_name='netflix')
+        journal.record_company(company_name='netflix', company_url='https://apps.apple.com/us/developer/x/id1')
+        journal.record_frontier(app_urls=APP_URLS)
+        journal.record_app(app_url=APP_URLS[0], app_data=dict(app_id='id363590051'))
+
+    state = load_journal(path)
+
+    assert state.company_name == 'netflix'
+    assert state.company_url == 'https://apps.apple.com/us/developer/x/id1'
+    assert state.app_urls == APP_URLS
+    assert state.done == {APP_URLS[0]: dict(app_id='id363590051')}
+    assert state.remaining == APP_URLS[1:]
+
+
+def test_journal_appends_and_ignores_torn_write(tmp_path):
+    path = str(tmp_path / 'crawl.jsonl')
+    with CrawlJournal(path) as journal:
+        journal.record_frontier(app_urls=APP_URLS)
+        journal.record_app(app_url=APP_URLS[0], app_data=dict(app_id='id363590051'))
+    with CrawlJournal(path) as journal:
+        journal.record_app(app_url=APP_URLS[1], app_data=dict(app_id='id1133348139'))
+    with open(path, 'a') as f:
+        f.write(json.dumps(dict(event='app', app_url=APP_URLS[2], app_data={}))[:20])
+
+    state = load_journal(path)
+
+    assert list(state.done) == APP_URLS[:2]
+    assert state.remaining == APP_URLS[2:]
+
+    with CrawlJournal(path) as journal:
+        journal.record_app(app_url=APP_URLS[2], app_data=dict(app_id='id1574739824'))
+
+    assert load_journal(path).remaining == []
+
+
+def test_journal_batches_fsync(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr('app.journal.os.fsync', lambda fd: synced.append(fd))
+    with CrawlJournal(str(tmp_path / 'crawl.jsonl'), fsync_every=10, fsync_interval_s=3600) as journal:
+        for idx in range(25):
+            journal.record_app(app_url=f'https://apps.apple.com/us/app/x/id{idx}', app_data={})
+        assert len(synced) == 2
+
+    assert len(synced) == 3
@@ -0,0 +1,67 @@
+import json
+import subprocess
+import sys
+from os.path import join as join_path
+
+import pytest
+
+from app.main import main
+from tests.data.snapshots import PARENT_DIR as SNAPSHOT_DIR
+
+SNAPSHOTS = [join_path(SNAPSHOT_DIR, name) for name in ('app_id363590051.html', 'app_id1193542964.html')]
+
+
+def test_import_without_browser():
+    # the cli starts without playwright or bs4, only the commands that need them load them
+    code = 'import sys, app.main; print(sorted(m for m in ("playwright", "bs4") if m in sys.modules))'
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == '[]'
+
+
+@pytest.mark.parametrize('parser', ('structured', 'streaming'))
+@pytest.mark.parametrize('parse_workers', (0, 2))
+def test_parse(tmp_path, parse_workers: int, parser: str):
+    output = str(tmp_path / 'apps.ndjson')
+    main(['parse', *SNAPSHOTS, SNAPSHOTS[0], '-p', str(parse_workers), '--parser', parser, '-o', output])
+
+    with open(output, 'r') as f:
+        records = [json.loads(line) for line in f]
+    assert [record['app_id'] for record in records] == ['id363590051', 'id1193542964', 'id363590051']
+    assert records[0]['app_targets'] == ["iPhone", "iPad", "iPod touch", "Apple TV"]
+
+
+def test_match(tmp_path, capsys):
+    candidates = tmp_path / 'developers.txt'
+    candidates.write_text('netflix-inc\nsony-corporation\ngoogle-llc\n')
+    main(['match', '-c', str(candidates), 'netflix', 'sony'])
+
+    assert json.loads(capsys.readouterr().out) == {'netflix': 'netflix-inc', 'sony': 'sony-corporation'}
+
+
+def test_crawl_is_the_default_command(capsys):
+    # the crawl options still work without naming the command, and are checked before a browser is started
+    with pytest.raises(SystemExit):
+        main(['--batch', 'companies.txt', '-j', 'crawl.journal'])
+    assert 'it cannot be used with --batch' in capsys.readouterr().err
+
+
+def test_resume_missing_journal(tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        main(['crawl', '-r', str(tmp_path / 'missing.jsonl')])
+    assert 'no crawl to resume' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('args, message', [
+    (['-w', '0'], '--workers must be at least 1'),
+    (['-q', 'crawl.queue', '--local_workers', '0'], '--local_workers must be at least 1'),
+])
+def test_crawl_rejects_no_workers(capsys, args: list[str], message: str):
+    with pytest.raises(SystemExit):
+        main(['crawl', '-n', 'netflix', *args])
+    assert message in capsys.readouterr().err
+
+
+def test_resume_with_journal(tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        main(['crawl', '-r', str(tmp_path / 'crawl.jsonl'), '-j', str(tmp_path / 'other.jsonl')])
+    assert 'it cannot be used with --journal' in capsys.readouterr().err
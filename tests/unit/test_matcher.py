@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from app.matcher import NgramIndex, Matcher, get_ngrams, get_overlap_bound, get_runs, match_many
+from app.utils import get_best_matching_text, calc_likelihood
+from benchmarks.bench_matcher import make_slug, make_hint
+
+
+def test_get_ngrams():
+    assert get_ngrams('sony') == {'son', 'ony'}
+    assert get_ngrams('so') == set()
+
+
+@pytest.mark.parametrize(('hint_text', 'texts', 'expected'), (
+    ('netflix', ['netflix-inc', 'apple-netflix', 'am-netflix-co'], 'netflix-inc'),
+    ('sony', ['sony-vietnam', 'sony'], 'sony'),
+    ('ab', ['xyz', 'xab'], 'xab'),
+    ('qq', ['xyz', 'abc'], None),
+))
+def test_match_many_keeps_get_best_matching_text_results(hint_text: str, texts: list[str], expected: str):
+    assert get_best_matching_text(hint_text, texts) == expected
+    assert match_many([hint_text], texts) == [expected]
+
+
+def test_ngram_index_bounds_shared_texts():
+    texts = ['netflix-inc', 'sony-corporation', 'sony-vietnam', 'vng-corporation', 'apple']
+    index = NgramIndex(texts)
+    shared = index.find_shared('sony-corp')
+
+    assert sorted(shared) == [1, 2, 3]
+    bounds = list(index.iter_bounds('sony-corp', shared))
+    assert [idx for _, idx in bounds][:2] == [1, 2]
+    assert all(bound >= calc_likelihood('sony-corp', texts[idx]) for bound, idx in bounds)
+    assert [bound for bound, _ in bounds] == sorted((bound for bound, _ in bounds), reverse=True)
+
+
+def test_get_overlap_bound():
+    # netflix shares "net" and "etf" with a text, so at best "netf" once, or two 3 long substrings
+    assert get_overlap_bound(get_runs([0, 1]), 3, 20) == 6
+    assert get_overlap_bound(get_runs([0, 4]), 3, 20) == 6
+    # a 4 long text holds two 3 long substrings at most
+    assert get_overlap_bound(get_runs([0, 1, 2, 3]), 3, 4) == 6
+
+
+def test_matcher_agrees_with_the_exhaustive_scan():
+    rnd = random.Random(7)
+    candidates = list(dict.fromkeys(make_slug(rnd) for _ in range(1000)))
+    hints = [make_hint(rnd, rnd.choice(candidates)) for _ in range(100)] + ['x', 'zz', 'kakaka', 'inc']
+    matcher = Matcher(candidates)
+
+    assert [matcher.match(hint) for hint in hints] == [get_best_matching_text(hint, candidates) for hint in hints]
+
+
+def test_matcher_memoises_hints():
+    matcher = Matcher(['sony-corporation', 'sony-vietnam'])
+    assert matcher.match_many(['sony-corp', 'sony-viet', 'sony-corp']) == \
+           ['sony-corporation', 'sony-vietnam', 'sony-corporation']
+    assert len(matcher._matches) == 2
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from app.pacing import TokenBucket, Pacer, ThrottledError, backoff_s, retry, retry_async
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_token_bucket():
+    clock = _Clock()
+    bucket = TokenBucket(rate=2, burst=2, clock=clock)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    # the bucket is empty, the next tokens come every half second
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+    clock.now += 1.0
+    assert bucket.reserve() == pytest.approx(0.5)
+
+
+def test_pacer_shares_its_rate():
+    clock = _Clock()
+    pacer = Pacer(rate=1, clock=clock, sleep=clock.sleep)
+    for _ in range(3):
+        pacer.acquire()
+
+    assert clock.sleeps == [pytest.approx(1.0), pytest.approx(1.0)]
+    assert pacer.waited_s == pytest.approx(2.0)
+
+
+def test_pacer_aimd():
+    clock = _Clock()
+    pacer = Pacer(rate=2, max_rate=4, max_concurrency=8, target_latency_s=5, clock=clock, sleep=clock.sleep)
+
+    pacer.record(latency_s=1, status=200)
+    assert pacer.rate == pytest.approx(2.5)
+
+    pacer.record(latency_s=1, status=429)
+    assert pacer.rate == pytest.approx(1.25)
+    assert pacer.concurrency == 4
+    # failures of the same moment only decrease once
+    pacer.record(latency_s=1, timeout=True)
+    assert pacer.rate == pytest.approx(1.25)
+
+    clock.now += 10
+    pacer.record(latency_s=20, status=200)
+    assert pacer.rate == pytest.approx(0.625)
+    assert pacer.concurrency == 2
+
+    for _ in range(100):
+        pacer.record(latency_s=1, status=200)
+    assert pacer.rate == 4
+    assert pacer.concurrency == 8
+    assert (pacer.throttled, pacer.timeouts, pacer.slow, pacer.requests) == (1, 1, 1, 104)
+    assert '1 throttled, 1 timeout(s), 1 slow' in pacer.summary()
+
+
+def test_pacer_concurrency_slots():
+    pacer = Pacer(max_concurrency=2)
+    assert pacer.enter() and pacer.enter()
+    assert not pacer.enter()
+    pacer.leave()
+    assert pacer.enter()
+
+
+def test_backoff_s():
+    assert backoff_s(0, base_s=1, rand=lambda: 1.0) == 1
+    assert backoff_s(3, base_s=1, rand=lambda: 0.5) == 4
+    assert backoff_s(10, base_s=1, max_s=60, rand=lambda: 1.0) == 60
+
+
+def test_retry():
+    calls, sleeps = [], []
+    pacer = Pacer()
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ThrottledError('https://apps.apple.com', 503)
+        return 'ok'
+
+    assert retry(flaky, retries=3, retry_on=(ThrottledError,), pacer=pacer, sleep=sleeps.append) == 'ok'
+    assert len(sleeps) == 2 and sleeps[0] <= 1 and sleeps[1] <= 2
+    assert pacer.retries == 2
+
+    with pytest.raises(ValueError):
+        retry(lambda: int('x'), retries=0, sleep=sleeps.append)
+    with pytest.raises(KeyError):
+        retry(lambda: {}['x'], retries=2, retry_on=(ThrottledError,), sleep=sleeps.append)
+
+
+def test_retry_async():
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 2:
+            raise ThrottledError('https://apps.apple.com', 429)
+        return 'ok'
+
+    assert asyncio.run(retry_async(flaky, retries=1, retry_on=(ThrottledError,), base_s=0.01)) == 'ok'
@@ -0,0 +1,56 @@
+from os.path import join as join_path
+
+import pytest
+
+from app.parsers import AppInfoParser
+from app.pipeline import ParsePipeline, iter_parsed_apps
+from tests.data.snapshots import PARENT_DIR as SNAPSHOT_DIR
+
+SNAPSHOTS = ("app_id363590051.html", "app_id1193542964.html")
+
+
+@pytest.fixture(scope="module")
+def snapshots():
+    ans = []
+    for snapshot_file in SNAPSHOTS:
+        with open(join_path(SNAPSHOT_DIR, snapshot_file), 'r') as f:
+            ans.append(f.read())
+    return ans
+
+
+@pytest.mark.parametrize('parser', ('structured', 'dom'))
+def test_iter_parsed_apps(snapshots: list[str], parser: str):
+    pages = [(idx, snapshots[idx % 2]) for idx in range(6)]
+
+    results = dict(iter_parsed_apps(pages, workers=2, queue_size=2, parser=parser))
+
+    assert sorted(results) == list(range(6))
+    for idx, html in pages:
+        assert results[idx] == AppInfoParser(html=html).parse()
+
+
+def test_pipeline_backpressure(snapshots: list[str]):
+    workers, queue_size = 2, 1
+    held = []
+    with ParsePipeline(workers=workers, queue_size=queue_size) as pipeline:
+        for idx in range(8):
+            pipeline.submit(idx, snapshots[idx % 2])
+            held.append(pipeline.in_flight)
+        results = list(pipeline.drain())
+
+    assert max(held) <= queue_size + workers + 1
+    assert sorted(key for key, _ in results) == list(range(8))
+    assert pipeline.pending == 0
+
+
+def test_iter_parsed_apps_skips_bad_page(snapshots: list[str], capsys):
+    # a page the parser raises on
+    pages = [(0, snapshots[0]), (1, None), (2, snapshots[1])]
+
+    results = dict(iter_parsed_apps(pages, workers=2, queue_size=2))
+
+    assert sorted(results) == [0, 1, 2]
+    assert results[1] is None
+    assert results[0] == AppInfoParser(html=snapshots[0]).parse()
+    assert results[2] == AppInfoParser(html=snapshots[1]).parse()
+    assert 'Failed to parse 1' in capsys.readouterr().err
@@ -0,0 +1,30 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.pool import BrowserPool, AsyncBrowserPool
+
+
+def test_browser_pool_is_lazy():
+    with BrowserPool(headless=True) as pool:
+        assert pool.summary() == '0 crawl(s) on 0 browser launch(es) and 0 context(s), startup 0.00s, 0.00s per crawl'
+    assert pool.launches == 0
+
+
+def test_browser_pool_recycle_after():
+    with pytest.raises(AssertionError):
+        BrowserPool(recycle_after=0)
+
+
+def test_async_browser_pool_runs_on_one_loop():
+    async def current():
+        return asyncio.get_running_loop(), threading.current_thread()
+
+    with AsyncBrowserPool(headless=True) as pool:
+        first, second = pool.run(current()), pool.run(current())
+        # the loop outlives a crawl, so the browser launched on it is kept for the next one
+        assert first == second
+        assert first[1] is not threading.current_thread()
+        assert pool.summary() == '0 context(s) on 0 browser launch(es), startup 0.00s, 0.00s per context'
+    assert not first[1].is_alive()
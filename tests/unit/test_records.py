@@ -0,0 +1,52 @@
+import sys
+
+import pytest
+
+from app.records import AppInfo, Compatibility, compact_record, parse_app_id, parse_targets, format_targets
+
+NETFLIX = dict(app_name='Netflix', app_id='id363590051', app_url='https://apps.apple.com/us/app/netflix/id363590051',
+               app_targets=['iPhone', 'iPad', 'iPod touch', 'Apple TV'])
+
+
+def test_parse_targets():
+    targets, other_targets = parse_targets(['iPhone', 'iPad', 'Mac', 'Apple Car'])
+    assert targets == Compatibility.IPHONE | Compatibility.IPAD | Compatibility.MAC
+    assert other_targets == ('Apple Car',)
+    assert format_targets(targets, other_targets) == ['iPhone', 'iPad', 'Mac', 'Apple Car']
+
+
+@pytest.mark.parametrize('app_id, expected', [('id363590051', 363590051), ('363590051', 363590051), ('id', None)])
+def test_parse_app_id(app_id, expected):
+    assert parse_app_id(app_id) == expected
+
+
+def test_parse_invalid_app_id():
+    with pytest.raises(ValueError):
+        parse_app_id('idnetflix')
+
+
+def test_round_trip():
+    info = AppInfo.from_dict(NETFLIX)
+    assert info.id == 363590051
+    assert info.targets == Compatibility.IPHONE | Compatibility.IPAD | Compatibility.IPOD | Compatibility.APPLE_TV
+    assert info.to_dict() == NETFLIX
+
+
+def test_languages_are_interned():
+    first = AppInfo(id=1, name='a', url='', languages=(''.join(['Eng', 'lish']),))
+    second = AppInfo(id=2, name='b', url='', languages=(''.join(['Engl', 'ish']),))
+    assert first.languages[0] is second.languages[0] is sys.intern('English')
+    assert first.to_dict()['app_languages'] == ['English']
+
+
+def test_compact_record():
+    assert isinstance(compact_record(NETFLIX), AppInfo)
+    # unordered targets and unknown keys would not survive the conversion
+    reordered = dict(NETFLIX, app_targets=['iPad', 'iPhone'])
+    assert compact_record(reordered) is reordered
+    with_company = dict(NETFLIX, company_name='netflix')
+    assert compact_record(with_company) is with_company
+
+
+def test_slots():
+    assert not hasattr(AppInfo.from_dict(NETFLIX), '__dict__')
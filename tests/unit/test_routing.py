@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+
+import pytest
+from playwright.sync_api import Error as PlaywrightError
+
+from app.routing import BLOCK_PROFILES, RouteStats, get_block_profile
+
+APP_URL = 'https://apps.apple.com/us/app/netflix/id363590051'
+
+
+@pytest.mark.parametrize('profile, resource_type, url, blocked', [
+    ('full', 'image', 'https://is1-ssl.mzstatic.com/image/thumb/icon.png', False),
+    ('full', 'script', 'https://js-cdn.music.apple.com/musickit/v1/musickit.js', False),
+    ('no-media', 'image', 'https://is1-ssl.mzstatic.com/image/thumb/icon.png', True),
+    ('no-media', 'font', 'https://www.apple.com/wss/fonts/SF-Pro.woff2', True),
+    ('no-media', 'script', 'https://apps.apple.com/assets/web-experience-app.js', False),
+    ('minimal', 'media', 'https://example.com/preview.m3u8', True),
+    ('minimal', 'script', 'https://js-cdn.music.apple.com/musickit/v1/musickit.js', True),
+    ('minimal', 'xhr', 'https://xp.apple.com/report/2/xp_amp_web_exp', True),
+    ('minimal', 'script', 'https://www.googletagmanager.com/gtag/js', True),
+    ('minimal', 'script', 'https://apps.apple.com/assets/web-experience-app.js', False),
+    ('minimal', 'fetch', 'https://amp-api.apps.apple.com/v1/catalog/us/apps/363590051', False),
+    ('minimal', 'document', APP_URL, False),
+])
+def test_should_block(profile: str, resource_type: str, url: str, blocked: bool):
+    assert BLOCK_PROFILES[profile].should_block(resource_type, url) is blocked
+
+
+def test_should_block_matches_whole_host_labels():
+    profile = get_block_profile('minimal')
+    assert not profile.should_block('script', 'https://notxp.apple.com/app.js')
+    assert profile.should_block('script', 'https://eu.xp.apple.com/app.js')
+
+
+def test_full_profile_blocks_nothing():
+    assert not get_block_profile('full').blocks_anything
+    assert get_block_profile('no-media').blocks_anything
+
+
+def test_get_unknown_block_profile():
+    with pytest.raises(ValueError):
+        get_block_profile('everything')
+
+
+class _FakePage:
+    def __init__(self):
+        self.main_frame = SimpleNamespace(page=self)
+
+
+def _fake_request(page: _FakePage, url: str, navigation: bool = False, body_size: int = None) -> SimpleNamespace:
+    def sizes() -> dict:
+        if body_size is None:
+            raise PlaywrightError('request sizes are not available')
+        return dict(responseBodySize=body_size)
+
+    return SimpleNamespace(url=url, frame=page.main_frame, is_navigation_request=lambda: navigation, sizes=sizes)
+
+
+def test_route_stats():
+    page = _FakePage()
+    stats = RouteStats()
+    assert stats.summary() == '0 page(s), 0 request(s), 0 blocked, 0 KB received'
+
+    document = _fake_request(page, APP_URL, navigation=True)
+    stats.record_request(document)
+    stats.record_response(SimpleNamespace(request=document, headers={'content-length': '2048'}))
+    image = _fake_request(page, 'https://is1-ssl.mzstatic.com/image/thumb/icon.png')
+    stats.record_request(image)
+    stats.record_blocked(image)
+    script = _fake_request(page, 'https://apps.apple.com/assets/web-experience-app.js')
+    stats.record_request(script)
+    stats.record_response(SimpleNamespace(request=script, headers={}))
+
+    assert stats.pages[APP_URL] == dict(requests=3, blocked=1, bytes=2048)
+
+    other_url = 'https://apps.apple.com/us/developer/netflix-inc/id363590054'
+    stats.record_request(_fake_request(page, other_url, navigation=True))
+    assert stats.pages[other_url] == dict(requests=1, blocked=0, bytes=0)
+    assert stats.totals() == dict(requests=4, blocked=1, bytes=2048)
+    assert stats.summary() == '2 page(s), 4 request(s), 1 blocked, 2 KB received'
+
+
+def test_route_stats_body_size_without_content_length():
+    page = _FakePage()
+    stats = RouteStats()
+    document = _fake_request(page, APP_URL, navigation=True, body_size=1024)
+    stats.record_request(document)
+    stats.record_response(SimpleNamespace(request=document, headers={'content-length': '512'}))
+    chunked = _fake_request(page, 'https://apps.apple.com/assets/web-experience-app.js', body_size=4096)
+    stats.record_request(chunked)
+    stats.record_response(SimpleNamespace(request=chunked, headers={'transfer-encoding': 'chunked'}))
+
+    assert stats.pages[APP_URL] == dict(requests=2, blocked=0, bytes=5120)
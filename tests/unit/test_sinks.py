@@ -0,0 +1,134 @@
+import csv
+import io
+import json
+
+import pytest
+
+from app.records import AppInfo, Compatibility
+from app.sinks import open_sink, iter_typed_csv, JsonSink, NdjsonSink, CsvSink, TypedCsvSink
+
+RECORDS = [
+    dict(app_name='Netflix', app_id='id363590051', app_url='https://apps.apple.com/us/app/netflix/id363590051',
+         app_targets=['iPhone', 'iPad', 'iPod touch', 'Apple TV']),
+    dict(app_name='Dominoes Café', app_id='id1589123450',
+         app_url='https://apps.apple.com/vn/app/dominoes-caf%C3%A9/id1589123450', app_targets=['iPhone']),
+]
+
+
+def test_json_sink():
+    stream = io.StringIO()
+    with JsonSink(stream=stream, header='=> Result:\n') as sink:
+        for record in RECORDS:
+            sink.write(record)
+        assert stream.getvalue() == ''
+
+    assert stream.getvalue() == f"=> Result:\n{json.dumps(RECORDS, indent=4)}\n"
+
+
+def test_ndjson_sink_writes_per_record():
+    stream = io.StringIO()
+    with NdjsonSink(stream=stream) as sink:
+        sink.write(RECORDS[0])
+        assert json.loads(stream.getvalue()) == RECORDS[0]
+        sink.write(RECORDS[1])
+
+    assert [json.loads(line) for line in stream.getvalue().splitlines()] == RECORDS
+    assert sink.count == 2
+
+
+def test_csv_sink():
+    stream = io.StringIO()
+    with CsvSink(stream=stream) as sink:
+        for record in RECORDS:
+            sink.write(record)
+
+    rows = list(csv.DictReader(io.StringIO(stream.getvalue())))
+    assert rows[0]['app_targets'] == 'iPhone;iPad;iPod touch;Apple TV'
+    assert rows[1]['app_name'] == RECORDS[1]['app_name']
+
+
+def test_open_sink_to_file(tmp_path):
+    path = str(tmp_path / 'apps.ndjson')
+    with open_sink('ndjson', path=path) as sink:
+        sink.write(RECORDS[0])
+
+    with open(path) as f:
+        assert json.loads(f.read()) == RECORDS[0]
+
+
+def test_open_unknown_sink():
+    with pytest.raises(ValueError):
+        open_sink('xml')
+
+
+def test_json_sink_keeps_legacy_output():
+    stream = io.StringIO()
+    records = [*RECORDS, dict(RECORDS[0], company_name='netflix')]
+    with JsonSink(stream=stream) as sink:
+        for record in records:
+            sink.write(record)
+        sink.write(AppInfo.from_dict(RECORDS[1]))
+
+    assert json.loads(stream.getvalue()) == [*records, RECORDS[1]]
+
+
+def test_typed_csv_sink():
+    stream = io.StringIO()
+    with TypedCsvSink(stream=stream) as sink:
+        sink.write(dict(RECORDS[0], company_name='netflix'))
+        sink.write(AppInfo.from_dict(RECORDS[1]))
+
+    assert stream.getvalue().splitlines()[0] == \
+           'app_id:int,app_name:str,app_url:str,app_targets:flags,app_other_targets:list,company_name:str'
+    rows = list(iter_typed_csv(io.StringIO(stream.getvalue())))
+    assert rows[0]['app_id'] == 363590051
+    assert rows[0]['app_targets'] == Compatibility.IPHONE | Compatibility.IPAD | Compatibility.IPOD | \
+           Compatibility.APPLE_TV
+    assert rows[0]['app_other_targets'] == []
+    assert rows[0]['company_name'] == 'netflix'
+    assert rows[1]['app_name'] == RECORDS[1]['app_name']
+    assert rows[1]['company_name'] == ''
+
+
+def test_typed_csv_sink_keeps_other_targets():
+    stream = io.StringIO()
+    with TypedCsvSink(stream=stream) as sink:
+        sink.write(dict(RECORDS[0], app_targets=['iPhone', 'CarPlay', 'Apple Ring']))
+
+    row = next(iter_typed_csv(io.StringIO(stream.getvalue())))
+    assert row['app_targets'] == Compatibility.IPHONE
+    assert row['app_other_targets'] == ['CarPlay', 'Apple Ring']
+
+
+def test_typed_csv_sink_storefronts():
+    stream = io.StringIO()
+    with TypedCsvSink(stream=stream) as sink:
+        sink.write(dict(RECORDS[0], app_storefronts=['us', 'vn']))
+        sink.write(dict(RECORDS[1], app_storefronts=['vn']))
+
+    assert stream.getvalue().splitlines()[0].endswith(',app_storefronts:list')
+    assert [row['app_storefronts'] for row in iter_typed_csv(io.StringIO(stream.getvalue()))] == [['us', 'vn'], ['vn']]
+
+
+def test_parquet_sink_storefronts(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = str(tmp_path / 'apps.parquet')
+    with open_sink('parquet', path=path) as sink:
+        sink.write(dict(RECORDS[0], app_storefronts=['us', 'vn']))
+        sink.write(dict(RECORDS[1], app_storefronts=['vn']))
+
+    assert pq.read_table(path).column('app_storefronts').to_pylist() == [['us', 'vn'], ['vn']]
+
+
+def test_parquet_sink(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = str(tmp_path / 'apps.parquet')
+    with open_sink('parquet', path=path, row_group=1) as sink:
+        for record in RECORDS:
+            sink.write(record)
+        sink.write(dict(RECORDS[1], app_targets=['iPhone', 'CarPlay']))
+
+    table = pq.read_table(path)
+    assert table.column('app_id').to_pylist() == [363590051, 1589123450, 1589123450]
+    assert table.column('app_targets').to_pylist() == [23, 1, 1]
+    assert table.column('app_other_targets').to_pylist() == [[], [], ['CarPlay']]
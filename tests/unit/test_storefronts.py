@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+
+from app.storefronts import merge_storefront_app_urls, check_storefronts
+
+NETFLIX_US = 'https://apps.apple.com/us/app/netflix/id363590051'
+NETFLIX_VN = 'https://apps.apple.com/vn/app/netflix/id363590051'
+SONY_VN = 'https://apps.apple.com/vn/app/sony/id1193542964'
+GAME_JP = 'https://apps.apple.com/jp/app/game/id100'
+
+
+def test_merge_storefront_app_urls():
+    app_urls, availability = merge_storefront_app_urls(dict(
+        us=[NETFLIX_US],
+        vn=[SONY_VN, NETFLIX_VN],
+        jp=[GAME_JP, NETFLIX_US.replace('/us/', '/jp/')],
+    ))
+
+    assert app_urls == [NETFLIX_US, SONY_VN, GAME_JP]
+    assert availability == {NETFLIX_US: ['us', 'vn', 'jp'], SONY_VN: ['vn'], GAME_JP: ['jp']}
+
+
+class _FakeRequest:
+    def __init__(self, available: set[str]):
+        self.available = available
+        self.urls = []
+
+    def head(self, url: str, **kwargs):
+        self.urls.append(url)
+        return SimpleNamespace(status=200 if url in self.available else 404, dispose=lambda: None)
+
+
+def test_check_storefronts():
+    request = _FakeRequest(available={'https://apps.apple.com/us/app/sony/id1193542964'})
+    availability = check_storefronts(ctx=SimpleNamespace(request=request), storefronts=['us', 'vn', 'jp'],
+                                     availability={NETFLIX_US: ['us', 'vn', 'jp'], SONY_VN: ['vn']})
+
+    # listed storefronts are trusted, only the others are checked
+    assert request.urls == ['https://apps.apple.com/us/app/sony/id1193542964',
+                            'https://apps.apple.com/jp/app/sony/id1193542964']
+    assert availability == {NETFLIX_US: ['us', 'vn', 'jp'], SONY_VN: ['us', 'vn']}
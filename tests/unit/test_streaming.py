@@ -0,0 +1,69 @@
+import tracemalloc
+from os.path import join as join_path
+
+import pytest
+
+from app.parsers import AppInfoParser
+from app.pipeline import parse_app_file, parse_app_html
+from app.streaming import StreamingAppInfoParser
+from tests.data.snapshots import PARENT_DIR as SNAPSHOT_DIR
+
+
+def read_chunks(path: str, size: int):
+    with open(path, 'rb') as f:
+        while chunk := f.read(size):
+            yield chunk
+
+
+@pytest.mark.parametrize('chunk_size', (97, 4096, 10 ** 7))
+@pytest.mark.parametrize('snapshot_file', ("app_id363590051.html", "app_id1193542964.html"))
+def test_streaming_parity(snapshot_file: str, chunk_size: int):
+    path = join_path(SNAPSHOT_DIR, snapshot_file)
+    with open(path, 'r') as f:
+        expected = AppInfoParser(html=f.read())
+
+    parser = StreamingAppInfoParser.from_chunks(read_chunks(path, chunk_size))
+
+    assert parser.done
+    assert parser.parse() == expected.parse()
+    assert parser.parse_languages() == expected.parse_languages()
+
+
+def test_streaming_early_exit():
+    parser = StreamingAppInfoParser()
+    html = '''
+        <head><meta property="og:url" content="https://apps.apple.com/us/app/x/id1">
+        <meta name="apple:content_id" content="1"></head>
+        <script>var s = "</dl><h1 class='product-header__title'>fake</h1>";</script>
+        <h1 class="product-header__title">X <span>4+</span>
+        </h1>
+        <dl class="information-list--app"><div><dt>Compatibility</dt><dd><dl><dt>iPhone</dt><dd>iOS</dd></dl></dd></div>
+        <div><dt>Languages</dt><dd>English, French</dd></div>
+    '''
+
+    assert parser.feed(html)
+    assert parser.feed('<dl class="information-list--app"><div><dt>Languages</dt><dd>German</dd></div></dl>')
+    assert parser.parse() == dict(app_name='X 4+', app_id='id1', app_url='https://apps.apple.com/us/app/x/id1',
+                                  app_targets=['iPhone'])
+    assert parser.parse_languages() == ['English', 'French']
+
+
+def test_streaming_peak_memory():
+    path = join_path(SNAPSHOT_DIR, "app_id363590051.html")
+
+    tracemalloc.start()
+    StreamingAppInfoParser.from_chunks(read_chunks(path, 4096))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert peak < 256 * 1024
+
+
+@pytest.mark.parametrize('snapshot_file', ("app_id363590051.html", "app_id1193542964.html"))
+def test_streaming_app_parser(snapshot_file: str):
+    path = join_path(SNAPSHOT_DIR, snapshot_file)
+    with open(path, 'r') as f:
+        html = f.read()
+
+    assert parse_app_file(path, parser='streaming') == parse_app_html(html, parser='dom')
+    assert parse_app_html(html, parser='streaming') == parse_app_html(html, parser='dom')
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from app.parsers import StructuredAppInfoParser
+from app.tracing import span, count, enable_tracing, disable_tracing, get_tracer, Tracer
+
+
+@pytest.fixture
+def tracer():
+    yield enable_tracing()
+    disable_tracing()
+
+
+def test_disabled_tracing_is_a_no_op():
+    assert get_tracer() is None
+    with span('app.goto'):
+        count('cache.fresh')
+    assert span('app.goto') is span('parse.fields')
+
+
+def test_spans_and_counters(tracer: Tracer):
+    for _ in range(3):
+        with span('app.goto', url='https://apps.apple.com/us/app/netflix/id363590051'):
+            pass
+    count('cache.fresh')
+    count('cache.fresh', 2)
+
+    stats = tracer.stats()
+    assert list(stats) == ['app.goto']
+    assert stats['app.goto']['count'] == 3
+    assert stats['app.goto']['p50_s'] <= stats['app.goto']['p95_s'] <= stats['app.goto']['total_s']
+    assert tracer.counters == {'cache.fresh': 3}
+
+    goto_event = tracer.events[0]
+    assert goto_event['ph'] == 'X' and goto_event['args']['url'].endswith('id363590051')
+    assert tracer.events[-1] == dict(name='cache.fresh', ph='C', ts=tracer.events[-1]['ts'], pid=tracer.pid,
+                                     args={'cache.fresh': 3})
+
+    summary = tracer.summary().splitlines()
+    assert summary[1].split()[:2] == ['app.goto', '3']
+    assert summary[2].split() == ['cache.fresh', '3']
+
+
+def test_span_records_failed_stage(tracer: Tracer):
+    with pytest.raises(TimeoutError):
+        with span('app.wait_header'):
+            raise TimeoutError
+    assert tracer.stats()['app.wait_header']['count'] == 1
+
+
+def test_parser_stages(tracer: Tracer):
+    StructuredAppInfoParser(html='<html><head><meta property="og:url" content="u"></head></html>').parse()
+    assert {'parse.load_json', 'parse.fields', 'parse.build_soup'} <= set(tracer.stats())
+
+
+@pytest.mark.parametrize('file_name', ('trace.json', 'trace.jsonl'))
+def test_write(tracer: Tracer, tmp_path, file_name: str):
+    with span('app.content'):
+        count('search.result_pages')
+    path = str(tmp_path / file_name)
+    tracer.write(path)
+
+    with open(path, 'r') as f:
+        if file_name.endswith('.jsonl'):
+            events = [json.loads(line) for line in f]
+        else:
+            events = json.load(f)['traceEvents']
+    assert [event['name'] for event in events] == ['search.result_pages', 'app.content']
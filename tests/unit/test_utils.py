@@ -1,7 +1,8 @@
 import pytest
 
 from app.utils import normalize_text, clean_text, rand_float, get_delay_ms, get_delay_s, is_app_url, is_company_url, \
-    get_developer_name_from_company_url, get_first_longest_common_substring, calc_likelihood, get_best_matching_text
+    get_developer_name_from_company_url, get_first_longest_common_substring, calc_likelihood, get_best_matching_text, \
+    get_app_id_from_app_url, get_storefront_from_url, get_storefront_url, parse_storefronts
 
 
 def test_normalize_text():
@@ -77,6 +78,26 @@ def test_get_developer_name_from_company_url(url: str, expected: str | None):
     assert get_developer_name_from_company_url(url) == expected
 
 
+@pytest.mark.parametrize(('url', 'expected'), (
+    ('https://apps.apple.com/app/netflix/id363590051', '363590051'),
+    ('https://apps.apple.com/vn/app/sony-b%E1%BA%A3o-h%C3%A0nh-%C4%91i%E1%BB%87n-t%E1%BB%AD/id1193542964', '1193542964'),
+    ('https://apps.apple.com/us/app/netflix/id363590051?mt=8', '363590051'),
+    ('https://apps.apple.com/us/developer/netflix-inc/id363590054', None),
+))
+def test_get_app_id_from_app_url(url: str, expected: str | None):
+    assert get_app_id_from_app_url(url) == expected
+
+
+@pytest.mark.parametrize(('url', 'expected'), (
+    ('https://apps.apple.com/app/netflix/id363590051', ''),
+    ('https://apps.apple.com/VN/app/netflix/id363590051', 'vn'),
+    ('https://apps.apple.com/us/developer/netflix-inc/id363590054?mt=1', 'us'),
+    ('https://apps.apple.com/us/story/id1', None),
+))
+def test_get_storefront_from_url(url: str, expected: str | None):
+    assert get_storefront_from_url(url) == expected
+
+
 @pytest.mark.parametrize(('str1', 'str2', 'expected'), (
     ('sony-corporation', 'sony', 'sony'),
     ('netflix', 'netflix-inc', 'netflix'),
@@ -100,3 +121,18 @@ def test_calc_likelihood(str1: str, str2: str, expected: float):
 ))
 def test_get_best_matching_text(hint_text: str, texts: list[str], expected: str):
     assert get_best_matching_text(hint_text, texts) == expected
+
+
+@pytest.mark.parametrize(('url', 'expected'), (
+    ('https://apps.apple.com/us/developer/netflix-inc/id363590054',
+     'https://apps.apple.com/jp/developer/netflix-inc/id363590054'),
+    ('https://apps.apple.com/app/netflix/id363590051', 'https://apps.apple.com/jp/app/netflix/id363590051'),
+))
+def test_get_storefront_url(url: str, expected: str):
+    assert get_storefront_url(url, 'jp') == expected
+
+
+def test_parse_storefronts():
+    assert parse_storefronts('us, VN,jp,us') == ['us', 'vn', 'jp']
+    with pytest.raises(ValueError):
+        parse_storefronts('us,usa')
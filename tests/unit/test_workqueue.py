@@ -0,0 +1,112 @@
+import time
+
+import pytest
+
+from app.worker import run_worker
+from app.workqueue import WorkQueue
+
+APP_URLS = ['https://apps.apple.com/us/app/netflix/id363590051', 'https://apps.apple.com/us/app/fast/id1133348139']
+JOB = 'https://apps.apple.com/us/developer/netflix-inc/id363590054'
+
+
+@pytest.fixture
+def queue(tmp_path):
+    with WorkQueue(str(tmp_path / 'queue.sqlite3'), lease_s=60, max_attempts=2) as queue_:
+        yield queue_
+
+
+def test_enqueue_is_idempotent(queue: WorkQueue):
+    assert queue.enqueue(JOB, APP_URLS) == 2
+    assert queue.enqueue(JOB, APP_URLS) == 0
+    assert queue.enqueue('another job', APP_URLS[:1]) == 1
+    assert queue.counts() == {'pending': 3}
+    assert queue.counts(JOB) == {'pending': 2}
+
+
+def test_lease_is_exclusive(queue: WorkQueue):
+    queue.enqueue(JOB, APP_URLS)
+    first = queue.lease(owner='a')
+    second = queue.lease(owner='b')
+
+    assert [item.app_url for item in first + second] == APP_URLS
+    assert first[0].attempts == 1
+    assert queue.lease(owner='c') == []
+    assert queue.counts(JOB) == {'leased': 2}
+
+
+def test_ack_and_nack(queue: WorkQueue):
+    queue.enqueue(JOB, APP_URLS[:1])
+    item = queue.lease(owner='a')[0]
+
+    assert not queue.ack(item.id, owner='b', result={})
+    assert queue.nack(item.id, owner='a', error='TimeoutError()')
+    assert queue.counts(JOB) == {'pending': 1}
+
+    item = queue.lease(owner='b')[0]
+    assert item.attempts == 2
+    assert queue.nack(item.id, owner='b', error='TimeoutError()')
+    assert queue.counts(JOB) == {'failed': 1}
+    assert list(queue.iter_finished(JOB)) == [(APP_URLS[0], None, 'TimeoutError()')]
+
+
+def test_expired_lease_is_retried(queue: WorkQueue):
+    queue.enqueue(JOB, APP_URLS[:1])
+    lost = queue.lease(owner='a')[0]
+
+    retried = queue.lease(owner='b', now=time.time() + 61)[0]
+    assert retried.id == lost.id and retried.attempts == 2
+    # the first worker came back too late, its lease is gone
+    assert not queue.ack(lost.id, owner='a', result=dict(app_name='stale'))
+    assert queue.ack(retried.id, owner='b', result=dict(app_name='Netflix'))
+
+    queue.enqueue(JOB, APP_URLS[1:])
+    queue.lease(owner='c')
+    assert queue.lease(owner='d', now=time.time() + 61)[0].attempts == 2
+    assert queue.lease(owner='e', now=time.time() + 122) == []
+    assert queue.counts(JOB) == {'done': 1, 'failed': 1}
+
+
+def test_run_worker(queue: WorkQueue):
+    queue.enqueue(JOB, APP_URLS)
+
+    def crawl(app_url: str) -> dict:
+        if app_url.endswith('id1133348139'):
+            raise TimeoutError
+        return dict(app_url=app_url)
+
+    assert run_worker(queue, crawl, owner='w', poll_s=0.01, idle_exit_s=0) == 1
+    finished = list(queue.iter_finished(JOB))
+    assert finished == [(APP_URLS[0], dict(app_url=APP_URLS[0]), None), (APP_URLS[1], None, 'TimeoutError()')]
+
+
+def test_enqueue_crawls_finished_items_again_in_a_new_run(queue: WorkQueue):
+    queue.enqueue(JOB, APP_URLS, run='first')
+    run_worker(queue, lambda app_url: dict(app_url=app_url), owner='w', poll_s=0.01, idle_exit_s=0)
+    assert queue.counts(JOB) == {'done': 2}
+
+    # the same run reuses the results, a new one crawls the pages again
+    assert queue.enqueue(JOB, APP_URLS, run='first') == 0
+    assert queue.enqueue(JOB, APP_URLS[:1], run='second') == 1
+    assert queue.counts(JOB) == {'done': 1, 'pending': 1}
+    assert queue.lease(owner='w')[0].attempts == 1
+
+
+def test_iter_finished_reads_from_its_cursor(queue: WorkQueue):
+    queue.enqueue(JOB, APP_URLS, run='run')
+    first, second = queue.lease(owner='a', limit=2)
+    # the second item finishes first, each one is yielded once as it finishes
+    queue.ack(second.id, owner='a', result=dict(app_name='Fast'))
+    finished = queue.iter_finished(JOB, run='run', poll_s=0.01)
+    assert next(finished) == (APP_URLS[1], dict(app_name='Fast'), None)
+    queue.ack(first.id, owner='a', result=dict(app_name='Netflix'))
+    assert list(finished) == [(APP_URLS[0], dict(app_name='Netflix'), None)]
+
+
+def test_iter_finished_without_live_workers(tmp_path):
+    with WorkQueue(str(tmp_path / 'queue.sqlite3'), lease_s=0.05, max_attempts=3) as queue:
+        queue.enqueue(JOB, APP_URLS, run='run')
+        # the worker dies holding its lease, nobody else polls the queue
+        queue.lease(owner='dead')
+        finished = list(queue.iter_finished(JOB, run='run', poll_s=0.01))
+        assert sorted(finished) == [(app_url, None, 'no live worker') for app_url in sorted(APP_URLS)]
+        assert queue.counts(JOB) == {'failed': 2}